@@ -89,6 +89,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
     "core.middlewares.logs.RequestLoggingMiddleware",
+    "core.middlewares.request_cache.RequestCacheMiddleware",
 ]
 
 extra_delay_request = int(os.environ.get("EXTRA_DELAY_REQUEST", "0"))
@@ -250,6 +251,12 @@ CACHES = {
     }
 }
 
+# Answer the detection list overview from the DetectionStatistic rollup when its
+# filters allow. Enable once `manage.py refresh_detection_statistics` has filled it.
+DETECTION_STATISTICS_ENABLED = strtobool(
+    os.environ.get("DETECTION_STATISTICS_ENABLED", "false")
+)
+
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
 
@@ -269,6 +276,12 @@ CELERY_TASK_RESULT_EXPIRES = 3600
 
 CELERY_TASK_ROUTES = {
     "core.utils.tasks.run_management_command": {"queue": "sequential_commands"},
+    # Own worker (services/celery_exports.service, `make celery-exports` locally):
+    # exports, the background exact counts of estimated list counts and the
+    # statistics rebuilds of edited communes, run alongside long imports.
+    "core.utils.tasks.run_export_job": {"queue": "exports"},
+    "core.utils.tasks.compute_query_count": {"queue": "exports"},
+    "core.utils.tasks.refresh_detection_statistics": {"queue": "exports"},
 }
 
 CELERY_WORKER_CONCURRENCY = 1
@@ -7,6 +7,10 @@ from django.core.management.base import CommandError
 from core.utils.logs_helpers import log_command_event
 
 
+# written to disk as it arrives instead of buffering the whole body in memory
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
 def log_event(info: str):
     log_command_event(command_name="utils: file", info=info)
 
@@ -21,7 +25,8 @@ def download_file(
         file_path = f"{temp_dir.name}/{file_name}"
 
         with open(file_path, "wb") as file:
-            file.write(file_res.content)
+            for chunk in file_res.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
             log_event(f"FILE DOWNLOADED: {file_path}")
     else:
         raise CommandError(f"FAILED TO DOWNLOAD FILE FROM URL: {url}")
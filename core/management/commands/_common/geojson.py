@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import re
+from typing import Any, Dict, Iterator
+
+# Files are read in chunks of this many decompressed characters; a single feature
+# only has to fit in the buffer, never the whole collection.
+CHUNK_SIZE = 1 << 20
+
+_FEATURES_START_RE = re.compile(r'"features"\s*:\s*\[')
+# between two features: JSON whitespace and the array's commas
+_SEPARATORS = " \t\n\r,"
+
+
+class GeoJSONFeatureReader:
+    """Iterates the features of a gzipped GeoJSON FeatureCollection one at a time.
+
+    json.loads on a department file holds the whole decompressed text plus every
+    decoded feature (~2GB for the biggest departments). This decodes one feature
+    object at a time from a rolling text buffer with JSONDecoder.raw_decode, so
+    memory stays at one chunk plus whatever the caller keeps of the features.
+
+    Only the "features" array is read: the collection's other members are skipped.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = CHUNK_SIZE):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self._decoder = json.JSONDecoder()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.file_path, "rb") as raw, gzip.open(raw, "rt") as file:
+
+            def read() -> str:
+                chunk = file.read(self.chunk_size)
+                self.bytes_read = raw.tell()
+                return chunk
+
+            buffer = read()
+            match = _FEATURES_START_RE.search(buffer)
+            while match is None:
+                chunk = read()
+                if not chunk:
+                    raise ValueError(f"No features array in {self.file_path}")
+                # keep a tail so a key split across two chunks is still found
+                buffer = buffer[-32:] + chunk
+                match = _FEATURES_START_RE.search(buffer)
+
+            position = match.end()
+            while True:
+                while position < len(buffer) and buffer[position] in _SEPARATORS:
+                    position += 1
+
+                if position == len(buffer):
+                    chunk = read()
+                    if not chunk:
+                        raise ValueError(
+                            f"Unterminated features array in {self.file_path}"
+                        )
+                    buffer, position = chunk, 0
+                    continue
+
+                if buffer[position] == "]":
+                    return
+
+                try:
+                    feature, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # feature cut by the chunk boundary: drop what was consumed and
+                    # read on; at end of file it really is malformed
+                    chunk = read()
+                    if not chunk:
+                        raise
+                    buffer, position = buffer[position:] + chunk, 0
+                    continue
+
+                yield feature
+                position = end
+
+    def estimate_total(self, done: int) -> int:
+        """Feature count extrapolated from the share of the file read so far, for
+        progress logging (the total is only known once the file is exhausted)."""
+        if not self.bytes_read:
+            return done
+        return max(done, round(done * self.size / self.bytes_read))
@@ -0,0 +1,98 @@
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterator, List, Set, Tuple
+
+from django.contrib.gis.geos import GEOSGeometry
+
+# Grid cell side, in the geometries' units (degrees for SRID 4326): ~100m, a few
+# times the size of a typical detection, so most land in one to four cells.
+DEFAULT_CELL_SIZE = 0.001
+# Geometries spanning more cells than this are kept aside and tested on every query
+# rather than written into hundreds of cells.
+MAX_CELLS_PER_GEOMETRY = 64
+
+Extent = Tuple[float, float, float, float]
+
+
+def _extents_overlap(a: Extent, b: Extent) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class GeometryGridIndex:
+    """Bounding-box index over a growing set of geometries, partitioned by key.
+
+    Each geometry is bucketed into the grid cells its extent covers; a query only
+    looks at the cells of its own extent and yields the geometries whose extents
+    overlap it. Unlike a packed STR tree it accepts inserts at any time, which the
+    import buffers need: they grow row by row and are cleared on every flush.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._entries: List[Tuple[GEOSGeometry, Extent]] = []
+        self._cells: Dict[Hashable, Dict[Tuple[int, int], List[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self._oversized: Dict[Hashable, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell_range(self, extent: Extent) -> Tuple[range, range]:
+        x_min, y_min, x_max, y_max = extent
+        return (
+            range(
+                math.floor(x_min / self.cell_size),
+                math.floor(x_max / self.cell_size) + 1,
+            ),
+            range(
+                math.floor(y_min / self.cell_size),
+                math.floor(y_max / self.cell_size) + 1,
+            ),
+        )
+
+    def add(self, key: Hashable, geometry: GEOSGeometry) -> None:
+        extent = geometry.extent
+        index = len(self._entries)
+        self._entries.append((geometry, extent))
+
+        xs, ys = self._cell_range(extent)
+        if len(xs) * len(ys) > MAX_CELLS_PER_GEOMETRY:
+            self._oversized[key].append(index)
+            return
+
+        cells = self._cells[key]
+        for x in xs:
+            for y in ys:
+                cells[(x, y)].append(index)
+
+    def candidates(
+        self, key: Hashable, geometry: GEOSGeometry
+    ) -> Iterator[GEOSGeometry]:
+        """Geometries added under `key` whose extent overlaps `geometry`'s, in
+        insertion order. Exact predicates are left to the caller."""
+        extent = geometry.extent
+        indexes: Set[int] = set(self._oversized.get(key, ()))
+
+        cells = self._cells.get(key)
+        if cells:
+            xs, ys = self._cell_range(extent)
+            if len(xs) * len(ys) > len(cells):
+                # query wider than what is indexed: walk the occupied cells instead
+                for (x, y), cell_indexes in cells.items():
+                    if x in xs and y in ys:
+                        indexes.update(cell_indexes)
+            else:
+                for x in xs:
+                    for y in ys:
+                        indexes.update(cells.get((x, y), ()))
+
+        for index in sorted(indexes):
+            candidate, candidate_extent = self._entries[index]
+            if _extents_overlap(extent, candidate_extent):
+                yield candidate
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._cells.clear()
+        self._oversized.clear()
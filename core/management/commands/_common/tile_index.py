@@ -0,0 +1,84 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from core.models.tile import Tile
+
+# Above this many tiles in the extent, the preload is skipped and tiles are looked up
+# (and remembered) one by one instead: 16 bytes per tile, so ~80MB at the cap.
+MAX_PRELOADED_TILES = 5_000_000
+
+
+def _key(x: int, y: int) -> int:
+    return (x << 32) | y
+
+
+class TileIdMap:
+    """(x, y) -> Tile.id at one zoom level.
+
+    The tiles of an extent are preloaded into two parallel sorted int64 arrays
+    (packed (x, y) keys and ids), searched with bisect: a few bytes per tile instead
+    of a dict entry, so a department's worth of tiles fits comfortably. Coordinates
+    outside the preloaded ranges are looked up in the database once and remembered,
+    as are the tiles added after the preload.
+    """
+
+    def __init__(self, z: int):
+        self.z = z
+        self._keys = array("q")
+        self._ids = array("q")
+        self._x_range: Optional[Tuple[int, int]] = None
+        self._y_range: Optional[Tuple[int, int]] = None
+        self._extra: Dict[Tuple[int, int], Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def preload(self, x_range: Tuple[int, int], y_range: Tuple[int, int]) -> bool:
+        """Load every tile with x and y in the (inclusive) ranges. Returns False,
+        loading nothing, when there are more than MAX_PRELOADED_TILES of them."""
+        queryset = Tile.objects.filter(
+            z=self.z, x__range=x_range, y__range=y_range
+        ).order_by("x", "y")
+
+        if queryset.count() > MAX_PRELOADED_TILES:
+            return False
+
+        keys = array("q")
+        ids = array("q")
+        for x, y, tile_id in queryset.values_list("x", "y", "id").iterator(
+            chunk_size=50_000
+        ):
+            keys.append(_key(x, y))
+            ids.append(tile_id)
+
+        self._keys, self._ids = keys, ids
+        self._x_range, self._y_range = x_range, y_range
+        return True
+
+    def _preloaded(self, x: int, y: int) -> bool:
+        return (
+            self._x_range is not None
+            and self._x_range[0] <= x <= self._x_range[1]
+            and self._y_range[0] <= y <= self._y_range[1]
+        )
+
+    def get(self, x: int, y: int) -> Optional[int]:
+        if (x, y) in self._extra:
+            return self._extra[(x, y)]
+
+        if self._preloaded(x, y):
+            key = _key(x, y)
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                return self._ids[index]
+            return None
+
+        tile_id = (
+            Tile.objects.filter(x=x, y=y, z=self.z).values_list("id", flat=True).first()
+        )
+        self._extra[(x, y)] = tile_id
+        return tile_id
+
+    def add(self, x: int, y: int, tile_id: int) -> None:
+        self._extra[(x, y)] = tile_id
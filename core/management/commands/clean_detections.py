@@ -2,7 +2,8 @@ from django.core.management.base import BaseCommand
 from core.management.base import CommandRunTrackerMixin
 from django.db import connection, transaction
 
-from core.utils.cache import invalidate_count_caches
+from core.services.detection_statistic import DetectionStatisticService
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from core.utils.logs_helpers import log_command_event
 
 
@@ -16,6 +17,18 @@ ORPHAN_DETECTION_DATA = """
     LEFT JOIN core_detection d ON dd.id = d.detection_data_id
     WHERE d.detection_data_id IS NULL
 """
+# Communes (and parcels) of the detections about to be deleted, whose statistics
+# (and cached counts) change.
+AFFECTED_COMMUNES = """
+    SELECT DISTINCT commune_id FROM core_detectionobject
+    WHERE id IN (SELECT detection_object_id FROM core_detection WHERE {where})
+"""
+AFFECTED_PARCELS = """
+    SELECT DISTINCT parcel_id FROM core_detectionobject
+    WHERE
+        id IN (SELECT detection_object_id FROM core_detection WHERE {where})
+        AND parcel_id IS NOT NULL
+"""
 ORPHAN_DETECTION_OBJECTS = """
     SELECT obj.id FROM core_detectionobject obj
     LEFT JOIN core_detection d ON obj.id = d.detection_object_id
@@ -46,6 +59,11 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         with connection.cursor() as cursor:
             # where only ever holds a hardcoded column literal; the value is bound via %s.
+            cursor.execute(AFFECTED_COMMUNES.format(where=where), [param])
+            commune_ids = {row[0] for row in cursor.fetchall()}
+            cursor.execute(AFFECTED_PARCELS.format(where=where), [param])
+            parcel_ids = [row[0] for row in cursor.fetchall()]
+
             cursor.execute(f"DELETE FROM core_detection WHERE {where}", [param])
             deleted_detections = cursor.rowcount
 
@@ -73,7 +91,14 @@ class Command(CommandRunTrackerMixin, BaseCommand):
             )
             deleted_objects = cursor.rowcount
 
-        invalidate_count_caches()
+        department_ids = get_count_cache_department_ids(
+            commune_ids=commune_ids, parcel_ids=parcel_ids
+        )
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+        if DetectionStatisticService.is_enabled():
+            transaction.on_commit(
+                lambda: DetectionStatisticService.refresh(commune_ids)
+            )
 
         log_event(
             f"Deleted {deleted_detections} detections, {deleted_data} orphaned detection data, "
@@ -5,8 +5,9 @@ from core.management.base import CommandRunTrackerMixin
 
 from core.models.detection_object import DetectionObject
 from core.models.object_type import ObjectType
+from core.services.detection_statistic import DetectionStatisticService
 from core.services.prescription import PrescriptionService
-from core.utils.cache import invalidate_count_caches
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from core.utils.logs_helpers import log_command_event, log_command_progress
 
 BATCH_SIZE = 10000
@@ -20,45 +21,83 @@ class Command(CommandRunTrackerMixin, BaseCommand):
     help = "Compute prescription statuses for specified object types"
 
     def add_arguments(self, parser):
-        parser.add_argument("--object-type-uuids", action="append", required=True)
+        parser.add_argument("--object-type-uuids", action="append", required=False)
+        parser.add_argument(
+            "--dirty-only",
+            action="store_true",
+            help=(
+                "Only recompute the detection objects flagged since the last run "
+                "(object type duration or tile set date changed). Without "
+                "--object-type-uuids, covers every object type."
+            ),
+        )
 
     def handle(self, *args, **options):
-        object_type_uuids = list(set(options["object_type_uuids"]))
-        object_types = ObjectType.objects.filter(uuid__in=object_type_uuids).all()
+        dirty_only = options["dirty_only"]
+        detection_objects = DetectionObject.objects.all()
 
-        if len(object_type_uuids) != len(object_types):
-            raise CommandError("Some object types were not found")
+        if options["object_type_uuids"]:
+            object_type_uuids = list(set(options["object_type_uuids"]))
+            object_types = ObjectType.objects.filter(uuid__in=object_type_uuids).all()
 
-        log_event(f"Starting compute prescription statuses for object types: {
-              [ot.name for ot in object_types]}")
+            if len(object_type_uuids) != len(object_types):
+                raise CommandError("Some object types were not found")
 
-        start_time = time.monotonic()
-        offset = 0
-        total = DetectionObject.objects.filter(object_type__in=object_types).count()
+            detection_objects = detection_objects.filter(object_type__in=object_types)
+            log_event(f"Starting compute prescription statuses for object types: {
+                [ot.name for ot in object_types]}")
+        elif not dirty_only:
+            raise CommandError("--object-type-uuids is required without --dirty-only")
+        else:
+            log_event("Starting compute prescription statuses for all object types")
+
+        if dirty_only:
+            detection_objects = detection_objects.filter(prescription_dirty=True)
 
+        detection_objects = detection_objects.order_by("id")
+
+        start_time = time.monotonic()
+        processed = 0
+        changed = 0
+        changed_commune_ids = set()
+        changed_department_ids = set()
+        last_id = 0
+        total = detection_objects.count()
+
+        # Keyset pagination: with --dirty-only each batch clears its objects' flag,
+        # which would shift an offset.
         while True:
-            detection_objects = (
-                DetectionObject.objects.filter(object_type__in=object_types)
-                .prefetch_related(
-                    "detections", "detections__detection_data", "detections__tile_set"
-                )
-                .order_by("id")[offset : offset + BATCH_SIZE]
+            object_ids = list(
+                detection_objects.filter(id__gt=last_id).values_list("id", flat=True)[
+                    :BATCH_SIZE
+                ]
             )
 
-            if not detection_objects:
+            if not object_ids:
                 break
 
-            for detection_object in detection_objects:
-                PrescriptionService.compute_prescription(
-                    detection_object=detection_object
+            last_id = object_ids[-1]
+            batch_changed = PrescriptionService.compute_prescriptions(object_ids)
+            if batch_changed:
+                changed += batch_changed
+                if DetectionStatisticService.is_enabled():
+                    changed_commune_ids.update(
+                        DetectionStatisticService.get_commune_ids(object_ids)
+                    )
+                changed_department_ids.update(
+                    get_count_cache_department_ids(detection_object_ids=object_ids)
                 )
+            processed += len(object_ids)
 
-            offset += len(detection_objects)
-
-            log_command_progress("compute_prescription", offset, total, start_time)
+            log_command_progress("compute_prescription", processed, total, start_time)
 
         # PrescriptionService bulk-updates prescription status (bypasses post_save),
         # which is a count filter dimension — invalidate counts once for the run.
-        invalidate_count_caches()
-
-        log_event("Prescription computation done")
+        if changed:
+            invalidate_count_caches(changed_department_ids)
+            DetectionStatisticService.refresh(changed_commune_ids)
+
+        log_event(
+            f"Prescription computation done: {changed} detection(s) changed "
+            f"on {processed} object(s)"
+        )
@@ -1,12 +1,15 @@
-import math
 import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from django.core.management.base import BaseCommand, CommandError
 from core.management.base import CommandRunTrackerMixin
 from django.db import connection
+from django.utils import timezone
 
 from core.constants.geo import SRID
+from core.management.commands._common.spatial_index import GeometryGridIndex
+from core.management.commands._common.tile_index import TileIdMap
 from core.models.detection import Detection, DetectionSource
 from core.models.detection_data import (
     DetectionControlStatus,
@@ -14,12 +17,14 @@ from core.models.detection_data import (
     DetectionValidationStatus,
 )
 from core.services.detections_schema import (
+    INFERENCE_ROWS_ITERSIZE,
     DetectionRowSerializer,
     DetectionsSchemaService,
     InferenceFilter,
 )
 from core.models.detection_object import DetectionObject
 from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.db.models import Extent
 from django.contrib.gis.db.models.functions import Centroid
 
 
@@ -36,33 +41,131 @@ from core.models.user import User
 from core.constants.detection import PERCENTAGE_SAME_DETECTION_THRESHOLD
 from core.services.detection import DetectionService
 from core.services.detection_process import DetectionProcessService
+from core.services.detection_statistic import DetectionStatisticService
+from core.services.geo_custom_zone import GeoCustomZoneService
 from core.services.prescription import PrescriptionService
 from core.utils.logs_helpers import log_command_event, log_command_progress
 from core.utils.string import normalize
-from core.utils.cache import invalidate_count_caches
+from core.utils.tile import slippy_tile_xy
+from core.utils.cache import (
+    get_count_cache_department_ids,
+    invalidate_count_caches,
+    suppress_count_cache_invalidation,
+)
 from core.services.deployed_data import DeployedDataService
-from simple_history.utils import bulk_create_with_history
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
 USER_REVIEWER_MAIL = "user.reviewer.default.aigle@aigle.beta.gouv.fr"
 INSERT_BATCH_SIZE = 10000
 
-
-def slippy_tile_xy(lon: float, lat: float, z: int) -> tuple[int, int]:
-    # Tile.geometry is ST_TileEnvelope(z, x, y), so the standard slippy-map
-    # formula yields the exact tile containing a centroid — an indexed (x, y, z)
-    # lookup instead of a per-row GiST polygon scan over tens of millions of tiles.
-    n = 2**z
-    x = int(math.floor((lon + 180.0) / 360.0 * n))
-    y = int(
-        math.floor((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+# --bulk-enrichment: each chunk of inference rows is loaded into a session-local
+# staging table and enriched with one set-based query, instead of one linked-detection,
+# tile, parcel and commune lookup per row. 7 params per staged row, so 5000 rows per
+# INSERT stay under Postgres's 65535 bind-parameter limit.
+STAGING_TABLE = "import_detections_staging"
+STAGING_INSERT_BATCH_SIZE = 5000
+STAGING_ROW_SQL = "(%s, %s, ST_GeomFromEWKB(%s), %s, %s, %s, %s)"
+
+CREATE_STAGING_TABLE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    row_index integer PRIMARY KEY,
+    object_type_id integer NOT NULL,
+    geometry geometry NOT NULL,
+    tile_x integer NOT NULL,
+    tile_y integer NOT NULL,
+    fallback_tile_x integer,
+    fallback_tile_y integer
+)
+"""
+
+# Same rule as DetectionService.get_linked_detections: the overlap must cover
+# PERCENTAGE_SAME_DETECTION_THRESHOLD of either geometry.
+_SAME_DETECTION_SQL = """
+    ST_Intersects(d.geometry, s.geometry)
+    AND (
+        ST_Area(ST_Intersection(d.geometry, s.geometry))
+            >= ST_Area(s.geometry) * %(threshold)s
+        OR ST_Area(ST_Intersection(d.geometry, s.geometry))
+            >= ST_Area(d.geometry) * %(threshold)s
     )
-    return x, y
+"""
+
+# One row per staged detection: its linked detection (most recent tile set first,
+# largest overlap breaking ties — get_linked_detections' order), its tile (slippy tile
+# of the centroid, else the one the row names), and only when nothing is linked, the
+# parcel and commune containing its centroid. same_tile_set_detection_id is the
+# --clean-step "already imported in this tile set" guard.
+RESOLVE_STAGED_DETECTIONS_SQL = f"""
+SELECT
+    s.row_index,
+    linked.id,
+    COALESCE(tile.id, fallback_tile.id),
+    parcel.id,
+    COALESCE(parcel.commune_id, commune.id),
+    same_tile_set.id
+FROM {STAGING_TABLE} s
+LEFT JOIN LATERAL (
+    SELECT d.id
+    FROM core_detection d
+    JOIN core_detectionobject dobj ON dobj.id = d.detection_object_id
+    JOIN core_tileset ts ON ts.id = d.tile_set_id
+    WHERE
+        d.tile_set_id <> %(tile_set_id)s
+        AND dobj.object_type_id = s.object_type_id
+        AND {_SAME_DETECTION_SQL}
+    ORDER BY ts.date DESC, ST_Area(ST_Intersection(d.geometry, s.geometry)) DESC
+    LIMIT 1
+) linked ON TRUE
+LEFT JOIN LATERAL (
+    SELECT d.id
+    FROM core_detection d
+    JOIN core_detectionobject dobj ON dobj.id = d.detection_object_id
+    WHERE
+        %(clean_step)s
+        AND d.tile_set_id = %(tile_set_id)s
+        AND dobj.object_type_id = s.object_type_id
+        AND {_SAME_DETECTION_SQL}
+    LIMIT 1
+) same_tile_set ON TRUE
+LEFT JOIN core_tile tile
+    ON tile.z = %(zoom)s AND tile.x = s.tile_x AND tile.y = s.tile_y
+LEFT JOIN core_tile fallback_tile
+    ON fallback_tile.z = %(zoom)s
+    AND fallback_tile.x = s.fallback_tile_x
+    AND fallback_tile.y = s.fallback_tile_y
+LEFT JOIN LATERAL (
+    SELECT p.id, p.commune_id
+    FROM core_parcel p
+    WHERE linked.id IS NULL AND ST_Contains(p.geometry, ST_Centroid(s.geometry))
+    LIMIT 1
+) parcel ON TRUE
+LEFT JOIN LATERAL (
+    SELECT z.id
+    FROM core_geozone z
+    WHERE
+        linked.id IS NULL
+        AND parcel.commune_id IS NULL
+        AND z.geo_zone_type = 'COMMUNE'
+        AND ST_Contains(z.geometry, ST_Centroid(s.geometry))
+    LIMIT 1
+) commune ON TRUE
+ORDER BY s.row_index
+"""
 
 
 def log_event(info: str):
     log_command_event(command_name="import_detections", info=info)
 
 
+@dataclass
+class StagedDetection:
+    """An inference row that passed validation, waiting for its enrichment."""
+
+    geometry: GEOSGeometry
+    object_type: ObjectType
+    serialized_detection: Dict[str, Any]
+
+
 class Command(CommandRunTrackerMixin, BaseCommand):
     help = "Import detections from CSV"
     start_time: datetime
@@ -72,6 +175,7 @@ class Command(CommandRunTrackerMixin, BaseCommand):
     detection_objects_to_insert: List[DetectionObject]
     detection_datas_to_insert: List[DetectionData]
     detections_to_insert: List[Detection]
+    staged_detections: List[StagedDetection]
 
     total_inserted_detections: int
     total: Optional[int]
@@ -88,6 +192,17 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         self.detection_objects_to_insert = []
         self.detection_datas_to_insert = []
         self.detections_to_insert = []
+        # existing objects whose missing address is backfilled from the row, by id:
+        # written with one bulk_update at the next insert
+        self.detection_objects_to_update: Dict[int, DetectionObject] = {}
+        self.staged_detections = []
+        # clean-step only: the geometries of detections_to_insert + staged_detections,
+        # by object type, so the intra-batch duplicate check does not scan them all
+        self.pending_geometries_index = GeometryGridIndex()
+        self.tile_ids = TileIdMap(z=TILE_DEFAULT_ZOOM)
+        # tiles referenced by queued detections that do not exist yet, created in
+        # one bulk_create at the next insert
+        self.tiles_to_create: Dict[Tuple[int, int], Tile] = {}
 
         self.total_inserted_detections = 0
 
@@ -122,6 +237,31 @@ class Command(CommandRunTrackerMixin, BaseCommand):
                 "millesime, and passes this only for the tile sets it created."
             ),
         )
+        parser.add_argument(
+            "--bulk-enrichment",
+            action="store_true",
+            default=False,
+            help=(
+                "Resolve linked detections, tiles, parcels and communes per chunk of "
+                f"{INSERT_BATCH_SIZE} rows with set-based spatial joins on a staging "
+                "table instead of per-row lookups."
+            ),
+        )
+        parser.add_argument(
+            "--inference-itersize",
+            type=int,
+            default=INFERENCE_ROWS_ITERSIZE,
+            help="Rows fetched per round-trip from detections.inference.",
+        )
+        parser.add_argument(
+            "--keyset-pagination",
+            action="store_true",
+            default=False,
+            help=(
+                "Read detections.inference in (score, id) keyset pages instead of "
+                "through a server-side cursor (e.g. behind a transaction pooler)."
+            ),
+        )
 
     def check_object_types(self, inference_filter: InferenceFilter):
         object_types = DetectionsSchemaService.get_distinct_object_types(
@@ -148,6 +288,7 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         tile_set_id = options["tile_set_id"]
         self.clean_step = options["clean_step"]
+        bulk_enrichment = options["bulk_enrichment"]
         self.batch_id = options.get("batch_id") or datetime.now().strftime(
             "%Y-%m-%dT%H:%M:%SZ"
         )
@@ -179,16 +320,29 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         )
 
         log_event(f"TileSet found: {self.tile_set.name}")
+        self._preload_tile_ids()
 
         self.total = DetectionsSchemaService.count_inferences(inference_filter)
-        detection_rows_to_insert = DetectionsSchemaService.get_inference_rows(
-            inference_filter
-        )
+        if options["keyset_pagination"]:
+            detection_rows_to_insert = (
+                DetectionsSchemaService.get_inference_rows_keyset(
+                    inference_filter, page_size=options["inference_itersize"]
+                )
+            )
+        else:
+            detection_rows_to_insert = DetectionsSchemaService.get_inference_rows(
+                inference_filter, itersize=options["inference_itersize"]
+            )
 
         for row in detection_rows_to_insert:
-            self.queue_detection(row)
-            self.insert_detections()
+            if bulk_enrichment:
+                self.stage_detection(row)
+                self.flush_staged_detections()
+            else:
+                self.queue_detection(row)
+                self.insert_detections()
 
+        self.flush_staged_detections(force=True)
         self.insert_detections(force=True)
         if self.skipped_already_imported:
             log_event(
@@ -203,9 +357,17 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         self.associate_detections_to_custom_zones()
 
-        # associate_detections_to_custom_zones writes the geo_custom_zones M2M via raw
-        # SQL (bypasses signals), so invalidate counts once for the whole import.
-        invalidate_count_caches()
+        # The inserts and the custom-zone M2M writes are raw SQL / bulk (bypass
+        # signals), so invalidate counts once for the whole import, in the
+        # departments of the tile set's detections.
+        invalidate_count_caches(
+            get_count_cache_department_ids(
+                detection_object_ids=Detection.objects.filter(
+                    tile_set_id=self.tile_set.id
+                ).values("detection_object_id")
+            )
+        )
+        DetectionStatisticService.refresh_tile_sets([self.tile_set.id])
 
         # New detections change every figure on the SUPER_ADMIN deployed-data dashboard,
         # whose cache is version-gated and otherwise only refreshed by
@@ -225,7 +387,11 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         log_event(f"Detections import finished for batch: {self.batch_id}")
 
-    def queue_detection(self, detection_row: Dict[str, Any]):
+    def parse_detection_row(
+        self, detection_row: Dict[str, Any]
+    ) -> Optional[StagedDetection]:
+        """Validation shared by both enrichment modes: returns None when the row must
+        be skipped (invalid, already imported, or an intra-batch duplicate)."""
         geometry_raw = detection_row.pop("geometry")
 
         if not geometry_raw:
@@ -249,34 +415,52 @@ class Command(CommandRunTrackerMixin, BaseCommand):
                 f"Invalid detection row: {detection_row}, errors: {
                     serializer.errors} skipping..."
             )
-            return
+            return None
 
         serialized_detection = serializer.validated_data
 
         # Before any geometry/parcel work — the expensive part of this function.
         if serialized_detection["id"] in self.imported_import_ids:
             self.skipped_already_imported += 1
-            return
+            return None
         self.imported_import_ids.add(serialized_detection["id"])
 
-        if self.clean_step:
-            linked_detections_to_insert = [
-                detection
-                for detection in self.detections_to_insert
-                if detection.geometry.intersects(geometry)
-                and detection.detection_object.object_type == object_type
-            ]
-            if linked_detections_to_insert:
-                for linked_detection in linked_detections_to_insert:
-                    if (
-                        geometry.intersection(linked_detection.geometry).area
-                        > geometry.area * PERCENTAGE_SAME_DETECTION_THRESHOLD
-                        or linked_detection.geometry.intersection(geometry).area
-                        > geometry.area * PERCENTAGE_SAME_DETECTION_THRESHOLD
-                    ):
-                        log_event(f"Detection already exists in tileset {
-                            self.tile_set.name} and is going to be inserted. Skipping...")
-                        return
+        if self.clean_step and self._is_pending_duplicate(geometry, object_type):
+            log_event(f"Detection already exists in tileset {
+                self.tile_set.name} and is going to be inserted. Skipping...")
+            return None
+
+        return StagedDetection(
+            geometry=geometry,
+            object_type=object_type,
+            serialized_detection=serialized_detection,
+        )
+
+    def _is_pending_duplicate(self, geometry: GEOSGeometry, object_type) -> bool:
+        for pending_geometry in self.pending_geometries_index.candidates(
+            object_type.id, geometry
+        ):
+            if not pending_geometry.intersects(geometry):
+                continue
+
+            if (
+                geometry.intersection(pending_geometry).area
+                > geometry.area * PERCENTAGE_SAME_DETECTION_THRESHOLD
+                or pending_geometry.intersection(geometry).area
+                > geometry.area * PERCENTAGE_SAME_DETECTION_THRESHOLD
+            ):
+                return True
+
+        return False
+
+    def queue_detection(self, detection_row: Dict[str, Any]):
+        staged = self.parse_detection_row(detection_row)
+
+        if staged is None:
+            return
+
+        geometry = staged.geometry
+        object_type = staged.object_type
 
         if self.clean_step:
             linked_detections = DetectionService.get_linked_detections(
@@ -312,27 +496,134 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         tile_x, tile_y = slippy_tile_xy(
             geometry.centroid.x, geometry.centroid.y, TILE_DEFAULT_ZOOM
         )
-        tile = Tile.objects.filter(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM).first()
+        tile = self._get_tile(tile_x, tile_y)
 
         if not tile:
-            if serialized_detection.get("tile_x") and serialized_detection.get(
-                "tile_y"
-            ):
-                tile = Tile.objects.filter(
-                    x=serialized_detection["tile_x"],
-                    y=serialized_detection["tile_y"],
-                    z=TILE_DEFAULT_ZOOM,
-                ).first()
-
-                if not tile:
-                    tile = Tile.objects.create(
-                        x=serialized_detection["tile_x"],
-                        y=serialized_detection["tile_y"],
-                        z=TILE_DEFAULT_ZOOM,
-                    )
+            tile = self._get_or_create_fallback_tile(staged.serialized_detection)
+
+        if not tile:
+            log_event("Tile not found for detection, skipping...")
+            return
+
+        linked_detection = linked_detections[0] if linked_detections else None
+        parcel_id = None
+        commune_id = None
+
+        if not linked_detection:
+            parcel = (
+                Parcel.objects.filter(geometry__contains=centroid)
+                .select_related("commune")
+                .defer("geometry", "commune__geometry")
+                .first()
+            )
+
+            parcel_id = parcel.id if parcel else None
+
+            if parcel and parcel.commune:
+                commune_id = parcel.commune.id
             else:
-                log_event("Tile not found for detection, skipping...")
-                return
+                commune_ids = (
+                    GeoZone.objects.filter(
+                        geo_zone_type=GeoZoneType.COMMUNE, geometry__contains=centroid
+                    )
+                    .values_list("id")
+                    .first()
+                )
+
+                if commune_ids:
+                    commune_id = commune_ids[0]
+
+        self.queue_resolved_detection(
+            staged=staged,
+            tile=tile,
+            linked_detection=linked_detection,
+            parcel_id=parcel_id,
+            commune_id=commune_id,
+        )
+
+        if self.clean_step:
+            self.pending_geometries_index.add(object_type.id, geometry)
+
+    def _get_or_create_fallback_tile(
+        self, serialized_detection: Dict[str, Any]
+    ) -> Optional[Tile]:
+        """The tile the inference row itself names, created when missing. Only used
+        when the slippy tile of the centroid does not exist."""
+        if not (
+            serialized_detection.get("tile_x") and serialized_detection.get("tile_y")
+        ):
+            return None
+
+        tile_x = serialized_detection["tile_x"]
+        tile_y = serialized_detection["tile_y"]
+        tile = self._get_tile(tile_x, tile_y)
+
+        if not tile:
+            tile = Tile(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM)
+            self.tiles_to_create[(tile_x, tile_y)] = tile
+
+        return tile
+
+    def _preload_tile_ids(self):
+        """Load the (x, y) -> id map of the tiles over the tile set's zones, so rows
+        resolve their tile in memory instead of one query each."""
+        extent = GeoZone.objects.filter(tile_sets=self.tile_set).aggregate(
+            extent=Extent("geometry")
+        )["extent"]
+
+        if not extent:
+            log_event("Tile set has no zone: tiles are looked up row by row")
+            return
+
+        x_min, y_min, x_max, y_max = extent
+        # slippy y grows southwards
+        tile_x_min, tile_y_min = slippy_tile_xy(x_min, y_max, TILE_DEFAULT_ZOOM)
+        tile_x_max, tile_y_max = slippy_tile_xy(x_max, y_min, TILE_DEFAULT_ZOOM)
+
+        if self.tile_ids.preload((tile_x_min, tile_x_max), (tile_y_min, tile_y_max)):
+            log_event(f"Preloaded {len(self.tile_ids)} tiles of the tile set extent")
+        else:
+            log_event("Too many tiles in the tile set extent: looked up row by row")
+
+    def _get_tile(self, x: int, y: int) -> Optional[Tile]:
+        tile_id = self.tile_ids.get(x, y)
+        if tile_id is not None:
+            return Tile(id=tile_id, x=x, y=y, z=TILE_DEFAULT_ZOOM)
+        return self.tiles_to_create.get((x, y))
+
+    def _create_pending_tiles(self):
+        if not self.tiles_to_create:
+            return
+
+        tiles = list(self.tiles_to_create.values())
+        # ignore_conflicts: a concurrent import may create the same tile. Postgres then
+        # returns no ids, so they are read back by coordinates.
+        Tile.objects.bulk_create(tiles, ignore_conflicts=True)
+        created = Tile.objects.filter(
+            z=TILE_DEFAULT_ZOOM,
+            x__in={tile.x for tile in tiles},
+            y__in={tile.y for tile in tiles},
+        ).values_list("x", "y", "id")
+        tile_ids = {(x, y): tile_id for x, y, tile_id in created}
+
+        for (x, y), tile in self.tiles_to_create.items():
+            tile.id = tile_ids[(x, y)]
+            self.tile_ids.add(x, y, tile.id)
+
+        log_event(f"Created {len(tiles)} missing tiles")
+        self.tiles_to_create = {}
+
+    def queue_resolved_detection(
+        self,
+        staged: StagedDetection,
+        tile: Tile,
+        linked_detection: Optional[Detection],
+        parcel_id: Optional[int],
+        commune_id: Optional[int],
+    ):
+        """Merge/insert logic once the row's linked detection, tile, parcel and commune
+        are known — however they were resolved (per-row ORM or set-based SQL)."""
+        serialized_detection = staged.serialized_detection
 
         detection_data = DetectionData(
             detection_control_status=serialized_detection["detection_control_status"],
@@ -347,13 +638,16 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         if serialized_detection["user_reviewed"]:
             detection_data.user_last_update = self.user_reviewer
 
-        if linked_detections:
-            linked_detection = linked_detections[0]
+        if linked_detection:
             detection_object = linked_detection.detection_object
 
-            if not detection_object.address and serialized_detection["address"]:
+            if (
+                not detection_object.address
+                and serialized_detection["address"]
+                and detection_object.id not in self.detection_objects_to_update
+            ):
                 detection_object.address = serialized_detection["address"]
-                detection_object.save()
+                self.detection_objects_to_update[detection_object.id] = detection_object
 
             if not detection_data.detection_validation_status:
                 detection_data.detection_validation_status = (
@@ -365,31 +659,9 @@ class Command(CommandRunTrackerMixin, BaseCommand):
                     linked_detection.detection_data.detection_control_status
                 )
         else:
-            parcel = (
-                Parcel.objects.filter(geometry__contains=centroid)
-                .select_related("commune")
-                .defer("geometry", "commune__geometry")
-                .first()
-            )
-
-            commune_id = None
-            if parcel and parcel.commune:
-                commune_id = parcel.commune.id
-            else:
-                commune_ids = (
-                    GeoZone.objects.filter(
-                        geo_zone_type=GeoZoneType.COMMUNE, geometry__contains=centroid
-                    )
-                    .values_list("id")
-                    .first()
-                )
-
-                if commune_ids:
-                    commune_id = commune_ids[0]
-
             detection_object = DetectionObject(
-                object_type=object_type,
-                parcel=parcel,
+                object_type=staged.object_type,
+                parcel_id=parcel_id,
                 commune_id=commune_id,
                 address=serialized_detection["address"],
                 batch_id=self.batch_id,
@@ -408,7 +680,7 @@ class Command(CommandRunTrackerMixin, BaseCommand):
                 )
 
         detection = Detection(
-            geometry=geometry,
+            geometry=staged.geometry,
             score=serialized_detection["score"],
             detection_source=serialized_detection["detection_source"]
             or DetectionSource.ANALYSIS,
@@ -425,6 +697,131 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         self.detection_datas_to_insert.append(detection_data)
         self.detections_to_insert.append(detection)
 
+    def stage_detection(self, detection_row: Dict[str, Any]):
+        staged = self.parse_detection_row(detection_row)
+
+        if staged is not None:
+            self.staged_detections.append(staged)
+            if self.clean_step:
+                self.pending_geometries_index.add(
+                    staged.object_type.id, staged.geometry
+                )
+
+    def flush_staged_detections(self, force=False):
+        """Bulk-enrichment mode: resolve the staged chunk's linked detection, tile,
+        parcel and commune with one set-based query, then queue and insert it."""
+        if not force and len(self.staged_detections) < INSERT_BATCH_SIZE:
+            return
+
+        if not self.staged_detections:
+            return
+
+        staged_detections = self.staged_detections
+        self.staged_detections = []
+
+        resolutions = self._resolve_staged_detections(staged_detections)
+
+        linked_detection_ids = {
+            resolution[1] for resolution in resolutions if resolution[1] is not None
+        }
+        linked_detections_map = {
+            detection.id: detection
+            for detection in Detection.objects.filter(
+                id__in=linked_detection_ids
+            ).select_related("detection_object", "detection_data")
+        }
+        tile_ids = {
+            resolution[2] for resolution in resolutions if resolution[2] is not None
+        }
+        tiles_map = {
+            tile.id: tile
+            for tile in Tile.objects.filter(id__in=tile_ids).defer("geometry")
+        }
+
+        for (
+            row_index,
+            linked_detection_id,
+            tile_id,
+            parcel_id,
+            commune_id,
+            same_tile_set_detection_id,
+        ) in resolutions:
+            staged = staged_detections[row_index]
+
+            if same_tile_set_detection_id:
+                log_event(f"Detection already exists in tileset {self.tile_set.name}, id: {
+                    same_tile_set_detection_id}. Skipping...")
+                continue
+
+            tile = tiles_map.get(tile_id) or self._get_or_create_fallback_tile(
+                staged.serialized_detection
+            )
+
+            if not tile:
+                log_event("Tile not found for detection, skipping...")
+                continue
+
+            self.queue_resolved_detection(
+                staged=staged,
+                tile=tile,
+                linked_detection=linked_detections_map.get(linked_detection_id),
+                parcel_id=parcel_id,
+                commune_id=commune_id,
+            )
+
+        # Flush the whole chunk so the next one links against it, exactly like the
+        # per-row mode does with its own flushes.
+        self.insert_detections(force=True)
+
+    def _resolve_staged_detections(
+        self, staged_detections: List[StagedDetection]
+    ) -> List[Tuple]:
+        staging_rows = []
+
+        for row_index, staged in enumerate(staged_detections):
+            serialized_detection = staged.serialized_detection
+            centroid = staged.geometry.centroid
+            tile_x, tile_y = slippy_tile_xy(centroid.x, centroid.y, TILE_DEFAULT_ZOOM)
+            has_fallback_tile = bool(
+                serialized_detection.get("tile_x")
+                and serialized_detection.get("tile_y")
+            )
+            staging_rows.append(
+                [
+                    row_index,
+                    staged.object_type.id,
+                    bytes(staged.geometry.ewkb),
+                    tile_x,
+                    tile_y,
+                    serialized_detection["tile_x"] if has_fallback_tile else None,
+                    serialized_detection["tile_y"] if has_fallback_tile else None,
+                ]
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_TABLE_SQL)
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+            for i in range(0, len(staging_rows), STAGING_INSERT_BATCH_SIZE):
+                chunk = staging_rows[i : i + STAGING_INSERT_BATCH_SIZE]
+                values_sql = ", ".join([STAGING_ROW_SQL] * len(chunk))
+                cursor.execute(
+                    f"INSERT INTO {STAGING_TABLE} VALUES {values_sql}",
+                    [value for row in chunk for value in row],
+                )
+
+            cursor.execute(f"ANALYZE {STAGING_TABLE}")
+            cursor.execute(
+                RESOLVE_STAGED_DETECTIONS_SQL,
+                {
+                    "tile_set_id": self.tile_set.id,
+                    "clean_step": bool(self.clean_step),
+                    "threshold": PERCENTAGE_SAME_DETECTION_THRESHOLD,
+                    "zoom": TILE_DEFAULT_ZOOM,
+                },
+            )
+            return cursor.fetchall()
+
     def insert_detections(self, force=False):
         if (
             not force
@@ -436,26 +833,18 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         log_event(f"Inserting {len(self.detections_to_insert)} detections")
 
-        bulk_create_with_history(self.detection_objects_to_insert, DetectionObject)
-        bulk_create_with_history(self.detection_datas_to_insert, DetectionData)
-        bulk_create_with_history(self.detections_to_insert, Detection)
+        self._create_pending_tiles()
+        with suppress_count_cache_invalidation():
+            self._update_detection_objects()
+            bulk_create_with_history(self.detection_objects_to_insert, DetectionObject)
+            bulk_create_with_history(self.detection_datas_to_insert, DetectionData)
+            bulk_create_with_history(self.detections_to_insert, Detection)
 
-        # Re-fetch the distinct objects with their detections/tile_set/detection_data
-        # prefetched — compute_prescription reads all three, so the in-memory objects
-        # would otherwise trigger a fresh query storm per detection.
-        object_ids = list(
+        # One set-based recompute for every object this flush touched (new objects
+        # and existing ones that gained a detection).
+        PrescriptionService.compute_prescriptions(
             {detection.detection_object.id for detection in self.detections_to_insert}
         )
-        detection_objects = (
-            DetectionObject.objects.filter(id__in=object_ids)
-            .select_related("object_type")
-            .prefetch_related(
-                "detections", "detections__detection_data", "detections__tile_set"
-            )
-        )
-
-        for detection_object in detection_objects:
-            PrescriptionService.compute_prescription(detection_object=detection_object)
 
         self.total_inserted_detections += len(self.detections_to_insert)
 
@@ -475,6 +864,33 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         self.detection_objects_to_insert = []
         self.detection_datas_to_insert = []
         self.detections_to_insert = []
+        # what stays pending is the staged rows not flushed yet (none in practice:
+        # bulk mode only inserts right after emptying them)
+        self.pending_geometries_index.clear()
+        if self.clean_step:
+            for staged in self.staged_detections:
+                self.pending_geometries_index.add(
+                    staged.object_type.id, staged.geometry
+                )
+
+    def _update_detection_objects(self):
+        """Write the queued address backfills. bulk_update skips auto_now, so
+        updated_at is set here like save() would."""
+        if not self.detection_objects_to_update:
+            return
+
+        now = timezone.now()
+        detection_objects = list(self.detection_objects_to_update.values())
+        for detection_object in detection_objects:
+            detection_object.updated_at = now
+
+        bulk_update_with_history(
+            detection_objects,
+            DetectionObject,
+            ["address", "updated_at"],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        self.detection_objects_to_update = {}
 
     def _get_tile_set_geo_zone_ids_with_ancestors(self) -> List[int]:
         tile_set_geo_zones = list(
@@ -530,48 +946,26 @@ class Command(CommandRunTrackerMixin, BaseCommand):
     def associate_detections_to_custom_zones(self):
         tile_set_geo_zone_ids = self._get_tile_set_geo_zone_ids_with_ancestors()
 
-        custom_zones = (
+        custom_zone_ids = list(
             GeoCustomZone.objects.filter(
                 geo_zones__id__in=tile_set_geo_zone_ids,
                 geometry__isnull=False,
             )
+            .values_list("id", flat=True)
             .distinct()
-            .defer("geometry")
         )
 
-        if not custom_zones:
+        if not custom_zone_ids:
             log_event("No custom zones found for this tile set")
             return
 
-        log_event(f"Associating detections to {len(custom_zones)} custom zones")
-
-        for zone in custom_zones:
-            log_event(f"Associating detections to custom zone: {zone.name}")
-
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO core_detectionobject_geo_custom_zones (detectionobject_id, geocustomzone_id)
-                    SELECT DISTINCT
-                        dobj.id AS detectionobject_id,
-                        %s AS geocustomzone_id
-                    FROM
-                        core_detectionobject dobj
-                        JOIN core_detection detec ON detec.detection_object_id = dobj.id
-                    WHERE
-                        detec.batch_id = %s AND
-                        detec.tile_set_id = %s AND
-                        ST_Covers(
-                            (
-                                SELECT geozone.geometry
-                                FROM core_geozone geozone
-                                WHERE id = %s
-                            ),
-                            detec.geometry
-                        )
-                    ON CONFLICT DO NOTHING
-                    """,
-                    [zone.id, self.batch_id, self.tile_set.id, zone.id],
-                )
-
-            log_event(f"Done associating detections to custom zone: {zone.name}")
+        # One pass over this batch's detections for every zone and sub-zone, instead
+        # of one INSERT per zone.
+        GeoCustomZoneService.associate_detections_to_custom_zones(
+            custom_zone_ids=custom_zone_ids,
+            batch_ids=[self.batch_id],
+            tile_set_uuids=[self.tile_set.uuid],
+            log_event=log_event,
+            # handle() refreshes the whole tile set's statistics right after
+            refresh_statistics=False,
+        )
@@ -1,21 +1,22 @@
+import csv
+import io
 import json
+import multiprocessing
 import tempfile
 import time
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Tuple, TypedDict
 from django.core.management import call_command
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from django.utils import timezone
 from core.management.base import CommandRunTrackerMixin
-from datetime import datetime
-import gzip
 
 from core.management.commands._common.file import (
     download_file,
 )
-from core.models.geo_commune import GeoCommune
+from core.management.commands._common.geojson import GeoJSONFeatureReader
 from core.models.geo_department import GeoDepartment
-from django.contrib.gis.geos import GEOSGeometry
 
 from core.constants.geo import SRID
 from core.models.parcel import Parcel
@@ -24,7 +25,11 @@ from core.utils.cache import (
     suppress_count_cache_invalidation,
 )
 from core.services.deployed_data import DeployedDataService
-from core.utils.logs_helpers import log_command_event, log_command_progress
+from core.utils.logs_helpers import (
+    current_command_run_pk_var,
+    log_command_event,
+    log_command_progress,
+)
 
 
 # Etalab cadastre = same DGFiP data as IGN PARCELLAIRE-EXPRESS, already in WGS84
@@ -35,20 +40,91 @@ BASE_URL = (
 )
 BATCH_SIZE = 5000
 
+# Features are COPYed raw into a session-local staging table (temp tables are
+# unlogged) and turned into parcels by one INSERT ... SELECT: geometries are parsed
+# by PostGIS, not GEOS, and nothing is bound parameter by parameter.
+STAGING_TABLE = "import_parcels_staging"
+STAGING_COLUMNS = [
+    "id_parcellaire",
+    "commune_code",
+    "prefix",
+    "section",
+    "num_parcel",
+    "contenance",
+    "arpente",
+    "geometry",
+    "refreshed_at",
+]
+
+CREATE_STAGING_TABLE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    id_parcellaire text NOT NULL,
+    commune_code text NOT NULL,
+    prefix text NOT NULL,
+    section text NOT NULL,
+    num_parcel integer NOT NULL,
+    contenance integer NOT NULL,
+    arpente boolean NOT NULL,
+    geometry text NOT NULL,
+    refreshed_at date NOT NULL
+)
+"""
+
+# In CSV format an unquoted empty field is NULL by default, and csv.writer writes
+# "" unquoted: an explicit NULL marker keeps empty strings (e.g. an empty prefixe)
+# as empty strings.
+COPY_NULL = r"\N"
+COPY_STAGING_SQL = (
+    f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN "
+    f"WITH (FORMAT csv, NULL '{COPY_NULL}')"
+)
+
 # Refreshed on upsert; id_parcellaire (conflict target) and created_at stay put.
 # updated_at MUST stay here: the stale-prune keys off it (see import_department_parcels).
-UPSERT_UPDATE_FIELDS = [
+UPSERT_UPDATE_COLUMNS = [
     "prefix",
     "section",
     "num_parcel",
     "contenance",
     "arpente",
     "geometry",
-    "commune",
+    "commune_id",
     "refreshed_at",
     "updated_at",
 ]
 
+_UPSERT_SET_SQL = ", ".join(
+    f"{column} = EXCLUDED.{column}" for column in UPSERT_UPDATE_COLUMNS
+)
+
+# DISTINCT ON: a parcel listed twice would otherwise make ON CONFLICT update the
+# same row twice in one statement, which Postgres rejects. Staged rows whose commune
+# is not in the DB drop out of the JOIN (counted by MISSING_COMMUNES_SQL).
+UPSERT_FROM_STAGING_SQL = f"""
+INSERT INTO core_parcel (
+    uuid, created_at, updated_at, deleted, id_parcellaire, prefix, section,
+    num_parcel, contenance, arpente, geometry, commune_id, refreshed_at
+)
+SELECT DISTINCT ON (s.id_parcellaire)
+    gen_random_uuid(), %(now)s, %(now)s, false, s.id_parcellaire, s.prefix,
+    s.section, s.num_parcel, s.contenance, s.arpente,
+    ST_SetSRID(ST_GeomFromGeoJSON(s.geometry), %(srid)s), c.geozone_ptr_id,
+    s.refreshed_at
+FROM {STAGING_TABLE} s
+JOIN core_geocommune c ON c.iso_code = s.commune_code
+ORDER BY s.id_parcellaire
+ON CONFLICT (id_parcellaire) DO UPDATE SET
+    {_UPSERT_SET_SQL}
+"""
+
+MISSING_COMMUNES_SQL = f"""
+SELECT s.commune_code, COUNT(*)
+FROM {STAGING_TABLE} s
+LEFT JOIN core_geocommune c ON c.iso_code = s.commune_code
+WHERE c.geozone_ptr_id IS NULL
+GROUP BY s.commune_code
+"""
+
 
 class ParcelProperties(TypedDict):
     id: str
@@ -71,130 +147,170 @@ class Feature(TypedDict):
 
 def get_data_parcels(
     department: str,
-) -> Tuple[tempfile.TemporaryDirectory[str], List[Feature]]:
+) -> Tuple[tempfile.TemporaryDirectory[str], GeoJSONFeatureReader]:
     url = f"{BASE_URL}/{department}/cadastre-{department}-parcelles.json.gz"
     file_name = f"cadastre-{department}-parcelles.json.gz"
 
     temp_dir, file_path = download_file(url=url, file_name=file_name)
 
-    # ponytail: whole-file load (~2GB peak for the biggest departments, one at a
-    # time). Switch to ijson streaming if a department OOMs the worker.
-    with gzip.open(file_path, "rb") as file:
-        file_content = file.read()
-
-    return temp_dir, json.loads(file_content)["features"]
+    # Streamed feature by feature off the gzip file: the biggest departments are
+    # ~2GB decompressed, so nothing holds more than one batch of parcels.
+    return temp_dir, GeoJSONFeatureReader(file_path)
 
 
 def log_event(info: str):
     log_command_event(command_name="import_parcels", info=info)
 
 
-def _build_parcel(
-    feature: Feature, commune_by_code: Dict[str, GeoCommune]
-) -> Optional[Parcel]:
+def _staging_row(feature: Feature) -> List[Any]:
     properties = feature["properties"]
-    commune = commune_by_code.get(properties["commune"])
-    if not commune:
-        return None
-
-    geometry = GEOSGeometry(json.dumps(feature["geometry"]), srid=SRID)
-    refreshed_at = datetime.strptime(properties["updated"], "%Y-%m-%d").date()
-
-    return Parcel(
-        id_parcellaire=properties["id"],
-        prefix=properties["prefixe"],
-        section=properties["section"],
-        num_parcel=int(properties["numero"]),
-        contenance=properties.get("contenance") or 0,
-        arpente=properties.get("arpente", False),
-        geometry=geometry,
-        commune=commune,
-        refreshed_at=refreshed_at,
+    return [
+        properties["id"],
+        properties["commune"],
+        properties["prefixe"],
+        properties["section"],
+        int(properties["numero"]),
+        properties.get("contenance") or 0,
+        properties.get("arpente", False),
+        json.dumps(feature["geometry"]),
+        properties["updated"],
+    ]
+
+
+def _copy_to_staging(cursor, rows: List[List[Any]]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [COPY_NULL if value is None else value for value in row] for row in rows
     )
+    buffer.seek(0)
+    cursor.copy_expert(COPY_STAGING_SQL, buffer)
+
+
+def _estimate_total(features: Iterable[Feature], done: int) -> int:
+    if hasattr(features, "estimate_total"):
+        return features.estimate_total(done)
+    return len(features)
 
 
 def import_department_parcels(
-    department: str, features: List[Feature], dry_run: bool = False
+    department: str, features: Iterable[Feature], dry_run: bool = False
 ) -> Tuple[int, int, int]:
     """Upsert the department's parcels by id_parcellaire, then delete the
     department's parcels this run did not refresh (stale: merged/split away).
     Returns (upserted, deleted, skipped). Caller suppresses + then invalidates
     count caches (bulk paths bypass the post_save/post_delete signal). With
-    dry_run the work runs inside a rolled-back transaction (nothing persists)."""
-    communes = GeoCommune.objects.filter(
-        iso_code__in={feature["properties"]["commune"] for feature in features}
-    )
-    commune_by_code = {commune.iso_code: commune for commune in communes}
-
-    total = len(features)
+    dry_run the work runs inside a rolled-back transaction (nothing persists).
+    ``features`` is consumed once, in order, so it can be a stream."""
     start_time = time.monotonic()
-    # Marker for the stale-prune: every upsert bumps updated_at (auto_now) to a
-    # time strictly after this, so rows left with updated_at < marker are stale.
+    # Marker for the stale-prune: every upsert sets updated_at to a time strictly
+    # after this, so rows left with updated_at < marker are stale.
     run_started_at = timezone.now()
+    counters = {"total": 0, "upserted": 0, "deleted": 0}
 
-    missing_commune_codes = set()
-    batch: List[Parcel] = []
-    counters = {"upserted": 0, "parsed": 0}
-
-    def flush(done: int):
-        if not batch:
-            return
-        Parcel.objects.bulk_create(
-            batch,
-            update_conflicts=True,
-            unique_fields=["id_parcellaire"],
-            update_fields=UPSERT_UPDATE_FIELDS,
-            batch_size=BATCH_SIZE,
-        )
-        counters["upserted"] += len(batch)
-        batch.clear()
-        log_command_progress("import_parcels", done, total, start_time)
+    def stage(cursor):
+        cursor.execute(CREATE_STAGING_TABLE_SQL)
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
 
-    def run() -> int:
+        rows: List[List[Any]] = []
         for index, feature in enumerate(features, start=1):
-            parcel = _build_parcel(feature, commune_by_code)
-            if parcel is None:
-                missing_commune_codes.add(feature["properties"]["commune"])
-                continue
-            counters["parsed"] += 1
-            batch.append(parcel)
-            if len(batch) >= BATCH_SIZE:
-                flush(index)
-        flush(total)
+            counters["total"] = index
+            rows.append(_staging_row(feature))
+            if len(rows) >= BATCH_SIZE:
+                _copy_to_staging(cursor, rows)
+                rows.clear()
+                log_command_progress(
+                    "import_parcels",
+                    index,
+                    _estimate_total(features, index),
+                    start_time,
+                )
+        if rows:
+            _copy_to_staging(cursor, rows)
+
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+
+    def upsert(cursor):
+        cursor.execute(UPSERT_FROM_STAGING_SQL, {"now": timezone.now(), "srid": SRID})
+        counters["upserted"] = cursor.rowcount
+        log_command_progress(
+            "import_parcels", counters["total"], counters["total"], start_time
+        )
 
         # Prune by updated_at, NOT by id_parcellaire__in=fresh_ids: a real
         # department has >65535 parcels, which would blow past Postgres's
-        # per-statement parameter limit. Guarded so an empty/corrupt download
-        # (parsed == 0) can't wipe the whole department.
-        if not counters["parsed"]:
-            return 0
-        deleted, _ = Parcel.objects.filter(
+        # per-statement parameter limit. Through the ORM, not raw SQL, so the
+        # (few) stale parcels get their detection links SET_NULL and their
+        # custom-zone links cleared.
+        counters["deleted"], _ = Parcel.objects.filter(
             commune__department__insee_code=department,
             updated_at__lt=run_started_at,
         ).delete()
-        return deleted
 
-    with transaction.atomic():
-        deleted = run()
+    with transaction.atomic(), connection.cursor() as cursor:
+        stage(cursor)
+        cursor.execute(MISSING_COMMUNES_SQL)
+        missing_communes = dict(cursor.fetchall())
+        skipped = sum(missing_communes.values())
+
+        # Guarded so an empty/corrupt download (nothing parsed) can't wipe the
+        # whole department.
+        if counters["total"] > skipped:
+            upsert(cursor)
+
         if dry_run:
             transaction.set_rollback(True)
 
     upserted = counters["upserted"]
-    skipped = total - counters["parsed"]
+    deleted = counters["deleted"]
+    total = counters["total"]
     prefix = "DRY-RUN " if dry_run else ""
     log_event(
         f"{prefix}Department {department}: upserted {upserted}, "
         f"deleted {deleted} stale, skipped {skipped} (commune not in DB), "
         f"total features {total}"
     )
-    if missing_commune_codes:
+    if missing_communes:
         log_event(
             f"{prefix}Department {department}: communes not in DB (parcels skipped): "
-            f"{', '.join(sorted(missing_commune_codes))}"
+            f"{', '.join(sorted(missing_communes))}"
         )
     return upserted, deleted, skipped
 
 
+def import_department(department: str, dry_run: bool = False) -> Tuple[int, int]:
+    """Download and import one department, then re-link its detections if stale
+    parcels were pruned. Returns (upserted, deleted)."""
+    temp_dir, features = get_data_parcels(department=department)
+    try:
+        with suppress_count_cache_invalidation():
+            upserted, deleted, _ = import_department_parcels(
+                department, features, dry_run=dry_run
+            )
+    finally:
+        temp_dir.cleanup()
+
+    if dry_run:
+        return upserted, deleted
+
+    invalidate_count_caches()
+    if deleted:
+        # Pruned parcels SET_NULL their detection links; re-link the
+        # affected detections to the surviving (e.g. merged) parcels.
+        log_event(
+            f"Department {department}: re-linking detections after pruning "
+            f"{deleted} stale parcels"
+        )
+        call_command("update_detection_parcels", department_code=department)
+
+    return upserted, deleted
+
+
+def _init_worker():
+    # Workers are forked with the command's context: detach them from its CommandRun
+    # so they do not overwrite each other's progress — the parent reports it.
+    current_command_run_pk_var.set(None)
+
+
 class Command(CommandRunTrackerMixin, BaseCommand):
     help = "Import parcels to database from the Etalab cadastre (latest millésime)"
 
@@ -205,12 +321,22 @@ class Command(CommandRunTrackerMixin, BaseCommand):
             action="store_true",
             help="Download and analyse but roll back all writes (nothing persists)",
         )
+        parser.add_argument(
+            "--parallel",
+            type=int,
+            default=1,
+            help="Import this many departments at once, each in its own process "
+            "(from the CLI: ignored under a Celery worker, which cannot fork)",
+        )
 
     def handle(self, *args, **options):
         departments = options["department_code"]
         dry_run = options["dry_run"]
+        parallel = options["parallel"]
 
-        log_event(f"Starting importing parcels... (dry_run={dry_run})")
+        log_event(
+            f"Starting importing parcels... (dry_run={dry_run}, parallel={parallel})"
+        )
 
         if not departments:
             log_event(
@@ -222,36 +348,37 @@ class Command(CommandRunTrackerMixin, BaseCommand):
 
         log_event(f"Departments: {', '.join(departments)}")
 
-        deployed_data_dirty = False
+        known_departments = set(
+            GeoDepartment.objects.filter(insee_code__in=departments).values_list(
+                "insee_code", flat=True
+            )
+        )
         for department in departments:
-            if not GeoDepartment.objects.filter(insee_code=department).exists():
+            if department not in known_departments:
                 log_event(f"Department not found for code: {department}")
-                continue
-
-            temp_dir, features = get_data_parcels(department=department)
-            try:
-                with suppress_count_cache_invalidation():
-                    upserted, deleted, _ = import_department_parcels(
-                        department, features, dry_run=dry_run
-                    )
-            finally:
-                temp_dir.cleanup()
-
-            if dry_run:
-                continue
-
-            if upserted or deleted:
-                deployed_data_dirty = True
-
-            invalidate_count_caches()
-            if deleted:
-                # Pruned parcels SET_NULL their detection links; re-link the
-                # affected detections to the surviving (e.g. merged) parcels.
-                log_event(
-                    f"Department {department}: re-linking detections after pruning "
-                    f"{deleted} stale parcels"
-                )
-                call_command("update_detection_parcels", department_code=department)
+        departments = [
+            department for department in departments if department in known_departments
+        ]
+
+        if parallel > 1 and multiprocessing.current_process().daemon:
+            # run_management_command runs commands in a Celery prefork child, which
+            # is daemonic: it may not start the pool's processes.
+            log_event(
+                "--parallel ignored: the command runs in a daemonic process (a Celery "
+                "worker), importing departments one at a time"
+            )
+            parallel = 1
+
+        if parallel > 1:
+            deployed_data_dirty, failed_departments = self.import_parallel(
+                departments, dry_run, parallel
+            )
+        else:
+            deployed_data_dirty, failed_departments = False, []
+            for department in departments:
+                upserted, deleted = import_department(department, dry_run=dry_run)
+                if not dry_run and (upserted or deleted):
+                    deployed_data_dirty = True
 
         # Parcel counts feed the SUPER_ADMIN deployed-data dashboard, whose cache is
         # version-gated and otherwise only refreshed by warm_deployed_data_cache. Refresh
@@ -260,4 +387,47 @@ class Command(CommandRunTrackerMixin, BaseCommand):
             log_event("Refreshing deployed-data cache after parcels import")
             DeployedDataService.refresh_cache()
 
+        if failed_departments:
+            raise CommandError(
+                f"Parcels import failed for departments: {', '.join(failed_departments)}"
+            )
+
         log_event("Finished importing parcels")
+
+    def import_parallel(
+        self, departments: List[str], dry_run: bool, parallel: int
+    ) -> Tuple[bool, List[str]]:
+        """One department per task on a pool of forked processes, each with its own
+        DB connection and transaction. A failed department does not stop the others;
+        returns (deployed_data_dirty, failed departments)."""
+        # Forked children must not share the parent's DB socket: closing it here
+        # makes every process (the parent included) open its own on next query.
+        connections.close_all()
+
+        start_time = time.monotonic()
+        deployed_data_dirty = False
+        failed_departments = []
+        with ProcessPoolExecutor(
+            max_workers=parallel,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+        ) as executor:
+            futures = {
+                executor.submit(import_department, department, dry_run): department
+                for department in departments
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                department = futures[future]
+                try:
+                    upserted, deleted = future.result()
+                except Exception as error:
+                    log_event(f"Department {department}: import failed: {error}")
+                    failed_departments.append(department)
+                else:
+                    if not dry_run and (upserted or deleted):
+                        deployed_data_dirty = True
+                log_command_progress(
+                    "import_parcels", done, len(departments), start_time
+                )
+
+        return deployed_data_dirty, sorted(failed_departments)
@@ -22,7 +22,7 @@ from core.models.detection_data import (
 )
 from core.models.parcel import Parcel
 from core.utils.logs_helpers import log_command_event, log_command_progress
-from core.utils.cache import invalidate_count_caches
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from core.services.deployed_data import DeployedDataService
 from operator import or_
 from django.db.models import Q, Count, Prefetch
@@ -482,7 +482,15 @@ class Command(CommandRunTrackerMixin, BaseCommand):
             objs=detection_authorization_to_insert
         )
         # bulk_update / bulk_create bypass post_save; invalidate counts explicitly.
-        transaction.on_commit(invalidate_count_caches)
+        department_ids = get_count_cache_department_ids(
+            detection_object_ids=Detection.objects.filter(
+                detection_data_id__in=[
+                    detection_data.id
+                    for detection_data in detection_datas_to_update_map.values()
+                ]
+            ).values("detection_object_id")
+        )
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
         # Drives the one-shot deployed-data cache refresh at the end of handle().
         self._deployed_data_dirty = True
 
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.management.base import CommandRunTrackerMixin
+
+from core.services.detection_statistic import DetectionStatisticService
+from core.utils.logs_helpers import log_command_event
+
+
+def log_event(info: str):
+    log_command_event(command_name="refresh_detection_statistics", info=info)
+
+
+class Command(CommandRunTrackerMixin, BaseCommand):
+    help = (
+        "Rebuild the whole DetectionStatistic rollup behind the detection list "
+        "overview, commune by commune. The write paths keep it up to date afterwards: "
+        "run it once before enabling DETECTION_STATISTICS_ENABLED, and after any "
+        "out-of-band change to detections (manual SQL, restore)."
+    )
+
+    def handle(self, *args, **options):
+        started_at = time.time()
+        DetectionStatisticService.refresh_all(log_event=log_event)
+        log_event(f"Refreshed detection statistics in {time.time() - started_at:.1f}s")
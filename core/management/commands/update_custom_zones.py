@@ -19,6 +19,15 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         parser.add_argument("--zones-uuids", action="append", required=False)
         parser.add_argument("--batch-uuids", action="append", required=False)
         parser.add_argument("--tile-set-uuids", action="append", required=False)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help=(
+                "Associate detections by Detection.id ranges of this width instead of "
+                "in a single statement."
+            ),
+        )
 
     def handle(self, *args, **options):
         # The refresh itself lives in the service so `import_custom_zones --override`
@@ -27,5 +36,6 @@ class Command(CommandRunTrackerMixin, BaseCommand):
             zones_uuids=options["zones_uuids"],
             batch_ids=options["batch_uuids"],
             tile_set_uuids=options["tile_set_uuids"],
+            chunk_size=options["chunk_size"],
             log_event=log_event,
         )
@@ -3,15 +3,39 @@ import time
 from django.core.management.base import BaseCommand
 from core.management.base import CommandRunTrackerMixin
 from core.models.detection_object import DetectionObject
-from core.models.parcel import Parcel
-from django.contrib.gis.geos import GEOSGeometry
-from django.db import transaction
+from django.db import connection
 
 from core.utils.cache import invalidate_count_caches
 from core.utils.logs_helpers import log_command_event, log_command_progress
 
 BATCH_SIZE_DEFAULT = 1000
 
+# Set-based form of "take each object's first detection, find the parcel containing
+# its centroid", as update_detectionobject_commune does for communes. The LATERAL
+# keeps the lowest-id parcel when several overlap, like the `.first()` it replaces.
+UPDATE_SQL = """
+WITH first_detection AS (
+    SELECT DISTINCT ON (d.detection_object_id)
+        d.detection_object_id AS object_id,
+        ST_Centroid(d.geometry) AS centroid
+    FROM core_detection d
+    WHERE d.detection_object_id = ANY(%s)
+    ORDER BY d.detection_object_id, d.id
+)
+UPDATE core_detectionobject o
+SET parcel_id = p.id
+FROM first_detection fd
+CROSS JOIN LATERAL (
+    SELECT p.id
+    FROM core_parcel p
+    WHERE ST_Contains(p.geometry, fd.centroid)
+    ORDER BY p.id
+    LIMIT 1
+) p
+WHERE o.id = fd.object_id
+    AND o.parcel_id IS NULL
+"""
+
 
 def log_event(info: str):
     log_command_event(command_name="update_detection_parcels", info=info)
@@ -42,11 +66,9 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         department_code = options["department_code"]
         log_event("Starting updating parcel_id...")
 
-        detection_objects_queryset = (
-            DetectionObject.objects.prefetch_related("detections")
-            .filter(parcel=None)
-            .order_by("id")
-        )
+        detection_objects_queryset = DetectionObject.objects.filter(
+            parcel=None
+        ).order_by("id")
 
         if department_code:
             detection_objects_queryset = detection_objects_queryset.filter(
@@ -57,66 +79,39 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         total = detection_objects_queryset.count()
         log_event(f"Detection objects without parcel associated: {total}")
 
-        all_ids = list(detection_objects_queryset.values_list("id", flat=True))
-
         start_time = time.monotonic()
         processed_count = 0
         updated_count = 0
+        last_id = 0
+
+        # Keyset pagination: an object stays in the parcel=None filter when no parcel
+        # contains it, so paging by id (not by offset) is what moves past it.
+        while True:
+            batch_ids = list(
+                detection_objects_queryset.filter(id__gt=last_id).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
 
-        for i in range(0, len(all_ids), batch_size):
-            batch_ids = all_ids[i : i + batch_size]
-            detection_objects = DetectionObject.objects.prefetch_related(
-                "detections"
-            ).filter(id__in=batch_ids)
-
-            updated_detection_objects = []
-
-            for detection_object in detection_objects:
-                if not detection_object.detections.exists():
-                    continue
-
-                detection = detection_object.detections.first()
-                if not detection or not detection.geometry:
-                    continue
-
-                try:
-                    geom = detection.geometry
-                    if not isinstance(geom, GEOSGeometry):
-                        geom = GEOSGeometry(geom)
-
-                    centroid = geom.centroid
-
-                    parcel = Parcel.objects.filter(geometry__contains=centroid).first()
-
-                    if not parcel:
-                        continue
-
-                    detection_object.parcel_id = parcel.id
-                    updated_detection_objects.append(detection_object)
+            if not batch_ids:
+                break
 
-                except Exception as e:
-                    log_event(
-                        f"Error processing detection object {detection_object.id}: {e}"
-                    )
-                    continue
+            last_id = batch_ids[-1]
 
-            if updated_detection_objects:
-                with transaction.atomic():
-                    DetectionObject.objects.bulk_update(
-                        updated_detection_objects, ["parcel_id"]
-                    )
-                    # bulk_update bypasses post_save; invalidate counts explicitly.
-                    transaction.on_commit(invalidate_count_caches)
-                updated_count += len(updated_detection_objects)
+            with connection.cursor() as cursor:
+                cursor.execute(UPDATE_SQL, [batch_ids])
+                updated_count += cursor.rowcount
 
             processed_count += len(batch_ids)
             log_command_progress(
                 "update_detection_parcels", processed_count, total, start_time
             )
 
-            if processed_count >= total:
-                break
+        if updated_count:
+            # Raw SQL bypasses post_save; invalidate counts explicitly, once.
+            invalidate_count_caches()
 
         log_event(
-            f"Finished updating parcel_id. Total updated: {updated_count}/{total}"
+            f"Finished updating parcel_id. Total updated: {updated_count}/{total}, "
+            f"without a containing parcel: {processed_count - updated_count}"
         )
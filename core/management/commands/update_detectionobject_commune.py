@@ -6,6 +6,7 @@ from core.models.detection_object import DetectionObject
 from django.db import connection
 
 from core.services.deployed_data import DeployedDataService
+from core.services.detection_statistic import DetectionStatisticService
 from core.utils.cache import invalidate_count_caches
 
 from core.utils.logs_helpers import log_command_event, log_command_progress
@@ -106,6 +107,9 @@ class Command(CommandRunTrackerMixin, BaseCommand):
         if updated_count:
             # Raw SQL bypasses post_save; invalidate counts explicitly, once.
             invalidate_count_caches()
+            # The objects' previous communes are gone: rebuild every commune.
+            if DetectionStatisticService.is_enabled():
+                DetectionStatisticService.refresh_all(log_event=log_event)
 
             # The SUPER_ADMIN deployed-data dashboard aggregates detections per commune,
             # which is exactly what this command rewrites. Its cache is version-gated and
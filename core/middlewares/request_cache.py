@@ -0,0 +1,16 @@
+from core.utils.request_cache import request_cache_scope
+
+
+class RequestCacheMiddleware:
+    """Opens the request-scoped memo (core/utils/request_cache.py) around the view.
+
+    A StreamingHttpResponse body is consumed after this returns, so generators run
+    without a scope and simply recompute — never read a previous request's memo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_cache_scope():
+            return self.get_response(request)
@@ -0,0 +1,86 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0133_usergroup_feature_flags"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                (
+                    "export_type",
+                    models.CharField(
+                        choices=[
+                            ("DETECTION_LIST", "DETECTION_LIST"),
+                            ("PARCEL_LIST", "PARCEL_LIST"),
+                            ("GEO_CUSTOM_ZONE", "GEO_CUSTOM_ZONE"),
+                            ("TILE_SET", "TILE_SET"),
+                        ],
+                        max_length=255,
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict)),
+                ("scoped_user_group_uuid", models.UUIDField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "PENDING"),
+                            ("RUNNING", "RUNNING"),
+                            ("SUCCESS", "SUCCESS"),
+                            ("ERROR", "ERROR"),
+                            ("CANCELED", "CANCELED"),
+                        ],
+                        default="PENDING",
+                        max_length=255,
+                    ),
+                ),
+                ("run_started_at", models.DateTimeField(blank=True, null=True)),
+                ("run_ended_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "file",
+                    models.FileField(blank=True, null=True, upload_to="exports/"),
+                ),
+                ("error", models.TextField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "created_at"],
+                        name="core_export_user_created_idx",
+                    )
+                ],
+            },
+        ),
+    ]
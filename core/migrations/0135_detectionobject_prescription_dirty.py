@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-17
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block: this
+    # migration is non-atomic so the detection object table stays writable while
+    # the index builds during deploy. The column itself has a constant default, so
+    # adding it does not rewrite the table.
+    atomic = False
+
+    dependencies = [
+        ("core", "0134_exportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="detectionobject",
+            name="prescription_dirty",
+            field=models.BooleanField(default=False),
+        ),
+        # Partial: only the (few) objects waiting for a recompute are indexed.
+        AddIndexConcurrently(
+            model_name="detectionobject",
+            index=models.Index(
+                condition=models.Q(("prescription_dirty", True)),
+                fields=["object_type", "id"],
+                name="detobj_prescription_dirty_idx",
+            ),
+        ),
+    ]
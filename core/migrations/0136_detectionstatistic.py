@@ -0,0 +1,117 @@
+# Generated by Django 5.0.6 on 2026-10-17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The table starts empty: fill it with `manage.py refresh_detection_statistics`
+    # before enabling DETECTION_STATISTICS_ENABLED.
+    dependencies = [
+        ("core", "0135_detectionobject_prescription_dirty"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DetectionStatistic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "detection_validation_status",
+                    models.CharField(
+                        choices=[
+                            ("DETECTED_NOT_VERIFIED", "DETECTED_NOT_VERIFIED"),
+                            ("SUSPECT", "SUSPECT"),
+                            ("ILLEGAL", "ILLEGAL"),
+                            ("LEGITIMATE", "LEGITIMATE"),
+                            ("INVALIDATED", "INVALIDATED"),
+                        ],
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                (
+                    "detection_control_status",
+                    models.CharField(
+                        choices=[
+                            ("NOT_CONTROLLED", "NOT_CONTROLLED"),
+                            ("TO_CONTROL", "TO_CONTROL"),
+                            ("CONTROLLED_FIELD", "CONTROLLED_FIELD"),
+                            ("PRIOR_LETTER_SENT", "PRIOR_LETTER_SENT"),
+                            ("OFFICIAL_REPORT_DRAWN_UP", "OFFICIAL_REPORT_DRAWN_UP"),
+                            (
+                                "OBSERVARTION_REPORT_REDACTED",
+                                "OBSERVARTION_REPORT_REDACTED",
+                            ),
+                            (
+                                "ADMINISTRATIVE_CONSTRAINT",
+                                "ADMINISTRATIVE_CONSTRAINT",
+                            ),
+                            ("JUGEMENT", "JUGEMENT"),
+                            ("REHABILITATED", "REHABILITATED"),
+                        ],
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                (
+                    "detection_prescription_status",
+                    models.CharField(
+                        choices=[
+                            ("PRESCRIBED", "PRESCRIBED"),
+                            ("NOT_PRESCRIBED", "NOT_PRESCRIBED"),
+                        ],
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                (
+                    "detection_source",
+                    models.CharField(
+                        choices=[
+                            ("INTERFACE_DRAWN", "INTERFACE_DRAWN"),
+                            ("INTERFACE_FORCED_VISIBLE", "INTERFACE_FORCED_VISIBLE"),
+                            ("ANALYSIS", "ANALYSIS"),
+                        ],
+                        max_length=255,
+                    ),
+                ),
+                ("score_bucket", models.SmallIntegerField()),
+                ("in_custom_zone", models.BooleanField()),
+                ("detections_count", models.IntegerField()),
+                (
+                    "commune",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="detection_statistics",
+                        to="core.geocommune",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="detection_statistics",
+                        to="core.objecttype",
+                    ),
+                ),
+                (
+                    "tile_set",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="detection_statistics",
+                        to="core.tileset",
+                    ),
+                ),
+            ],
+        ),
+    ]
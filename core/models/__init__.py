@@ -14,6 +14,7 @@ from .detection import Detection, DetectionSource
 from .detection_data import DetectionData
 from .detection_object import DetectionObject
 from .detection_authorization import DetectionAuthorization
+from .detection_statistic import DetectionStatistic
 
 from .tile import Tile
 from .tile_set import TileSet, TileSetStatus, TileSetScheme, TileSetType
@@ -25,5 +26,6 @@ from .parcel import Parcel
 from .analytic_log import AnalyticLog
 
 from .command_run import CommandRun
+from .export_job import ExportJob, ExportJobType
 
 from .user_action_log import UserActionLog, UserActionLogAction
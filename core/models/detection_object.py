@@ -46,8 +46,15 @@ class DetectionObject(
         GeoSubCustomZone, related_name="detection_objects"
     )
     tile_sets = models.ManyToManyField(TileSet, through="Detection")
+    # set when something the prescription depends on changed outside the paths that
+    # recompute it right away (object type duration, tile set date); cleared by
+    # PrescriptionService.compute_prescriptions. compute_prescription --dirty-only
+    # only recomputes these objects.
+    prescription_dirty = models.BooleanField(default=False)
     history = HistoricalRecords(
-        bases=[HistoriedModelMixin], cascade_delete_history=True
+        bases=[HistoriedModelMixin],
+        cascade_delete_history=True,
+        excluded_fields=["prescription_dirty"],
     )
 
     class Meta:
@@ -71,4 +78,9 @@ class DetectionObject(
                 condition=models.Q(commune__isnull=False),
                 name="detobj_commune_id_idx",
             ),
+            models.Index(
+                fields=["object_type", "id"],
+                condition=models.Q(prescription_dirty=True),
+                name="detobj_prescription_dirty_idx",
+            ),
         ]
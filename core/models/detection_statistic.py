@@ -0,0 +1,62 @@
+from django.db import models
+
+from common.constants.models import DEFAULT_MAX_LENGTH
+from core.models.detection import DetectionSource
+from core.models.detection_data import (
+    DetectionControlStatus,
+    DetectionPrescriptionStatus,
+    DetectionValidationStatus,
+)
+from core.models.geo_commune import GeoCommune
+from core.models.object_type import ObjectType
+from core.models.tile_set import TileSet
+
+# score_bucket = floor(score * SCORE_BUCKET_SCALE): a score filter on a whole
+# percentage can be answered from the buckets exactly.
+SCORE_BUCKET_SCALE = 100
+
+
+class DetectionStatistic(models.Model):
+    """Number of detections per combination of the detection list's filter
+    dimensions, maintained by DetectionStatisticService so the list overview sums a
+    few indexed rows instead of joining every detection.
+
+    Rows are rebuilt per commune (a detection object's detections all share its
+    commune): one commune's rows are always computed together, from one snapshot.
+    """
+
+    commune = models.ForeignKey(
+        GeoCommune,
+        related_name="detection_statistics",
+        on_delete=models.CASCADE,
+        null=True,
+    )
+    tile_set = models.ForeignKey(
+        TileSet, related_name="detection_statistics", on_delete=models.CASCADE
+    )
+    object_type = models.ForeignKey(
+        ObjectType, related_name="detection_statistics", on_delete=models.CASCADE
+    )
+    # null only for the (legacy) detections without detection data
+    detection_validation_status = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH,
+        choices=DetectionValidationStatus.choices,
+        null=True,
+    )
+    detection_control_status = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH,
+        choices=DetectionControlStatus.choices,
+        null=True,
+    )
+    detection_prescription_status = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH,
+        choices=DetectionPrescriptionStatus.choices,
+        null=True,
+    )
+    detection_source = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH,
+        choices=DetectionSource.choices,
+    )
+    score_bucket = models.SmallIntegerField()
+    in_custom_zone = models.BooleanField()
+    detections_count = models.IntegerField()
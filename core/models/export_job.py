@@ -0,0 +1,47 @@
+from django.db import models
+
+from common.constants.models import DEFAULT_MAX_LENGTH
+from common.models.timestamped import TimestampedModelMixin
+from common.models.uuid import UuidModelMixin
+from core.models.command_run import CommandRunStatus
+from core.models.user import User
+
+
+class ExportJobType(models.TextChoices):
+    DETECTION_LIST = "DETECTION_LIST", "DETECTION_LIST"
+    PARCEL_LIST = "PARCEL_LIST", "PARCEL_LIST"
+    GEO_CUSTOM_ZONE = "GEO_CUSTOM_ZONE", "GEO_CUSTOM_ZONE"
+    TILE_SET = "TILE_SET", "TILE_SET"
+
+
+class ExportJob(TimestampedModelMixin, UuidModelMixin):
+    """An export run by the exports Celery queue instead of a web worker. The
+    export's query params are replayed as `user` (and the impersonated group, if
+    any), so the file holds exactly what the synchronous endpoint would return."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    export_type = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH, choices=ExportJobType.choices
+    )
+    params = models.JSONField(default=dict, blank=True)
+    scoped_user_group_uuid = models.UUIDField(null=True, blank=True)
+    status = models.CharField(
+        max_length=DEFAULT_MAX_LENGTH,
+        choices=CommandRunStatus.choices,
+        default=CommandRunStatus.PENDING,
+    )
+    run_started_at = models.DateTimeField(null=True, blank=True)
+    run_ended_at = models.DateTimeField(null=True, blank=True)
+    file = models.FileField(upload_to="exports/", null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"], name="core_export_user_created_idx"
+            ),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.export_type} ({self.uuid}) - {self.status}"
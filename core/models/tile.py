@@ -6,17 +6,19 @@ from django.contrib.gis.db import models as models_gis
 from django.core.validators import MinValueValidator
 from django.contrib.gis.geos import GEOSGeometry
 
-from core.utils.postgis import ST_TileEnvelope
+from core.utils.postgis import ST_TileEnvelope, ST_TileEnvelopes
 
 TILE_DEFAULT_ZOOM = 19
 
 
 class TileManager(models_gis.Manager):
     def bulk_create(self, objs, **kwargs):
-        for obj in objs:
-            obj.geometry = GEOSGeometry(ST_TileEnvelope(z=obj.z, x=obj.x, y=obj.y))
+        objs = list(objs)
+        envelopes = ST_TileEnvelopes([(obj.z, obj.x, obj.y) for obj in objs])
+        for obj, envelope in zip(objs, envelopes):
+            obj.geometry = GEOSGeometry(envelope)
 
-        super().bulk_create(objs, **kwargs)
+        return super().bulk_create(objs, **kwargs)
 
 
 class Tile(TimestampedModelMixin):
@@ -18,6 +18,7 @@ from rest_framework.exceptions import PermissionDenied, ValidationError
 
 from core.models.user import UserRole
 from core.models.user_group import UserGroup
+from core.utils.request_cache import request_memoize
 
 
 HEADER_NAME = "HTTP_X_USER_GROUP_UUID"
@@ -35,7 +36,8 @@ def resolve_scoped_user_group(request) -> Optional[UserGroup]:
     Returns `None` if the header is absent or the request has no authenticated
     user. Raises `PermissionDenied` (403) for non-SUPER_ADMIN users and
     `ValidationError` (400) for unknown UUIDs. The resolved value is cached on
-    the request object so repeated lookups within one request are free.
+    the request object (and in the request-scoped memo) so repeated lookups
+    within one request are free.
     """
     if request is None:
         return None
@@ -58,6 +60,17 @@ def resolve_scoped_user_group(request) -> Optional[UserGroup]:
             "Seuls les utilisateurs SUPER_ADMIN peuvent utiliser le filtrage par groupe"
         )
 
+    # The request attribute only covers this request object; views that hand a
+    # plain HttpRequest or a fresh DRF Request to services would resolve it again.
+    user_group = request_memoize(
+        ("scoped_user_group", user.id, user_group_uuid),
+        lambda: _get_scoped_user_group(user_group_uuid),
+    )
+    setattr(request, _REQUEST_CACHE_ATTR, user_group)
+    return user_group
+
+
+def _get_scoped_user_group(user_group_uuid: str) -> UserGroup:
     try:
         user_group = UserGroup.objects.filter(
             uuid=user_group_uuid, deleted=False
@@ -76,5 +89,4 @@ def resolve_scoped_user_group(request) -> Optional[UserGroup]:
             }
         )
 
-    setattr(request, _REQUEST_CACHE_ATTR, user_group)
     return user_group
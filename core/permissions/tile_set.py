@@ -18,6 +18,7 @@ from core.utils.cache import (
     TILESET_FILTER_CACHE_TTL,
 )
 from core.utils.postgis import GeometryType, GetGeometryType
+from core.utils.request_cache import request_memoize
 from django.db.models import QuerySet, Count, Case, When, F, FloatField
 from functools import reduce
 from operator import or_
@@ -184,6 +185,17 @@ class TileSetPermission(
             **kwargs,
         )
 
+    def get_last_detections_filters_detection_statistics(self, *args, **kwargs):
+        """Same filter on DetectionStatistic rows, which carry the commune and the
+        tile set of the detections they count (no geometry: not for
+        filter_tile_set_intersects_geometry)."""
+        return self._get_last_detections_filters(
+            detection_object_prefix="",
+            detection_prefix="",
+            *args,
+            **kwargs,
+        )
+
     def _get_last_detections_filters(
         self, detection_object_prefix: str, detection_prefix: str, *args, **kwargs
     ) -> Optional[Q]:
@@ -207,10 +219,13 @@ class TileSetPermission(
         cache_key = get_tileset_filter_cache_key(
             self.user.id, scoped_group_id, self._get_tileset_cache_hash(**kwargs)
         )
-        return get_or_compute(
+        return request_memoize(
             cache_key,
-            lambda: self._compute_tilesets(*args, **kwargs),
-            TILESET_FILTER_CACHE_TTL,
+            lambda: get_or_compute(
+                cache_key,
+                lambda: self._compute_tilesets(*args, **kwargs),
+                TILESET_FILTER_CACHE_TTL,
+            ),
         )
 
     def _compute_tilesets(self, *args, **kwargs) -> List[dict]:
@@ -11,10 +11,15 @@ from core.permissions.base import BasePermission
 from core.repository.base import CollectivityRepoFilter
 from core.repository.user import UserRepository
 from core.utils.cache import (
+    decode_geometry,
+    encode_geometry,
     get_or_compute,
     get_user_geo_cache_key,
+    user_geo_local_cache,
     USER_GEO_CACHE_TTL,
+    USER_GEO_SIMPLIFY_TOLERANCE,
 )
+from core.utils.request_cache import request_memoize
 
 from django.contrib.gis.geos import Point
 from django.contrib.gis.geos.collections import MultiPolygon
@@ -140,9 +145,9 @@ class UserPermission(
             ],
         )
 
-    def _compute_accessible_union(self) -> Optional[MultiPolygon]:
-        """Union of the user's accessible geo-zone geometries (the cached value).
-        Returns None for an empty/absent union so it is not cached."""
+    def _compute_accessible_union(self) -> Optional[bytes]:
+        """Encoded union of the user's accessible geo-zone geometries (the cached
+        value). Returns None for an empty/absent union so it is not cached."""
         union = (
             self.accessible_geo_zones()
             .aggregate(result=Union("geometry"))
@@ -150,28 +155,78 @@ class UserPermission(
         )
         if union is None or union.empty:
             return None
-        return union
+        return encode_geometry(union)
+
+    def _compute_simplified_union(self) -> Optional[bytes]:
+        """Encoded simplified tier, derived from the (cached) full-resolution union."""
+        accessible_union = self._get_accessible_union()
+        if accessible_union is None:
+            return None
+        union, _ = accessible_union
+        return encode_geometry(
+            union.simplify(USER_GEO_SIMPLIFY_TOLERANCE, preserve_topology=True)
+        )
+
+    def _get_accessible_union(
+        self, simplified: bool = False
+    ) -> Optional[Tuple[MultiPolygon, object]]:
+        """(union, prepared union) of the requested tier, read from the process-local
+        LRU before the shared cache so hot users skip both the transfer and the
+        decoding of the union."""
+        scoped_group_id = self.scoped_user_group.id if self.scoped_user_group else None
+        cache_key = get_user_geo_cache_key(
+            self.user.id, scoped_group_id, simplified=simplified
+        )
+
+        accessible_union = user_geo_local_cache.get(cache_key)
+        if accessible_union is not None:
+            return accessible_union
+
+        encoded_union = get_or_compute(
+            cache_key,
+            self._compute_simplified_union
+            if simplified
+            else self._compute_accessible_union,
+            USER_GEO_CACHE_TTL,
+        )
+        if encoded_union is None:
+            return None
+
+        union = decode_geometry(encoded_union)
+        accessible_union = (union, union.prepared)
+        user_geo_local_cache.set(cache_key, accessible_union)
+        return accessible_union
 
     def get_accessible_geometry(
         self,
         intersects_geometry: Optional[MultiPolygon] = None,
         bbox: Optional[bool] = False,
+        simplified: Optional[bool] = False,
     ) -> Optional[MultiPolygon]:
+        """Accessible area, optionally clipped to ``intersects_geometry``.
+
+        ``simplified`` (implied by ``bbox``) reads the simplified tier: its outline is
+        off by up to USER_GEO_SIMPLIFY_TOLERANCE, so it is only for coarse uses such
+        as framing the map, never for filtering what the user may see.
+        """
         if self.is_unrestricted():
             return intersects_geometry
 
-        scoped_group_id = self.scoped_user_group.id if self.scoped_user_group else None
-        cache_key = get_user_geo_cache_key(self.user.id, scoped_group_id)
-        base_union = get_or_compute(
-            cache_key, self._compute_accessible_union, USER_GEO_CACHE_TTL
-        )
-        if base_union is None:
+        accessible_union = self._get_accessible_union(simplified=simplified or bbox)
+        if accessible_union is None:
             return None
 
-        result = base_union
+        result, prepared = accessible_union
         if intersects_geometry:
             try:
-                result = result.intersection(intersects_geometry)
+                # The prepared union answers the common map cases (viewport outside
+                # or fully inside the user's zones) without computing an overlay.
+                if not prepared.intersects(intersects_geometry):
+                    return None
+                if prepared.contains(intersects_geometry):
+                    result = intersects_geometry
+                else:
+                    result = result.intersection(intersects_geometry)
             except Exception:
                 # GEOS can raise (e.g. TopologyException) on a self-intersecting IGN
                 # union. This is the only non-PostGIS geometry op in the map hot path
@@ -202,6 +257,17 @@ class UserPermission(
 
     def get_user_object_types_with_status(
         self,
+    ) -> List[Tuple[ObjectType, ObjectTypeCategoryObjectTypeStatus]]:
+        scoped_group_id = self.scoped_user_group.id if self.scoped_user_group else None
+        return list(
+            request_memoize(
+                ("user_object_types", self.user.id, scoped_group_id),
+                self._compute_user_object_types_with_status,
+            )
+        )
+
+    def _compute_user_object_types_with_status(
+        self,
     ) -> List[Tuple[ObjectType, ObjectTypeCategoryObjectTypeStatus]]:
         if self.is_unrestricted():
             object_types = ObjectType.objects.order_by("name").all()
@@ -122,6 +122,20 @@ def collectivity_q(
     return q
 
 
+def collectivity_department_ids(
+    filter_collectivities: CollectivityRepoFilter,
+) -> List[int]:
+    """Departments of the communes collectivity_q matches: the rows it keeps all
+    belong to them."""
+    from core.models.geo_commune import GeoCommune
+
+    return sorted(
+        GeoCommune.objects.filter(collectivity_q(filter_collectivities))
+        .values_list("department_id", flat=True)
+        .distinct()
+    )
+
+
 class TimestampedBaseRepositoryMixin(
     Generic[T_UUID_MODEL],
 ):
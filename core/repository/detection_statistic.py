@@ -0,0 +1,117 @@
+from typing import List, Optional
+from django.db.models import Q, QuerySet
+
+from core.models.detection import DetectionSource
+from core.models.detection_data import (
+    DetectionControlStatus,
+    DetectionPrescriptionStatus,
+    DetectionValidationStatus,
+)
+from core.models.detection_statistic import DetectionStatistic
+from core.repository.base import (
+    BaseRepository,
+    CollectivityRepoFilter,
+    collectivity_q,
+)
+from core.repository.detection import RepoFilterInterfaceDrawn
+
+
+class DetectionStatisticRepository(BaseRepository[DetectionStatistic]):
+    """Filters DetectionStatistic rows with the semantics DetectionRepository gives
+    the same filters on detections, for the dimensions the rollup keeps."""
+
+    def __init__(self, initial_queryset: Optional[QuerySet[DetectionStatistic]] = None):
+        self.model = DetectionStatistic
+        self.initial_queryset = (
+            initial_queryset if initial_queryset is not None else self.model.objects
+        )
+
+    def filter_(
+        self,
+        queryset: QuerySet[DetectionStatistic],
+        filter_collectivities: Optional[CollectivityRepoFilter] = None,
+        filter_score_bucket_gte: Optional[int] = None,
+        filter_object_type_uuid_in: Optional[List[str]] = None,
+        filter_in_custom_zone: Optional[RepoFilterInterfaceDrawn] = None,
+        filter_detection_validation_status_in: Optional[
+            List[DetectionValidationStatus]
+        ] = None,
+        filter_detection_control_status_in: Optional[
+            List[DetectionControlStatus]
+        ] = None,
+        filter_prescribed: Optional[bool] = None,
+        *args,
+        **kwargs,
+    ) -> QuerySet[DetectionStatistic]:
+        if filter_collectivities is not None and not filter_collectivities.is_empty():
+            queryset = queryset.filter(
+                collectivity_q(filter_collectivities, "commune__")
+            )
+
+        if filter_score_bucket_gte is not None:
+            queryset = queryset.filter(
+                Q(score_bucket__gte=filter_score_bucket_gte)
+                | Q(
+                    detection_source__in=[
+                        DetectionSource.INTERFACE_DRAWN,
+                        DetectionSource.INTERFACE_FORCED_VISIBLE,
+                    ]
+                )
+            )
+
+        if filter_object_type_uuid_in is not None:
+            queryset = queryset.filter(object_type__uuid__in=filter_object_type_uuid_in)
+
+        queryset = self._filter_in_custom_zone(
+            queryset=queryset, filter_in_custom_zone=filter_in_custom_zone
+        )
+
+        if filter_detection_validation_status_in is not None:
+            queryset = queryset.filter(
+                detection_validation_status__in=filter_detection_validation_status_in
+            )
+
+        if filter_detection_control_status_in is not None:
+            queryset = queryset.filter(
+                detection_control_status__in=filter_detection_control_status_in
+            )
+
+        if filter_prescribed:
+            queryset = queryset.filter(
+                detection_prescription_status=DetectionPrescriptionStatus.PRESCRIBED
+            )
+
+        if filter_prescribed is False:
+            queryset = queryset.filter(
+                Q(
+                    detection_prescription_status=DetectionPrescriptionStatus.NOT_PRESCRIBED
+                )
+                | Q(detection_prescription_status=None)
+            )
+
+        return queryset
+
+    @staticmethod
+    def _filter_in_custom_zone(
+        queryset: QuerySet[DetectionStatistic],
+        filter_in_custom_zone: Optional[RepoFilterInterfaceDrawn] = None,
+    ) -> QuerySet[DetectionStatistic]:
+        """Detections in any custom zone: DetectionRepository's custom-zone filter
+        when the selected zones are all the zones detections are linked to."""
+        if filter_in_custom_zone is None:
+            return queryset
+
+        if filter_in_custom_zone == RepoFilterInterfaceDrawn.ALL:
+            return queryset.filter(
+                Q(in_custom_zone=True)
+                | Q(detection_source=DetectionSource.INTERFACE_DRAWN)
+            )
+
+        queryset = queryset.filter(in_custom_zone=True)
+
+        if filter_in_custom_zone == RepoFilterInterfaceDrawn.NONE:
+            queryset = queryset.exclude(
+                detection_source=DetectionSource.INTERFACE_DRAWN
+            )
+
+        return queryset
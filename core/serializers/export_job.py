@@ -0,0 +1,34 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from core.models.command_run import CommandRunStatus
+from core.models.export_job import ExportJob, ExportJobType
+from core.serializers import UuidTimestampedModelSerializerMixin
+
+
+class ExportJobSerializer(UuidTimestampedModelSerializerMixin):
+    class Meta(UuidTimestampedModelSerializerMixin.Meta):
+        model = ExportJob
+        fields = UuidTimestampedModelSerializerMixin.Meta.fields + [
+            "export_type",
+            "params",
+            "status",
+            "run_started_at",
+            "run_ended_at",
+            "error",
+            "download_url",
+        ]
+
+    download_url = serializers.SerializerMethodField()
+
+    def get_download_url(self, obj: ExportJob):
+        if obj.status != CommandRunStatus.SUCCESS or not obj.file:
+            return None
+
+        url = reverse("ExportJobViewSet-download", kwargs={"uuid": obj.uuid})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
+class ExportJobParamsSerializer(serializers.Serializer):
+    exportType = serializers.ChoiceField(choices=ExportJobType.choices)
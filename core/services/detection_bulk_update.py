@@ -4,7 +4,8 @@ from django.db import transaction
 from core.models.detection import Detection
 from core.models.object_type import ObjectType
 from core.permissions.detection import DetectionPermission
-from core.utils.cache import invalidate_count_caches
+from core.services.detection_statistic import DetectionStatisticService
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from django.core.exceptions import BadRequest
 
 
@@ -48,6 +49,20 @@ class DetectionBulkUpdateService:
                 self._get_columns_to_persist(detection_data_fields_to_update)
                 + ["user_last_update"],
             )
+            # bulk_update bypasses post_save; list/parcel counts are filtered by
+            # these fields, so invalidate explicitly. on_commit because this runs
+            # inside the service's @transaction.atomic.
+            department_ids = get_count_cache_department_ids(
+                detection_object_ids=[
+                    detection.detection_object_id for detection in detections
+                ]
+            )
+            transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+            DetectionStatisticService.schedule_refresh(
+                commune_ids={
+                    detection.detection_object.commune_id for detection in detections
+                }
+            )
 
         return detections
 
@@ -132,9 +147,3 @@ class DetectionBulkUpdateService:
             bulk_update_with_history(
                 detection_objects_to_update, DetectionObject, ["object_type"]
             )
-
-        if detection_datas_to_update or detection_objects_to_update:
-            # bulk_update bypasses post_save; list/parcel counts are filtered by
-            # these fields, so invalidate explicitly. on_commit because this runs
-            # inside the service's @transaction.atomic.
-            transaction.on_commit(invalidate_count_caches)
@@ -79,7 +79,9 @@ class DetectionGeoFilterService:
         sw_lat = filter_params.get("swLat")
         sw_lng = filter_params.get("swLng")
 
-        if not all([ne_lat, ne_lng, sw_lat, sw_lng]):
+        # `is None`, not falsiness: a tile on the Greenwich meridian or the equator
+        # has a 0.0 bound
+        if any(bound in (None, "") for bound in [ne_lat, ne_lng, sw_lat, sw_lng]):
             return None
 
         polygon = Polygon.from_bbox((sw_lng, sw_lat, ne_lng, ne_lat))
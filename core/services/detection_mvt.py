@@ -0,0 +1,73 @@
+import math
+from typing import Tuple
+
+from django.contrib.gis.db.models.functions import Transform
+from django.db import connection
+from django.db.models import F, QuerySet, Value
+
+from core.utils.postgis import AsMVTGeom, TileEnvelope
+
+# Web Mercator, the projection of ST_TileEnvelope and of every vector tile.
+MVT_SRID = 3857
+MVT_LAYER_NAME = "detections"
+MVT_EXTENT = 4096
+MVT_MAX_ZOOM = 22
+
+# Same properties as DetectionMinimalSerializer, so the map styles the tiles the way
+# it styles the GeoJSON features.
+MVT_PROPERTIES = {
+    "object_type_uuid": F("detection_object__object_type__uuid"),
+    "object_type_color": F("detection_object__object_type__color"),
+    "detection_control_status": F("detection_data__detection_control_status"),
+    "detection_validation_status": F("detection_data__detection_validation_status"),
+    "detection_prescription_status": F("detection_data__detection_prescription_status"),
+    "detection_object_uuid": F("detection_object__uuid"),
+    "tile_set_type": F("tile_set__tile_set_type"),
+}
+
+
+class DetectionMvtService:
+    """Encodes already-filtered detections as a Mapbox Vector Tile. Filtering and
+    permission scoping stay with DetectionGeoFilter: this only renders its queryset."""
+
+    @staticmethod
+    def is_valid_tile(z: int, x: int, y: int) -> bool:
+        return 0 <= z <= MVT_MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+    @staticmethod
+    def get_tile_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+        """(sw_lng, sw_lat, ne_lng, ne_lat) of the tile: the inverse of
+        core.utils.tile.slippy_tile_xy."""
+        n = 2**z
+
+        def lng(tile_x: int) -> float:
+            return tile_x / n * 360.0 - 180.0
+
+        def lat(tile_y: int) -> float:
+            return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+        return lng(x), lat(y + 1), lng(x + 1), lat(y)
+
+    @staticmethod
+    def get_tile(queryset: QuerySet, z: int, x: int, y: int) -> bytes:
+        queryset = (
+            queryset.order_by()
+            .annotate(
+                geom=AsMVTGeom(
+                    Transform("geometry", MVT_SRID),
+                    TileEnvelope(Value(z), Value(x), Value(y)),
+                ),
+                **MVT_PROPERTIES,
+            )
+            .values("uuid", "geom", *MVT_PROPERTIES.keys())
+        )
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT ST_AsMVT(tile, %s, %s, 'geom') FROM ({sql}) AS tile",
+                [MVT_LAYER_NAME, MVT_EXTENT, *params],
+            )
+            row = cursor.fetchone()
+
+        return bytes(row[0]) if row and row[0] else b""
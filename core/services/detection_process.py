@@ -1,5 +1,10 @@
-from datetime import datetime, date
-from typing import List, Literal, Union
+from typing import Any, Dict, List, Literal, Tuple, Union
+
+from django.contrib.gis.geos import GEOSGeometry
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 
 from core.models.detection import Detection, DetectionSource
 from core.models.detection_data import (
@@ -8,154 +13,259 @@ from core.models.detection_data import (
     DetectionPrescriptionStatus,
     DetectionValidationStatus,
 )
-from core.models.detection_object import DetectionObject
 from core.models.tile import TILE_DEFAULT_ZOOM, Tile
-from django.contrib.gis.geos import MultiPolygon
-
-from django.db.models import Prefetch, Sum, Case, When, IntegerField
-from django.contrib.gis.db.models.functions import Centroid
+from core.services.detection_statistic import DetectionStatisticService
 
 from core.utils.cache import (
+    get_count_cache_department_ids,
     invalidate_count_caches,
     suppress_count_cache_invalidation,
 )
 from core.utils.logs_helpers import log_command_event
+from core.utils.tile import slippy_tile_xy
+
+MERGE_CHUNK_SIZE = 1000
+
+# One row per duplicated object of the chunk, with everything the merge needs. The
+# kept detection is the best-scored one; each status is the highest-priority value of
+# the group (ranked by the CASE built from VALUE_PRIORITY_MAP); the last update is
+# taken from the most recently updated DetectionData. Ties fall to the lowest id.
+# {..._rank} placeholders are filled by _merge_groups_sql.
+_MERGE_GROUPS_SQL = """
+    SELECT
+        detec.detection_object_id,
+        (ARRAY_AGG(detec.id ORDER BY detec.score DESC, detec.id))[1],
+        ARRAY_AGG(detec.id),
+        ARRAY_AGG(detec.detection_data_id),
+        COUNT(DISTINCT detec.tile_id) > 1,
+        ST_Envelope(ST_Collect(detec.geometry)),
+        ST_X(ST_Centroid(ST_Envelope(ST_Collect(detec.geometry)))),
+        ST_Y(ST_Centroid(ST_Envelope(ST_Collect(detec.geometry)))),
+        (ARRAY_AGG(detec.detection_source ORDER BY {source_rank}, detec.id))[1],
+        (ARRAY_AGG(
+            data.detection_control_status ORDER BY {control_rank}, detec.id
+        ))[1],
+        (ARRAY_AGG(
+            data.detection_validation_status ORDER BY {validation_rank}, detec.id
+        ))[1],
+        (ARRAY_AGG(
+            data.detection_prescription_status ORDER BY {prescription_rank}, detec.id
+        ))[1],
+        BOOL_OR(detec.auto_prescribed),
+        (ARRAY_AGG(
+            data.updated_at ORDER BY data.updated_at DESC NULLS LAST, detec.id
+        ))[1],
+        (ARRAY_AGG(
+            data.user_last_update_id ORDER BY data.updated_at DESC NULLS LAST, detec.id
+        ))[1],
+        MAX(data.official_report_date)
+    FROM core_detection detec
+    JOIN core_detectiondata data ON data.id = detec.detection_data_id
+    WHERE
+        detec.tile_set_id = %s
+        AND detec.detection_object_id = ANY(%s)
+    GROUP BY detec.detection_object_id
+"""
+
+
+def _priority_rank_sql(column: str, property: str) -> Tuple[str, List[Any]]:
+    """SQL twin of the ranking in extract_higest_priority_value: the value's rank in
+    VALUE_PRIORITY_MAP, 999 for any value it does not list (NULL included)."""
+    priorities = VALUE_PRIORITY_MAP[property]
+    whens = " ".join(["WHEN %s THEN %s"] * len(priorities))
+    params = [item for value, rank in priorities.items() for item in (value, rank)]
+    return f"CASE {column} {whens} ELSE 999 END", params
+
+
+def _merge_groups_sql() -> Tuple[str, List[Any]]:
+    ranks = {}
+    params = []
+    # same order as the placeholders appear in _MERGE_GROUPS_SQL
+    for placeholder, column, property in [
+        ("source_rank", "detec.detection_source", "detection_source"),
+        ("control_rank", "data.detection_control_status", "detection_control_status"),
+        (
+            "validation_rank",
+            "data.detection_validation_status",
+            "detection_validation_status",
+        ),
+        (
+            "prescription_rank",
+            "data.detection_prescription_status",
+            "detection_prescription_status",
+        ),
+    ]:
+        ranks[placeholder], rank_params = _priority_rank_sql(column, property)
+        params += rank_params
+    return _MERGE_GROUPS_SQL.format(**ranks), params
 
 
 class DetectionProcessService:
     """Service for handling detection database processes"""
 
     @staticmethod
-    def merge_double_detections(tile_set_id: int):
-        detection_objects = (
-            DetectionObject.objects.annotate(
-                detections_count=Sum(
-                    Case(
-                        When(detections__tile_set__id=tile_set_id, then=1),
-                        default=0,
-                        output_field=IntegerField(),
-                    )
-                )
+    def merge_double_detections(tile_set_id: int, chunk_size: int = MERGE_CHUNK_SIZE):
+        """Merge the detections of `tile_set_id` attached to the same DetectionObject
+        into one: the best-scored detection is kept, with the envelope of the group,
+        the highest-priority statuses (VALUE_PRIORITY_MAP) and the latest update; the
+        others are deleted.
+
+        Works on chunks of `chunk_size` objects: one grouped query computes every
+        merge of the chunk, then the kept rows are written with bulk updates and the
+        others removed with one delete."""
+        duplicated_object_ids = list(
+            Detection.objects.filter(tile_set_id=tile_set_id)
+            .values("detection_object_id")
+            .annotate(detections_count=Count("id"))
+            .filter(detections_count__gt=1)
+            .order_by("detection_object_id")
+            .values_list("detection_object_id", flat=True)
+        )
+
+        log_command_event(
+            "merge_double_detections",
+            f"started: {len(duplicated_object_ids)} objects to merge",
+        )
+
+        sql, rank_params = _merge_groups_sql()
+        for start in range(0, len(duplicated_object_ids), chunk_size):
+            object_ids = duplicated_object_ids[start : start + chunk_size]
+            with connection.cursor() as cursor:
+                cursor.execute(sql, rank_params + [tile_set_id, object_ids])
+                groups = cursor.fetchall()
+
+            # Per-row deletes fire the count-cache signal once per row; suppress it
+            # here and invalidate once after the loop (see invalidate below).
+            with transaction.atomic(), suppress_count_cache_invalidation():
+                DetectionProcessService._apply_merges(groups)
+
+            log_command_event(
+                "merge_double_detections",
+                f"processed {start + len(object_ids)} objects",
             )
-            .filter(detections__tile_set__id=tile_set_id, detections_count__gt=1)
-            .prefetch_related(
-                Prefetch(
-                    "detections",
-                    queryset=Detection.objects.filter(
-                        tile_set__id=tile_set_id,
-                    ),
-                ),
-                "detections__tile_set",
-                "detections__tile",
-                "detections__detection_data",
+
+        invalidate_count_caches(
+            get_count_cache_department_ids(detection_object_ids=duplicated_object_ids)
+        )
+        DetectionStatisticService.refresh_detection_objects(duplicated_object_ids)
+        log_command_event("merge_double_detections", "finished")
+
+    @staticmethod
+    def _apply_merges(groups: List[Tuple]) -> None:
+        keep_ids = [group[1] for group in groups]
+        detections_to_keep: Dict[int, Detection] = Detection.objects.in_bulk(keep_ids)
+        detections_data_to_keep: Dict[int, DetectionData] = (
+            DetectionData.objects.in_bulk(
+                [
+                    detection.detection_data_id
+                    for detection in detections_to_keep.values()
+                ]
             )
-            .defer("detections__tile__geometry")
         )
 
-        log_command_event("merge_double_detections", "started")
+        # Tile.geometry is ST_TileEnvelope(z, x, y): the tile holding the merged
+        # envelope's centroid is found by index, for every group of the chunk at once.
+        tile_xys = {
+            group[0]: slippy_tile_xy(group[6], group[7], TILE_DEFAULT_ZOOM)
+            for group in groups
+            if group[4]
+        }
+        tile_ids_by_xy = {}
+        if tile_xys:
+            tile_ids_by_xy = {
+                (x, y): tile_id
+                for tile_id, x, y in Tile.objects.filter(
+                    z=TILE_DEFAULT_ZOOM,
+                    x__in={x for x, _ in tile_xys.values()},
+                    y__in={y for _, y in tile_xys.values()},
+                ).values_list("id", "x", "y")
+            }
 
-        for index, detection_object in enumerate(detection_objects.all()):
-            if index % 500 == 0:
-                log_command_event(
-                    "merge_double_detections", f"processed {index} objects"
-                )
+        now = timezone.now()
+        ids_to_delete = []
+        data_ids_to_delete = []
+        tiles_not_found = 0
 
-            detections = detection_object.detections.all()
-            detections_data = [detection.detection_data for detection in detections]
-            detection_to_keep = max(detections, key=lambda detec: detec.score)
+        for (
+            detection_object_id,
+            keep_id,
+            detection_ids,
+            detection_data_ids,
+            tiles_differ,
+            envelope,
+            _centroid_x,
+            _centroid_y,
+            detection_source,
+            control_status,
+            validation_status,
+            prescription_status,
+            auto_prescribed,
+            last_updated_at,
+            last_user_update_id,
+            official_report_date,
+        ) in groups:
+            detection_to_keep = detections_to_keep[keep_id]
+            detection_data = detections_data_to_keep[
+                detection_to_keep.detection_data_id
+            ]
 
-            # Only the bounding box is kept, so skip the expensive unary_union dissolve
+            # Only the bounding box is kept, so skip the expensive union dissolve
             # (which can spin for hours on overlapping/invalid polygons) — the envelope
             # of the collection equals the envelope of its union.
-            new_geometry = MultiPolygon(
-                [detec.geometry for detec in detections]
-            ).envelope
-            detection_to_keep.geometry = new_geometry
-
-            detection_to_keep.detection_source = extract_higest_priority_value(
-                detections, "detection_source"
-            )
-            detection_to_keep.detection_data.set_detection_control_status(
-                extract_higest_priority_value(
-                    detections_data, "detection_control_status"
-                )
-            )
-            detection_to_keep.detection_data.detection_validation_status = (
-                extract_higest_priority_value(
-                    detections_data, "detection_validation_status"
-                )
-            )
-            detection_to_keep.detection_data.detection_prescription_status = (
-                extract_higest_priority_value(
-                    detections_data, "detection_prescription_status"
-                )
-            )
-
-            detection_to_keep.auto_prescribed = any(
-                [detection.auto_prescribed for detection in detections]
-            )
+            detection_to_keep.geometry = GEOSGeometry(envelope)
+            detection_to_keep.detection_source = detection_source
+            detection_to_keep.auto_prescribed = auto_prescribed
+            detection_to_keep.updated_at = now
 
             # tile: if all detections are associated to same tile, we do not change anything
-            if not all(
-                detection.tile.id == detections[0].tile.id for detection in detections
-            ):
-                centroid = Centroid(new_geometry)
-                tile = Tile.objects.filter(
-                    geometry__contains=centroid, z=TILE_DEFAULT_ZOOM
-                ).first()
-
-                if not tile:
-                    print("TILE NOT FOUND")
-
-                if tile:
-                    detection_to_keep.tile = tile
-
-            detection_last_updated = max(
-                detections,
-                key=lambda detec: detec.detection_data.updated_at or datetime.min,
-            )
-            detection_to_keep.detection_data.updated_at = (
-                detection_last_updated.detection_data.updated_at
-            )
-            detection_to_keep.detection_data.user_last_update = (
-                detection_last_updated.detection_data.user_last_update
-            )
+            if tiles_differ:
+                tile_id = tile_ids_by_xy.get(tile_xys[detection_object_id])
+                if tile_id is None:
+                    tiles_not_found += 1
+                else:
+                    detection_to_keep.tile_id = tile_id
 
-            if not all(
-                detection.detection_data.official_report_date is None
-                for detection in detections
-            ):
-                detection_to_keep.detection_data.official_report_date = max(
-                    [
-                        detection.detection_data.official_report_date or date.min
-                        for detection in detections
-                    ]
-                )
-
-            detection_ids_to_delete = [
-                detection.id
-                for detection in detections
-                if detection.id != detection_to_keep.id
-            ]
-            detection_data_ids_to_delete = [
-                detection.detection_data.id
-                for detection in detections
-                if detection.id != detection_to_keep.id
+            detection_data.set_detection_control_status(control_status)
+            detection_data.detection_validation_status = validation_status
+            detection_data.detection_prescription_status = prescription_status
+            detection_data.updated_at = last_updated_at
+            detection_data.user_last_update_id = last_user_update_id
+            if official_report_date is not None:
+                detection_data.official_report_date = official_report_date
+
+            ids_to_delete += [id_ for id_ in detection_ids if id_ != keep_id]
+            data_ids_to_delete += [
+                id_
+                for id_ in detection_data_ids
+                if id_ != detection_to_keep.detection_data_id
             ]
 
-            # Per-row save/delete fires the count-cache signal once per row; suppress it
-            # here and invalidate once after the loop (see invalidate below).
-            with suppress_count_cache_invalidation():
-                detection_to_keep.detection_data.save()
-                detection_to_keep.save()
+        if tiles_not_found:
+            log_command_event(
+                "merge_double_detections",
+                f"tile not found for {tiles_not_found} merged detection(s)",
+            )
 
-                DetectionData.objects.filter(
-                    id__in=detection_data_ids_to_delete
-                ).all().delete()
-                Detection.objects.filter(id__in=detection_ids_to_delete).all().delete()
+        bulk_update_with_history(
+            list(detections_data_to_keep.values()),
+            DetectionData,
+            [
+                "detection_control_status",
+                "detection_validation_status",
+                "detection_prescription_status",
+                "updated_at",
+                "user_last_update",
+                "official_report_date",
+            ],
+        )
+        bulk_update_with_history(
+            list(detections_to_keep.values()),
+            Detection,
+            ["geometry", "detection_source", "auto_prescribed", "tile", "updated_at"],
+        )
 
-        invalidate_count_caches()
-        log_command_event("merge_double_detections", "finished")
+        DetectionData.objects.filter(id__in=data_ids_to_delete).delete()
+        Detection.objects.filter(id__in=ids_to_delete).delete()
 
 
 VALUE_PRIORITY_MAP = {
@@ -0,0 +1,254 @@
+"""Maintenance and reads of the DetectionStatistic rollup.
+
+The rollup holds, per commune, the number of detections for every combination of the
+detection list's filter dimensions. A commune's rows are rebuilt as a whole (DELETE +
+INSERT ... SELECT GROUP BY over its detections) whenever something it counts changes:
+
+- single-row writes (Detection, DetectionData, DetectionObject, custom-zone links)
+  schedule their commune from core/signals.py, next to the count-cache invalidation:
+  it is rebuilt by a Celery task once the transaction commits, off the request;
+- bulk writes refresh explicitly at the same place they invalidate_count_caches():
+  by detection objects, by tile set, or everything for the offline commands that
+  move objects between communes.
+
+Refreshes of a commune are serialized with a transaction-level advisory lock, so two
+concurrent rebuilds never interleave their DELETE and INSERT.
+
+Reads and maintenance are opt-in (DETECTION_STATISTICS_ENABLED): while it is off,
+writes leave the table alone; `manage.py refresh_detection_statistics` fills it
+before it is turned on.
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet, Sum
+
+from core.models.detection_object import DetectionObject
+from core.models.detection_statistic import SCORE_BUCKET_SCALE, DetectionStatistic
+from core.models.geo_commune import GeoCommune
+
+# Communes rebuilt per transaction.
+REFRESH_CHUNK_SIZE = 200
+
+# First key of the (int, int) advisory locks taken on communes; the second is the
+# commune id, 0 for the detections without commune.
+_ADVISORY_LOCK_NAMESPACE = 0x44535441
+_NO_COMMUNE_LOCK_KEY = 0
+
+# The epsilon keeps a score equal to a threshold (0.29 * 100 = 28.999999999999996)
+# in the threshold's bucket, as `score >= 0.29` would.
+_INSERT_SQL = f"""
+    INSERT INTO core_detectionstatistic (
+        commune_id,
+        tile_set_id,
+        object_type_id,
+        detection_validation_status,
+        detection_control_status,
+        detection_prescription_status,
+        detection_source,
+        score_bucket,
+        in_custom_zone,
+        detections_count
+    )
+    SELECT
+        dobj.commune_id,
+        detec.tile_set_id,
+        dobj.object_type_id,
+        data.detection_validation_status,
+        data.detection_control_status,
+        data.detection_prescription_status,
+        detec.detection_source,
+        FLOOR(detec.score * {SCORE_BUCKET_SCALE} + 1e-9)::smallint,
+        EXISTS (
+            SELECT 1
+            FROM core_detectionobject_geo_custom_zones dzone
+            WHERE dzone.detectionobject_id = dobj.id
+        ),
+        COUNT(*)
+    FROM core_detection detec
+    JOIN core_detectionobject dobj ON dobj.id = detec.detection_object_id
+    LEFT JOIN core_detectiondata data ON data.id = detec.detection_data_id
+    WHERE {{commune_filter}}
+    GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9
+"""
+_DELETE_SQL = "DELETE FROM core_detectionstatistic WHERE {commune_filter}"
+_LOCK_SQL = """
+    SELECT pg_advisory_xact_lock(%s, commune_id)
+    FROM unnest(%s::integer[]) AS commune_id
+    ORDER BY commune_id
+"""
+
+
+def _noop_log(_message: str) -> None:
+    pass
+
+
+# Scopes scheduled by schedule_refresh and not refreshed yet, per thread. Whatever a
+# rolled back transaction left here is refreshed by the next commit: harmless, a
+# refresh always recomputes from the committed rows.
+_pending = threading.local()
+
+
+def _pending_scopes() -> Dict[str, Set]:
+    if not hasattr(_pending, "scopes"):
+        _pending.scopes = {"commune_ids": set(), "detection_object_ids": set()}
+    return _pending.scopes
+
+
+class DetectionStatisticService:
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.DETECTION_STATISTICS_ENABLED
+
+    # --- Maintenance --------------------------------------------------------------
+
+    @staticmethod
+    def refresh(commune_ids: Iterable[Optional[int]]) -> None:
+        """Rebuild the rows of these communes (None: the detections whose object
+        has no commune), REFRESH_CHUNK_SIZE communes per transaction."""
+        commune_ids = set(commune_ids)
+        with_no_commune = None in commune_ids
+        commune_ids = sorted(
+            commune_id for commune_id in commune_ids if commune_id is not None
+        )
+
+        for i in range(0, len(commune_ids), REFRESH_CHUNK_SIZE):
+            chunk = commune_ids[i : i + REFRESH_CHUNK_SIZE]
+            DetectionStatisticService._refresh_communes(
+                commune_filter="{column} = ANY(%s)", params=[chunk], lock_keys=chunk
+            )
+
+        if with_no_commune:
+            DetectionStatisticService._refresh_communes(
+                commune_filter="{column} IS NULL",
+                params=[],
+                lock_keys=[_NO_COMMUNE_LOCK_KEY],
+            )
+
+    @staticmethod
+    def _refresh_communes(commune_filter: str, params: List, lock_keys: List[int]):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(_LOCK_SQL, [_ADVISORY_LOCK_NAMESPACE, lock_keys])
+            cursor.execute(
+                _DELETE_SQL.format(
+                    commune_filter=commune_filter.format(column="commune_id")
+                ),
+                params,
+            )
+            cursor.execute(
+                _INSERT_SQL.format(
+                    commune_filter=commune_filter.format(column="dobj.commune_id")
+                ),
+                params,
+            )
+
+    @staticmethod
+    def refresh_all(log_event: Callable[[str], None] = _noop_log) -> None:
+        commune_ids = list(
+            GeoCommune.objects.order_by("id").values_list("id", flat=True)
+        )
+        log_event(f"Refreshing detection statistics of {len(commune_ids)} communes")
+
+        for i in range(0, len(commune_ids), REFRESH_CHUNK_SIZE):
+            DetectionStatisticService.refresh(commune_ids[i : i + REFRESH_CHUNK_SIZE])
+            log_event(
+                f"Refreshed {min(i + REFRESH_CHUNK_SIZE, len(commune_ids))}"
+                f"/{len(commune_ids)} communes"
+            )
+
+        DetectionStatisticService.refresh([None])
+
+    @staticmethod
+    def get_commune_ids(detection_object_ids: Iterable[int]) -> Set[Optional[int]]:
+        return set(
+            DetectionObject.objects.filter(id__in=list(detection_object_ids))
+            .values_list("commune_id", flat=True)
+            .distinct()
+        )
+
+    @staticmethod
+    def refresh_detection_objects(detection_object_ids: Iterable[int]) -> None:
+        if not DetectionStatisticService.is_enabled():
+            return
+
+        DetectionStatisticService.refresh(
+            DetectionStatisticService.get_commune_ids(detection_object_ids)
+        )
+
+    @staticmethod
+    def refresh_tile_sets(tile_set_ids: Iterable[int]) -> None:
+        """Rebuild every commune with detections in these tile sets, now or at the
+        last refresh (so communes whose detections were deleted are covered)."""
+        if not DetectionStatisticService.is_enabled():
+            return
+
+        tile_set_ids = list(tile_set_ids)
+        commune_ids = set(
+            DetectionObject.objects.filter(detections__tile_set_id__in=tile_set_ids)
+            .values_list("commune_id", flat=True)
+            .distinct()
+        )
+        commune_ids.update(
+            DetectionStatistic.objects.filter(tile_set_id__in=tile_set_ids)
+            .values_list("commune_id", flat=True)
+            .distinct()
+        )
+        DetectionStatisticService.refresh(commune_ids)
+
+    @staticmethod
+    def schedule_refresh(
+        commune_ids: Iterable[Optional[int]] = (),
+        detection_object_ids: Iterable[int] = (),
+    ) -> None:
+        """Refresh in a Celery task once the current transaction commits (right away
+        outside one). Scopes scheduled by the same transaction are refreshed
+        together, by one task."""
+        if not DetectionStatisticService.is_enabled():
+            return
+
+        scopes = _pending_scopes()
+        scopes["commune_ids"].update(commune_ids)
+        scopes["detection_object_ids"].update(detection_object_ids)
+        transaction.on_commit(DetectionStatisticService._refresh_pending)
+
+    @staticmethod
+    def _refresh_pending() -> None:
+        from core.utils.tasks import refresh_detection_statistics
+
+        scopes = _pending_scopes()
+        commune_ids = set(scopes["commune_ids"])
+        detection_object_ids = set(scopes["detection_object_ids"])
+        scopes["commune_ids"].clear()
+        scopes["detection_object_ids"].clear()
+
+        # resolved now, the objects may be gone by the time the task runs
+        if detection_object_ids:
+            commune_ids.update(
+                DetectionStatisticService.get_commune_ids(detection_object_ids)
+            )
+        if commune_ids:
+            refresh_detection_statistics.delay(commune_ids=list(commune_ids))
+
+    # --- Reads --------------------------------------------------------------------
+
+    @staticmethod
+    def get_score_bucket(score: float) -> Optional[int]:
+        """The bucket a `score >= threshold` filter starts at, or None when the
+        threshold falls inside a bucket (the rollup cannot answer it)."""
+        bucket = round(score * SCORE_BUCKET_SCALE)
+        if abs(score * SCORE_BUCKET_SCALE - bucket) > 1e-6:
+            return None
+        return bucket
+
+    @staticmethod
+    def count_by_validation_status(
+        queryset: QuerySet[DetectionStatistic],
+    ) -> List[Dict]:
+        return list(
+            queryset.values("detection_validation_status")
+            .annotate(count=Sum("detections_count"))
+            .order_by("detection_validation_status")
+        )
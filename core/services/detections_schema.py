@@ -59,6 +59,9 @@ class DetectionRowSerializer(serializers.Serializer):
 # geometry is read from the table but popped before serializer validation.
 INFERENCE_COLUMNS = list(DetectionRowSerializer().get_fields()) + ["geometry"]
 
+# Rows fetched per round-trip when streaming detections.inference.
+INFERENCE_ROWS_ITERSIZE = 2000
+
 
 class BatchRowSerializer(serializers.Serializer):
     """Shape of a row in detections.batch."""
@@ -130,16 +133,60 @@ class DetectionsSchemaService:
             return cursor.fetchone()[0]
 
     @staticmethod
-    def get_inference_rows(filter: InferenceFilter) -> Iterable[Dict[str, Any]]:
-        with connection.cursor() as cursor:
+    def get_inference_rows(
+        filter: InferenceFilter, itersize: int = INFERENCE_ROWS_ITERSIZE
+    ) -> Iterable[Dict[str, Any]]:
+        """Stream the batch's rows through a named (server-side) cursor, `itersize`
+        rows per round-trip: a plain cursor would pull the whole result, geometries
+        included, into the worker's memory before yielding the first row."""
+        with connection.chunked_cursor() as cursor:
             cursor.execute(
                 f"SELECT {', '.join(INFERENCE_COLUMNS)} FROM {SCHEMA}.{INFERENCE_TABLE} "
-                "WHERE batch_id = %s ORDER BY score DESC",
+                "WHERE batch_id = %s ORDER BY score DESC, id DESC",
                 [filter.batch_id],
             )
-            for row in cursor:
+            while rows := cursor.fetchmany(itersize):
+                for row in rows:
+                    yield dict(zip(INFERENCE_COLUMNS, row))
+
+    @staticmethod
+    def get_inference_rows_keyset(
+        filter: InferenceFilter, page_size: int = INFERENCE_ROWS_ITERSIZE
+    ) -> Iterable[Dict[str, Any]]:
+        """Same rows and order as get_inference_rows, read one `page_size` page at a
+        time keyed on (score, id). Holds no cursor open between pages, for
+        connections where a server-side cursor is not available (e.g. behind a
+        transaction-pooling PgBouncer)."""
+        score_index = INFERENCE_COLUMNS.index("score")
+        id_index = INFERENCE_COLUMNS.index("id")
+        select_sql = (
+            f"SELECT {', '.join(INFERENCE_COLUMNS)} FROM {SCHEMA}.{INFERENCE_TABLE} "
+            "WHERE batch_id = %s {keyset_sql}ORDER BY score DESC, id DESC LIMIT %s"
+        )
+        last_key = None
+
+        while True:
+            with connection.cursor() as cursor:
+                if last_key is None:
+                    cursor.execute(
+                        select_sql.format(keyset_sql=""),
+                        [filter.batch_id, page_size],
+                    )
+                else:
+                    cursor.execute(
+                        select_sql.format(keyset_sql="AND (score, id) < (%s, %s) "),
+                        [filter.batch_id, *last_key, page_size],
+                    )
+                rows = cursor.fetchall()
+
+            for row in rows:
                 yield dict(zip(INFERENCE_COLUMNS, row))
 
+            if len(rows) < page_size:
+                return
+
+            last_key = (rows[-1][score_index], rows[-1][id_index])
+
     @staticmethod
     def get_run_geozones(
         q: Optional[str] = None,
@@ -0,0 +1,143 @@
+import logging
+import os
+import re
+import tempfile
+from typing import Dict, Optional
+
+from django.core.files import File
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from core.models.command_run import CommandRunStatus
+from core.models.export_job import ExportJob, ExportJobType
+from core.models.user import User
+from core.permissions.scope import HEADER_NAME, resolve_scoped_user_group
+
+logger = logging.getLogger(__name__)
+
+# The synchronous endpoint each export type replays.
+EXPORT_URL_NAMES: Dict[str, str] = {
+    ExportJobType.DETECTION_LIST: "DetectionListViewSet-download",
+    ExportJobType.PARCEL_LIST: "ParcelViewSet-download",
+    ExportJobType.GEO_CUSTOM_ZONE: "GeoCustomZoneViewSet-export-csv",
+    ExportJobType.TILE_SET: "TileSetViewSet-export-csv",
+}
+
+_FILENAME_RE = re.compile(r'filename="([^"]+)"')
+
+
+class ExportJobError(Exception):
+    pass
+
+
+class ExportJobService:
+    @staticmethod
+    def create_export_job(
+        request, export_type: str, params: Dict[str, str]
+    ) -> ExportJob:
+        """Record the export and enqueue it once the row is committed. The scoped
+        user group is resolved now so a bad impersonation header fails the request
+        instead of the job."""
+        from core.utils.tasks import run_export_job
+
+        scoped_user_group = resolve_scoped_user_group(request)
+        export_job = ExportJob.objects.create(
+            user=request.user,
+            export_type=export_type,
+            params=params,
+            scoped_user_group_uuid=scoped_user_group.uuid
+            if scoped_user_group
+            else None,
+        )
+        transaction.on_commit(
+            lambda: run_export_job.apply_async(args=[str(export_job.uuid)])
+        )
+        return export_job
+
+    @staticmethod
+    def run_export_job(export_job: ExportJob) -> None:
+        ExportJob.objects.filter(pk=export_job.pk).update(
+            status=CommandRunStatus.RUNNING,
+            run_started_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+
+        try:
+            filename, file = ExportJobService._replay_export(export_job)
+        except Exception as e:
+            logger.exception("Export job %s failed", export_job.uuid)
+            ExportJob.objects.filter(pk=export_job.pk).update(
+                status=CommandRunStatus.ERROR,
+                error=str(e),
+                run_ended_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            return
+
+        with file:
+            export_job.file.save(
+                f"{export_job.uuid}/{filename}", File(file), save=False
+            )
+
+        export_job.status = CommandRunStatus.SUCCESS
+        export_job.run_ended_at = timezone.now()
+        export_job.save(update_fields=["file", "status", "run_ended_at", "updated_at"])
+
+    @staticmethod
+    def _replay_export(export_job: ExportJob):
+        """Call the synchronous export view as the job's user, with its params and
+        impersonation header, so filtering and permission checks are the endpoint's
+        own. Returns (filename, temporary file holding the body)."""
+        path = reverse(EXPORT_URL_NAMES[export_job.export_type])
+        headers = {}
+        if export_job.scoped_user_group_uuid:
+            headers[HEADER_NAME] = str(export_job.scoped_user_group_uuid)
+
+        request = RequestFactory().get(path, export_job.params, **headers)
+        # honoured by DRF's Request in place of the JWT authentication
+        request._force_auth_user = User.objects.get(pk=export_job.user_id)
+
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+
+        if hasattr(response, "render"):
+            response.render()
+
+        if response.status_code != 200:
+            raise ExportJobError(
+                f"Export failed with status {response.status_code}: "
+                f"{ExportJobService._get_error_content(response)}"
+            )
+
+        file = tempfile.TemporaryFile()
+        try:
+            chunks = (
+                response.streaming_content if response.streaming else [response.content]
+            )
+            for chunk in chunks:
+                file.write(chunk)
+        except Exception:
+            file.close()
+            raise
+        finally:
+            response.close()
+
+        file.seek(0)
+        return ExportJobService._get_filename(response, export_job), file
+
+    @staticmethod
+    def _get_filename(response, export_job: ExportJob) -> str:
+        match = _FILENAME_RE.search(response.get("Content-Disposition", ""))
+        if match:
+            return os.path.basename(match.group(1))
+
+        return f"{export_job.export_type.lower()}.csv"
+
+    @staticmethod
+    def _get_error_content(response) -> Optional[str]:
+        if response.streaming:
+            return None
+
+        return response.content.decode(errors="replace")[:1000]
@@ -12,7 +12,8 @@ from django.db import transaction
 from django.db.models import Prefetch
 from simple_history.utils import bulk_update_with_history
 
-from core.utils.cache import invalidate_count_caches
+from core.services.detection_statistic import DetectionStatisticService
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from rest_framework.exceptions import ValidationError
 
 
@@ -72,8 +73,10 @@ class ExternalApiService:
             )
 
         detections_data_to_update = []
+        commune_ids = set()
 
         for detection_object in parcel.detection_objects.all():
+            commune_ids.add(detection_object.commune_id)
             for detection in detection_object.detections.all():
                 detection_data = detection.detection_data
                 detection_data.set_detection_control_status(control_status)
@@ -93,4 +96,8 @@ class ExternalApiService:
             ],
         )
         # bulk_update_with_history bypasses post_save; invalidate counts explicitly.
-        transaction.on_commit(invalidate_count_caches)
+        department_ids = get_count_cache_department_ids(
+            commune_ids=commune_ids, parcel_ids=[parcel.id]
+        )
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+        DetectionStatisticService.schedule_refresh(commune_ids=commune_ids)
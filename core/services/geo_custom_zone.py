@@ -1,5 +1,6 @@
 from typing import Callable, Iterable, Optional, List, Dict, Any, TYPE_CHECKING
 from django.db import connection, transaction
+from django.db.models import Max, Min
 from django.contrib.gis.geos import GEOSGeometry, Polygon
 from django.contrib.gis.db.models.functions import Intersection
 
@@ -20,14 +21,57 @@ def _noop_log(info: str) -> None:  # noqa: ARG001
     pass
 
 
-# Inverse of the association INSERT: drops the links of a zone that no detection of the
-# object is covered by anymore (zone geometry shrank/moved). The zone row is joined with
-# USING so a zone whose geometry is NULL matches nothing and keeps all its links.
+# Associates every requested zone and sub-zone in one pass over the detections: the
+# detections are joined to the zones through the GiST indexes (ST_Covers), and the
+# matches feed both M2M INSERTs from a single CTE. Zones and sub-zones are both
+# GeoZone rows, so one join on core_geozone covers the two tables.
+_ASSOCIATE_ZONES_SQL = """
+    WITH covered AS MATERIALIZED (
+        SELECT DISTINCT detec.detection_object_id AS object_id, zone.id AS zone_id
+        FROM core_detection detec
+        JOIN core_geozone zone
+            ON zone.id = ANY(%(zone_ids)s)
+            AND ST_Covers(zone.geometry, detec.geometry)
+        WHERE
+            detec.batch_id = ANY(%(batch_ids)s)
+            AND detec.tile_set_id = ANY(%(tile_set_ids)s)
+            AND detec.id >= %(id_from)s
+            AND detec.id < %(id_to)s
+    ),
+    zone_links AS (
+        INSERT INTO core_detectionobject_geo_custom_zones (
+            detectionobject_id, geocustomzone_id
+        )
+        SELECT object_id, zone_id
+        FROM covered
+        WHERE zone_id = ANY(%(custom_zone_ids)s)
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    ),
+    sub_zone_links AS (
+        INSERT INTO core_detectionobject_geo_sub_custom_zones (
+            detectionobject_id, geosubcustomzone_id
+        )
+        SELECT object_id, zone_id
+        FROM covered
+        WHERE zone_id = ANY(%(sub_zone_ids)s)
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM zone_links),
+        (SELECT COUNT(*) FROM sub_zone_links)
+"""
+
+# Inverse of the association INSERT: drops the links of the zones that no detection of
+# the object is covered by anymore (zone geometry shrank/moved). The zone rows are
+# joined with USING so a zone whose geometry is NULL matches nothing and keeps all its
+# links.
 _DELETE_OUTDATED_LINKS_SQL = """
     DELETE FROM {table} AS link
     USING core_geozone zone
     WHERE
-        zone.id = %s
+        zone.id = ANY(%s)
         AND zone.geometry IS NOT NULL
         AND link.{zone_column} = zone.id
         AND NOT EXISTS (
@@ -37,6 +81,7 @@ _DELETE_OUTDATED_LINKS_SQL = """
                 detec.detection_object_id = link.detectionobject_id
                 AND ST_Covers(zone.geometry, detec.geometry)
         )
+    RETURNING link.detectionobject_id
 """
 
 
@@ -181,7 +226,9 @@ class GeoCustomZoneService:
         batch_ids: Optional[List[str]] = None,
         tile_set_uuids: Optional[List[str]] = None,
         remove_outdated: bool = False,
+        chunk_size: Optional[int] = None,
         log_event: Callable[[str], None] = _noop_log,
+        refresh_statistics: bool = True,
     ) -> None:
         """Populate the DetectionObject ↔ GeoCustomZone (and ↔ GeoSubCustomZone)
         M2M tables for the given custom zones. A detection belongs to a zone when the
@@ -194,18 +241,29 @@ class GeoCustomZoneService:
         the full population: all distinct batches / all non-INDICATIVE-DEACTIVATED
         tile sets.
 
+        All zones and sub-zones are associated in one pass over the detections
+        (_ASSOCIATE_ZONES_SQL), not one statement per zone. With `chunk_size`, that
+        pass is split into Detection.id ranges of that width, each its own statement,
+        to bound the work (and the row locks) of a single statement on large imports.
+
         With `remove_outdated`, links the zone geometry no longer covers are deleted
         too. Deletion is deliberately NOT scoped by batch/tile set: the M2M is per
         DetectionObject, so a link survives as long as one detection of the object —
         any batch, any tile set — is still covered.
 
         Writes the M2M directly via raw SQL (bypasses the m2m_changed signal), so
-        this helper also schedules a count-cache invalidation on commit — the
-        caller must not invalidate counts itself.
+        this helper also schedules a count-cache invalidation and the refresh of
+        the affected DetectionStatistic rows on commit — the caller must not
+        invalidate counts itself. A caller that refreshes the statistics of the
+        whole tile set anyway passes `refresh_statistics=False`.
         """
         from core.models.detection import Detection
         from core.models.tile_set import TileSet, TileSetStatus, TileSetType
-        from core.utils.cache import invalidate_count_caches
+        from core.services.detection_statistic import DetectionStatisticService
+        from core.utils.cache import (
+            get_count_cache_department_ids,
+            invalidate_count_caches,
+        )
 
         custom_zone_id_list = list(custom_zone_ids)
         if not custom_zone_id_list:
@@ -247,85 +305,105 @@ class GeoCustomZoneService:
                 )
             )
 
-        for zone in zones:
-            log_event(f"Associating detections to custom zone: {zone.name}")
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO core_detectionobject_geo_custom_zones (
-                        detectionobject_id, geocustomzone_id
-                    )
-                    SELECT DISTINCT dobj.id, %s
-                    FROM core_detectionobject dobj
-                    JOIN core_detection detec
-                        ON detec.detection_object_id = dobj.id
-                    WHERE
-                        detec.batch_id = ANY(%s)
-                        AND detec.tile_set_id = ANY(%s)
-                        AND ST_Covers(
-                            (SELECT geometry FROM core_geozone WHERE id = %s),
-                            detec.geometry
-                        )
-                    ON CONFLICT DO NOTHING
-                    """,
-                    [zone.id, batch_ids, tile_set_ids, zone.id],
-                )
+        zone_ids = [zone.id for zone in zones]
+        sub_zone_ids = [
+            sub_zone.id for zone in zones for sub_zone in zone.sub_custom_zones.all()
+        ]
+        log_event(
+            f"Associating detections to {len(zone_ids)} custom zone(s) and "
+            f"{len(sub_zone_ids)} sub-custom zone(s)"
+        )
+
+        bounds = Detection.objects.filter(
+            batch_id__in=batch_ids, tile_set_id__in=tile_set_ids
+        ).aggregate(id_min=Min("id"), id_max=Max("id"))
+
+        zone_links_count = 0
+        unlinked_object_ids = set()
+        unlinked_sub_zone_object_ids = set()
+
+        if bounds["id_min"] is not None:
+            id_end = bounds["id_max"] + 1
+            step = chunk_size or id_end - bounds["id_min"]
+            sub_zone_links_count = 0
 
-                if remove_outdated:
+            for id_from in range(bounds["id_min"], id_end, step):
+                id_to = min(id_from + step, id_end)
+                with connection.cursor() as cursor:
                     cursor.execute(
-                        _DELETE_OUTDATED_LINKS_SQL.format(
-                            table="core_detectionobject_geo_custom_zones",
-                            zone_column="geocustomzone_id",
-                        ),
-                        [zone.id],
-                    )
-                    log_event(
-                        f"Removed {cursor.rowcount} outdated link(s) from custom zone: {zone.name}"
+                        _ASSOCIATE_ZONES_SQL,
+                        {
+                            "zone_ids": zone_ids + sub_zone_ids,
+                            "custom_zone_ids": zone_ids,
+                            "sub_zone_ids": sub_zone_ids,
+                            "batch_ids": batch_ids,
+                            "tile_set_ids": tile_set_ids,
+                            "id_from": id_from,
+                            "id_to": id_to,
+                        },
                     )
+                    zone_links, sub_zone_links = cursor.fetchone()
+                zone_links_count += zone_links
+                sub_zone_links_count += sub_zone_links
+                if chunk_size:
+                    log_event(f"Associated detections with id in [{id_from}, {id_to})")
+
+            log_event(
+                f"Added {zone_links_count} custom zone link(s) and "
+                f"{sub_zone_links_count} sub-custom zone link(s)"
+            )
+        else:
+            log_event("No detections to associate")
 
-        sub_zones = [
-            sub_zone for zone in zones for sub_zone in zone.sub_custom_zones.all()
-        ]
-        for sub_zone in sub_zones:
-            log_event(f"Associating detections to sub-custom zone: {sub_zone.name}")
+        if remove_outdated:
             with connection.cursor() as cursor:
                 cursor.execute(
-                    """
-                    INSERT INTO core_detectionobject_geo_sub_custom_zones (
-                        detectionobject_id, geosubcustomzone_id
-                    )
-                    SELECT DISTINCT dobj.id, %s
-                    FROM core_detectionobject dobj
-                    JOIN core_detection detec
-                        ON detec.detection_object_id = dobj.id
-                    WHERE
-                        detec.batch_id = ANY(%s)
-                        AND detec.tile_set_id = ANY(%s)
-                        AND ST_Covers(
-                            (SELECT geometry FROM core_geozone WHERE id = %s),
-                            detec.geometry
-                        )
-                    ON CONFLICT DO NOTHING
-                    """,
-                    [sub_zone.id, batch_ids, tile_set_ids, sub_zone.id],
+                    _DELETE_OUTDATED_LINKS_SQL.format(
+                        table="core_detectionobject_geo_custom_zones",
+                        zone_column="geocustomzone_id",
+                    ),
+                    [zone_ids],
                 )
+                log_event(f"Removed {cursor.rowcount} outdated custom zone link(s)")
+                unlinked_object_ids.update(row[0] for row in cursor.fetchall())
 
-                if remove_outdated:
-                    cursor.execute(
-                        _DELETE_OUTDATED_LINKS_SQL.format(
-                            table="core_detectionobject_geo_sub_custom_zones",
-                            zone_column="geosubcustomzone_id",
-                        ),
-                        [sub_zone.id],
-                    )
-                    log_event(
-                        f"Removed {cursor.rowcount} outdated link(s) from sub-custom zone: {sub_zone.name}"
-                    )
+                cursor.execute(
+                    _DELETE_OUTDATED_LINKS_SQL.format(
+                        table="core_detectionobject_geo_sub_custom_zones",
+                        zone_column="geosubcustomzone_id",
+                    ),
+                    [sub_zone_ids],
+                )
+                log_event(f"Removed {cursor.rowcount} outdated sub-custom zone link(s)")
+                unlinked_sub_zone_object_ids.update(row[0] for row in cursor.fetchall())
 
         # Raw-SQL M2M writes bypass m2m_changed; bump the count cache once for
-        # the whole operation. on_commit defers under an open atomic block and
+        # the whole operation, in the departments of the objects that may have
+        # gained or lost a link. on_commit defers under an open atomic block and
         # runs synchronously outside one, so it's safe in both contexts.
-        transaction.on_commit(invalidate_count_caches)
+        department_ids = get_count_cache_department_ids(
+            detection_object_ids=unlinked_object_ids | unlinked_sub_zone_object_ids
+        )
+        if bounds["id_min"] is not None:
+            department_ids |= get_count_cache_department_ids(
+                detection_object_ids=Detection.objects.filter(
+                    batch_id__in=batch_ids, tile_set_id__in=tile_set_ids
+                ).values("detection_object_id")
+            )
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+
+        # Custom-zone links (not sub-zone ones) are the DetectionStatistic
+        # in_custom_zone dimension.
+        if not refresh_statistics:
+            return
+        if zone_links_count:
+            transaction.on_commit(
+                lambda: DetectionStatisticService.refresh_tile_sets(tile_set_ids)
+            )
+        if unlinked_object_ids:
+            DetectionStatisticService.schedule_refresh(
+                detection_object_ids=unlinked_object_ids
+            )
 
     @staticmethod
     def update_custom_zones_data(
@@ -333,6 +411,7 @@ class GeoCustomZoneService:
         zone_ids: Optional[List[int]] = None,
         batch_ids: Optional[List[str]] = None,
         tile_set_uuids: Optional[List[str]] = None,
+        chunk_size: Optional[int] = None,
         log_event: Callable[[str], None] = _noop_log,
     ) -> None:
         """The refresh the `update_custom_zones` command performs: link the detections
@@ -367,6 +446,7 @@ class GeoCustomZoneService:
             batch_ids=batch_ids,
             tile_set_uuids=tile_set_uuids,
             remove_outdated=True,
+            chunk_size=chunk_size,
             log_event=log_event,
         )
 
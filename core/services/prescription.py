@@ -1,13 +1,127 @@
-from typing import List
+from typing import Iterable, List
 from dateutil.relativedelta import relativedelta
+from django.db import connection
+from django.db.models import QuerySet
 from simple_history.utils import bulk_update_with_history
 
 from core.models.detection import Detection
 from core.models.detection_data import DetectionData, DetectionPrescriptionStatus
 from core.models.detection_object import DetectionObject
 
+# Set-based compute_prescription: for every detection of the given objects, the years
+# since the object's oldest detection (window MIN over its tile set dates, AGE giving
+# the same whole years as relativedelta) decide auto_prescribed. Only the detections
+# whose values change are returned, with which of the two rows actually changes — the
+# same rows compute_prescription/_reset_prescriptions would bulk-update.
+_PRESCRIPTION_CHANGES_SQL = """
+    WITH detection_prescription AS (
+        SELECT
+            detec.id AS detection_id,
+            detec.detection_data_id,
+            detec.auto_prescribed,
+            data.detection_prescription_status,
+            COALESCE(object_type.prescription_duration_years, 0) > 0 AS has_duration,
+            EXTRACT(
+                YEAR FROM AGE(
+                    tile_set.date,
+                    MIN(tile_set.date) OVER (
+                        PARTITION BY detec.detection_object_id
+                    )
+                )
+            ) >= COALESCE(object_type.prescription_duration_years, 0) AS prescribed
+        FROM core_detection detec
+        JOIN core_detectionobject dobj ON dobj.id = detec.detection_object_id
+        JOIN core_objecttype object_type ON object_type.id = dobj.object_type_id
+        JOIN core_tileset tile_set ON tile_set.id = detec.tile_set_id
+        JOIN core_detectiondata data ON data.id = detec.detection_data_id
+        WHERE detec.detection_object_id = ANY(%s)
+    )
+    SELECT
+        detection_id,
+        detection_data_id,
+        has_duration AND prescribed,
+        CASE
+            WHEN NOT has_duration THEN NULL
+            WHEN prescribed THEN %s
+            ELSE %s
+        END,
+        auto_prescribed <> (has_duration AND prescribed),
+        CASE
+            WHEN has_duration THEN auto_prescribed <> prescribed
+            ELSE detection_prescription_status IS NOT NULL
+        END
+    FROM detection_prescription
+    WHERE
+        auto_prescribed <> (has_duration AND prescribed)
+        OR (NOT has_duration AND detection_prescription_status IS NOT NULL)
+"""
+
 
 class PrescriptionService:
+    @staticmethod
+    def compute_prescriptions(detection_object_ids: Iterable[int]) -> int:
+        """compute_prescription for many objects at once: one window query finds the
+        detections to change, and only those are loaded and bulk-updated. Also
+        clears the objects' prescription_dirty flag. Returns the number of
+        detections changed.
+
+        Same count-cache contract as _bulk_update_prescriptions: the caller
+        invalidates once after its run."""
+        detection_object_ids = list(detection_object_ids)
+        if not detection_object_ids:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _PRESCRIPTION_CHANGES_SQL,
+                [
+                    detection_object_ids,
+                    DetectionPrescriptionStatus.PRESCRIBED.value,
+                    DetectionPrescriptionStatus.NOT_PRESCRIBED.value,
+                ],
+            )
+            changes = cursor.fetchall()
+
+        detections = Detection.objects.in_bulk(
+            [change[0] for change in changes if change[4]]
+        )
+        detections_data = DetectionData.objects.in_bulk(
+            [change[1] for change in changes if change[5]]
+        )
+
+        for (
+            detection_id,
+            detection_data_id,
+            auto_prescribed,
+            prescription_status,
+            detection_changed,
+            detection_data_changed,
+        ) in changes:
+            if detection_changed:
+                detections[detection_id].auto_prescribed = auto_prescribed
+            if detection_data_changed:
+                detections_data[
+                    detection_data_id
+                ].detection_prescription_status = prescription_status
+
+        PrescriptionService._bulk_update_prescriptions(
+            list(detections.values()), list(detections_data.values())
+        )
+
+        DetectionObject.objects.filter(
+            id__in=detection_object_ids, prescription_dirty=True
+        ).update(prescription_dirty=False)
+
+        return len(changes)
+
+    @staticmethod
+    def mark_dirty(detection_objects: QuerySet) -> int:
+        """Flag objects for the next compute_prescription --dirty-only run, in one
+        UPDATE (no signal, no history: the flag is bookkeeping only)."""
+        return detection_objects.filter(prescription_dirty=False).update(
+            prescription_dirty=True
+        )
+
     @staticmethod
     def compute_prescription(detection_object: DetectionObject) -> DetectionObject:
         object_type = detection_object.object_type
@@ -11,8 +11,9 @@ from core.models.analytic_log import AnalyticLogType
 from core.models.detection_data import DetectionControlStatus
 from core.models.detection_object import DetectionObject
 from core.models.user_group import UserGroup
+from core.services.detection_statistic import DetectionStatisticService
 from core.utils.analytic_log import create_log
-from core.utils.cache import invalidate_count_caches
+from core.utils.cache import get_count_cache_department_ids, invalidate_count_caches
 from core.utils.odt_processor import ODTTemplateProcessor
 from core.permissions.detection import DetectionPermission
 from core.permissions.geo_custom_zone import GeoCustomZonePermission
@@ -89,7 +90,13 @@ class PriorLetterService:
                 default_user=self.user,
             )
             # bulk_update bypasses post_save; invalidate the count cache explicitly.
-            transaction.on_commit(invalidate_count_caches)
+            department_ids = get_count_cache_department_ids(
+                detection_object_ids=[detection_object.id]
+            )
+            transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+            DetectionStatisticService.schedule_refresh(
+                commune_ids=[detection_object.commune_id]
+            )
 
     def _create_analytics_log(
         self, detection_object: DetectionObject, detection_object_uuid: str
@@ -1,15 +1,21 @@
+from typing import List, Optional
+
 from django.db import transaction
-from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 
 from core.models.detection import Detection
 from core.models.detection_data import DetectionData
 from core.models.detection_object import DetectionObject
+from core.models.object_type import ObjectType
 from core.models.parcel import Parcel
 from core.models.tile_set import TileSet
 from core.models.user_group import UserGroup, UserUserGroup
+from core.services.detection_statistic import DetectionStatisticService
+from core.services.prescription import PrescriptionService
 from core.utils.cache import (
     count_cache_invalidation_suppressed,
+    get_count_cache_department_ids,
     invalidate_caches_for_user,
     invalidate_caches_for_group,
     invalidate_count_caches,
@@ -59,15 +65,62 @@ def on_tileset_geo_zones_change(sender, action, **kwargs):  # noqa: ARG001
 # --- Detection / parcel single-row writes → invalidate pagination count caches ---
 # Fires for interactive single edits/creates (which use save()). Bulk paths
 # (bulk_create/bulk_update) bypass post_save, so import_detections and the bulk
-# update service invalidate counts explicitly instead.
+# update service invalidate counts explicitly instead. Only the departments of the
+# written rows are invalidated, resolved now: after a delete they are gone. A save
+# can move a row to another object/commune/parcel, so what it pointed to before the
+# save (read in pre_save) counts too.
+_PREVIOUS_SCOPE_FIELDS = {
+    Detection: ["detection_object_id"],
+    DetectionObject: ["commune_id", "parcel_id"],
+    Parcel: ["commune_id"],
+}
+
+
+def _on_scope_relevant_pre_save(sender, instance, **kwargs):  # noqa: ARG001
+    if count_cache_invalidation_suppressed() or instance.pk is None:
+        return
+    instance._previous_scope = (
+        sender.objects.filter(pk=instance.pk)
+        .values(*_PREVIOUS_SCOPE_FIELDS[sender])
+        .first()
+    )
+
 
+def _scope_values(instance, field: str) -> List[Optional[int]]:
+    """The instance's value for the field, and its value before the save if any."""
+    values = [getattr(instance, field)]
+    previous_scope = getattr(instance, "_previous_scope", None)
+    if previous_scope is not None:
+        values.append(previous_scope[field])
+    return values
 
-def _on_count_relevant_change(sender, **kwargs):  # noqa: ARG001
+
+def _on_count_relevant_change(sender, instance, **kwargs):  # noqa: ARG001
     if count_cache_invalidation_suppressed():
         return
-    transaction.on_commit(invalidate_count_caches)
-
 
+    if sender is Parcel:
+        scope = {"commune_ids": _scope_values(instance, "commune_id")}
+    elif sender is DetectionObject:
+        scope = {
+            "commune_ids": _scope_values(instance, "commune_id"),
+            "parcel_ids": _scope_values(instance, "parcel_id"),
+        }
+    elif sender is Detection:
+        scope = {"detection_object_ids": _scope_values(instance, "detection_object_id")}
+    else:
+        scope = {
+            "detection_object_ids": Detection.objects.filter(
+                detection_data_id=instance.id
+            ).values("detection_object_id")
+        }
+
+    department_ids = get_count_cache_department_ids(**scope)
+    transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+
+
+for _scope_model in _PREVIOUS_SCOPE_FIELDS:
+    pre_save.connect(_on_scope_relevant_pre_save, sender=_scope_model)
 for _count_model in (Detection, DetectionData, DetectionObject, Parcel):
     post_save.connect(_on_count_relevant_change, sender=_count_model)
     post_delete.connect(_on_count_relevant_change, sender=_count_model)
@@ -78,8 +131,117 @@ for _count_model in (Detection, DetectionData, DetectionObject, Parcel):
 # import_detections.associate_detections_to_custom_zones) bypass this signal and
 # invalidate explicitly instead.
 @receiver(m2m_changed, sender=DetectionObject.geo_custom_zones.through)
-def on_detection_object_custom_zones_change(sender, action, **kwargs):  # noqa: ARG001
-    if action in ("post_add", "post_remove", "post_clear") and (
-        not count_cache_invalidation_suppressed()
+def on_detection_object_custom_zones_change(
+    sender,  # noqa: ARG001
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,  # noqa: ARG001
+):
+    if count_cache_invalidation_suppressed():
+        return
+
+    # in_custom_zone is a DetectionStatistic dimension. From the zone side, a clear
+    # only names its objects before it happens.
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            department_ids = get_count_cache_department_ids(
+                detection_object_ids=[instance.id]
+            )
+            transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+            DetectionStatisticService.schedule_refresh(
+                commune_ids=[instance.commune_id]
+            )
+    elif action == "pre_clear":
+        detection_object_ids = list(
+            instance.detection_objects.values_list("id", flat=True)
+        )
+        department_ids = get_count_cache_department_ids(
+            detection_object_ids=detection_object_ids
+        )
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+        DetectionStatisticService.schedule_refresh(
+            detection_object_ids=detection_object_ids
+        )
+    elif action in ("post_add", "post_remove"):
+        department_ids = get_count_cache_department_ids(detection_object_ids=pk_set)
+        transaction.on_commit(lambda: invalidate_count_caches(department_ids))
+        DetectionStatisticService.schedule_refresh(detection_object_ids=pk_set)
+
+
+# --- Detection single-row writes → refresh the DetectionStatistic rollup ---
+# Same writes as the count cache above (Parcel aside: not a rollup dimension), and
+# suppressed with it: bulk callers refresh their whole scope once. The commune (or
+# object) a row had before the save is refreshed too. Nothing to maintain while
+# DETECTION_STATISTICS_ENABLED is off.
+
+
+def _on_statistics_relevant_change(sender, instance, **kwargs):  # noqa: ARG001
+    if (
+        count_cache_invalidation_suppressed()
+        or not DetectionStatisticService.is_enabled()
     ):
-        transaction.on_commit(invalidate_count_caches)
+        return
+
+    if sender is DetectionObject:
+        DetectionStatisticService.schedule_refresh(
+            commune_ids=_scope_values(instance, "commune_id")
+        )
+    elif sender is Detection:
+        DetectionStatisticService.schedule_refresh(
+            detection_object_ids=_scope_values(instance, "detection_object_id")
+        )
+    else:
+        # a deleted DetectionData takes its detection along, which refreshes itself
+        DetectionStatisticService.schedule_refresh(
+            detection_object_ids=Detection.objects.filter(
+                detection_data_id=instance.id
+            ).values_list("detection_object_id", flat=True)
+        )
+
+
+for _statistics_model in (Detection, DetectionData, DetectionObject):
+    post_save.connect(_on_statistics_relevant_change, sender=_statistics_model)
+    post_delete.connect(_on_statistics_relevant_change, sender=_statistics_model)
+
+
+# --- Prescription inputs → flag objects for the incremental recompute ---
+# A prescription depends on the object type's duration and on its detections' tile set
+# dates. Detection writes recompute it on the spot; these two edits do not, so they
+# flag the affected objects for `compute_prescription --dirty-only` instead.
+_PRESCRIPTION_INPUT_FIELDS = {
+    ObjectType: "prescription_duration_years",
+    TileSet: "date",
+}
+
+
+def _on_prescription_input_pre_save(sender, instance, **kwargs):  # noqa: ARG001
+    field = _PRESCRIPTION_INPUT_FIELDS[sender]
+    instance._prescription_input_changed = (
+        instance.pk is not None
+        and sender.objects.filter(pk=instance.pk)
+        .exclude(**{field: getattr(instance, field)})
+        .exists()
+    )
+
+
+def _on_prescription_input_post_save(sender, instance, **kwargs):  # noqa: ARG001
+    if not getattr(instance, "_prescription_input_changed", False):
+        return
+    if sender is ObjectType:
+        detection_objects = DetectionObject.objects.filter(object_type=instance)
+    else:
+        detection_objects = DetectionObject.objects.filter(
+            id__in=Detection.objects.filter(tile_set=instance).values(
+                "detection_object_id"
+            )
+        )
+    PrescriptionService.mark_dirty(detection_objects)
+
+
+for _prescription_input_model in _PRESCRIPTION_INPUT_FIELDS:
+    pre_save.connect(_on_prescription_input_pre_save, sender=_prescription_input_model)
+    post_save.connect(
+        _on_prescription_input_post_save, sender=_prescription_input_model
+    )
@@ -4,24 +4,32 @@ Re-deploying a batch replays every source row, so the command skips the rows it
 imported for that batch_id and UniqueConstraint(batch_id, import_id) backstops it at the
 DB level. It also owns the tile set's reveal: the deploy creates tile sets DEACTIVATED
 and passes --activate-tile-set so they only turn VISIBLE once the import completes.
+--bulk-enrichment must link rows exactly like the per-row mode does, and --clean-step
+must drop rows duplicating one still pending in the batch (found through the grid index).
 """
 
 from unittest.mock import patch
 
+from django.contrib.gis.geos import GEOSGeometry, Polygon
 from django.core.management import call_command
 from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase
 
-from core.management.commands.import_detections import slippy_tile_xy
+from core.management.commands._common.spatial_index import GeometryGridIndex
+from core.management.commands._common.tile_index import TileIdMap
+from core.utils.tile import slippy_tile_xy
 from core.models.detection import Detection
 from core.models.tile import TILE_DEFAULT_ZOOM
 from core.models.tile_set import TileSet, TileSetStatus
 from core.tests.base import BaseTestCase
 from core.tests.fixtures.detection_data import (
     create_detection,
+    create_detection_object,
     create_object_type,
     create_tile,
     create_tile_set,
 )
+from core.tests.fixtures.geo_data import create_montpellier_commune
 
 SCHEMA_SERVICE = "core.services.detections_schema.DetectionsSchemaService"
 MERGE = (
@@ -146,3 +154,222 @@ class ImportDetectionsActivationTests(BaseTestCase):
         self.assertEqual(
             TileSet.objects.get(id=tile_set.id).tile_set_status, TileSetStatus.HIDDEN
         )
+
+
+class ImportDetectionsBulkEnrichmentTests(BaseTestCase):
+    """--bulk-enrichment resolves the same links as the per-row mode, set-based."""
+
+    def setUp(self):
+        super().setUp()
+        self.object_type = create_object_type(name=OBJECT_TYPE_NAME)
+        tile_x, tile_y = slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM)
+        self.tile = create_tile(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM)
+
+    def test_imports_a_new_inference_row(self):
+        tile_set = create_tile_set(name="ts-bulk-new")
+
+        _run(tile_set, "batch-bulk-new", [_inference_row(42)], bulk_enrichment=True)
+
+        detection = Detection.objects.get(batch_id="batch-bulk-new")
+        self.assertEqual(detection.import_id, 42)
+        self.assertEqual(detection.tile_id, self.tile.id)
+        self.assertEqual(detection.detection_object.import_id, 42)
+
+    def test_links_to_the_detection_of_another_tile_set(self):
+        previous_tile_set = create_tile_set(name="ts-bulk-previous")
+        detection_object = create_detection_object(object_type=self.object_type)
+        create_detection(
+            detection_object=detection_object,
+            tile=self.tile,
+            tile_set=previous_tile_set,
+            geometry=GEOSGeometry(GEOMETRY, srid=4326),
+        )
+        tile_set = create_tile_set(name="ts-bulk-linked")
+
+        _run(tile_set, "batch-bulk-linked", [_inference_row(7)], bulk_enrichment=True)
+
+        self.assertEqual(
+            Detection.objects.get(batch_id="batch-bulk-linked").detection_object_id,
+            detection_object.id,
+        )
+
+    def test_backfills_the_missing_address_of_the_linked_object(self):
+        previous_tile_set = create_tile_set(name="ts-bulk-previous-address")
+        detection_object = create_detection_object(object_type=self.object_type)
+        create_detection(
+            detection_object=detection_object,
+            tile=self.tile,
+            tile_set=previous_tile_set,
+            geometry=GEOSGeometry(GEOMETRY, srid=4326),
+        )
+        tile_set = create_tile_set(name="ts-bulk-address")
+        row = {**_inference_row(8), "address": "1 rue de la Paix"}
+
+        _run(tile_set, "batch-bulk-address", [row], bulk_enrichment=True)
+
+        detection_object.refresh_from_db()
+        self.assertEqual(detection_object.address, "1 rue de la Paix")
+        self.assertEqual(detection_object.history.latest().address, "1 rue de la Paix")
+
+    def test_skips_rows_already_imported_for_the_batch(self):
+        tile_set = create_tile_set(name="ts-bulk-skip")
+        create_detection(batch_id="batch-bulk-done", tile_set=tile_set, import_id=42)
+
+        _run(tile_set, "batch-bulk-done", [_inference_row(42)], bulk_enrichment=True)
+
+        self.assertEqual(
+            Detection.objects.filter(batch_id="batch-bulk-done").count(), 1
+        )
+
+
+class ImportDetectionsCleanStepTests(BaseTestCase):
+    """--clean-step drops a row overlapping one still pending in the same batch."""
+
+    def setUp(self):
+        super().setUp()
+        create_object_type(name=OBJECT_TYPE_NAME)
+        tile_x, tile_y = slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM)
+        create_tile(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM)
+
+    def test_skips_intra_batch_duplicate(self):
+        tile_set = create_tile_set(name="ts-clean")
+
+        _run(
+            tile_set,
+            "batch-clean",
+            [_inference_row(1), _inference_row(2)],
+            clean_step=True,
+        )
+
+        self.assertEqual(
+            list(
+                Detection.objects.filter(batch_id="batch-clean").values_list(
+                    "import_id", flat=True
+                )
+            ),
+            [1],
+        )
+
+    def test_skips_intra_batch_duplicate_with_bulk_enrichment(self):
+        tile_set = create_tile_set(name="ts-clean-bulk")
+
+        _run(
+            tile_set,
+            "batch-clean-bulk",
+            [_inference_row(1), _inference_row(2)],
+            clean_step=True,
+            bulk_enrichment=True,
+        )
+
+        self.assertEqual(
+            Detection.objects.filter(batch_id="batch-clean-bulk").count(), 1
+        )
+
+
+class GeometryGridIndexTests(SimpleTestCase):
+    def test_yields_only_overlapping_extents_of_the_same_key(self):
+        index = GeometryGridIndex()
+        near = Polygon.from_bbox((3.88, 43.61, 3.8801, 43.6101))
+        far = Polygon.from_bbox((4.5, 44.0, 4.5001, 44.0001))
+        index.add("pool", near)
+        index.add("pool", far)
+        index.add("tank", near)
+
+        query = Polygon.from_bbox((3.88005, 43.61005, 3.8802, 43.6102))
+        self.assertEqual(list(index.candidates("pool", query)), [near])
+        self.assertEqual(list(index.candidates("tank", query)), [near])
+        self.assertEqual(list(index.candidates("other", query)), [])
+
+    def test_geometry_across_cells_is_found_from_each(self):
+        index = GeometryGridIndex(cell_size=0.001)
+        wide = Polygon.from_bbox((3.8805, 43.61, 3.8825, 43.6101))
+        index.add("pool", wide)
+
+        for x in (3.8806, 3.8815, 3.8824):
+            query = Polygon.from_bbox((x, 43.61, x + 0.00001, 43.61001))
+            self.assertEqual(list(index.candidates("pool", query)), [wide])
+
+    def test_oversized_geometry_is_always_a_candidate(self):
+        index = GeometryGridIndex(cell_size=0.001)
+        huge = Polygon.from_bbox((3.0, 43.0, 4.0, 44.0))
+        index.add("pool", huge)
+
+        query = Polygon.from_bbox((3.5, 43.5, 3.5001, 43.5001))
+        self.assertEqual(list(index.candidates("pool", query)), [huge])
+
+    def test_clear_empties_the_index(self):
+        index = GeometryGridIndex()
+        index.add("pool", Polygon.from_bbox((3.88, 43.61, 3.8801, 43.6101)))
+        index.clear()
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(
+            list(
+                index.candidates(
+                    "pool", Polygon.from_bbox((3.88, 43.61, 3.8801, 43.6101))
+                )
+            ),
+            [],
+        )
+
+
+class ImportDetectionsTileTests(BaseTestCase):
+    """Tiles resolve from the preloaded map; a missing row-named tile is created."""
+
+    def setUp(self):
+        super().setUp()
+        create_object_type(name=OBJECT_TYPE_NAME)
+
+    def test_creates_the_row_named_tile_when_the_centroid_tile_is_missing(self):
+        tile_set = create_tile_set(name="ts-missing-tile")
+        rows = [{**_inference_row(1), "tile_x": 11, "tile_y": 12}]
+
+        _run(tile_set, "batch-missing-tile", rows)
+
+        detection = Detection.objects.select_related("tile").get(
+            batch_id="batch-missing-tile"
+        )
+        self.assertEqual(
+            (detection.tile.x, detection.tile.y, detection.tile.z),
+            (11, 12, TILE_DEFAULT_ZOOM),
+        )
+        self.assertIsNotNone(detection.tile.geometry)
+
+    def test_uses_the_preloaded_tile_of_the_tile_set_extent(self):
+        tile_x, tile_y = slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM)
+        tile = create_tile(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM)
+        tile_set = create_tile_set(name="ts-preloaded")
+        tile_set.geo_zones.add(create_montpellier_commune())
+
+        _run(tile_set, "batch-preloaded", [_inference_row(1)])
+
+        self.assertEqual(
+            Detection.objects.get(batch_id="batch-preloaded").tile_id, tile.id
+        )
+
+
+class TileIdMapTests(BaseTestCase):
+    def test_preloaded_range_is_answered_from_memory(self):
+        inside = create_tile(x=10, y=20, z=TILE_DEFAULT_ZOOM)
+        tile_ids = TileIdMap(z=TILE_DEFAULT_ZOOM)
+
+        self.assertTrue(tile_ids.preload((0, 100), (0, 100)))
+        with self.assertNumQueries(0):
+            self.assertEqual(tile_ids.get(10, 20), inside.id)
+            self.assertIsNone(tile_ids.get(10, 21))
+
+    def test_outside_the_preloaded_range_is_looked_up_once(self):
+        outside = create_tile(x=500, y=500, z=TILE_DEFAULT_ZOOM)
+        tile_ids = TileIdMap(z=TILE_DEFAULT_ZOOM)
+        tile_ids.preload((0, 100), (0, 100))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(tile_ids.get(500, 500), outside.id)
+            self.assertEqual(tile_ids.get(500, 500), outside.id)
+
+    def test_added_tiles_are_found(self):
+        tile_ids = TileIdMap(z=TILE_DEFAULT_ZOOM)
+        tile_ids.preload((0, 100), (0, 100))
+        tile_ids.add(1, 1, 42)
+
+        self.assertEqual(tile_ids.get(1, 1), 42)
@@ -0,0 +1,119 @@
+"""Tests for the `update_detection_parcels` management command.
+
+Pins the semantics of the set-based UPDATE: the parcel comes from the centroid of
+the object's *first* detection (lowest id), objects that already have a parcel are
+skipped, --department-code scopes the update, and objects with no detection (or a
+detection outside every parcel) are left untouched.
+"""
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+
+from core.models.detection_object import DetectionObject
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_object,
+    create_tile,
+    create_tile_set,
+)
+from core.tests.fixtures.geo_data import (
+    create_beziers_commune,
+    create_gard_department,
+    create_herault_department,
+    create_montpellier_commune,
+    create_nimes_commune,
+    create_parcel,
+)
+
+MONTPELLIER_POINT = Point(3.88, 43.61, srid=4326)
+BEZIERS_POINT = Point(3.22, 43.34, srid=4326)
+NIMES_POINT = Point(4.36, 43.84, srid=4326)
+# Well outside every parcel fixture's polygon.
+NOWHERE_POINT = Point(1.0, 47.0, srid=4326)
+
+
+class UpdateDetectionParcelsCommandTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        herault = create_herault_department()
+        self.montpellier = create_montpellier_commune(department=herault)
+        self.beziers = create_beziers_commune(department=herault)
+        self.montpellier_parcel = create_parcel(
+            commune=self.montpellier, id_parcellaire="34172000A0001"
+        )
+        self.beziers_parcel = create_parcel(
+            commune=self.beziers, id_parcellaire="34032000A0001", x=3.22, y=43.34
+        )
+        self.tile_set = create_tile_set()
+        self.tile = create_tile()
+
+    def _create_object(self, geometry, commune=None, parcel=None):
+        obj = create_detection_object(
+            commune=commune or self.montpellier, parcel=parcel
+        )
+        create_detection(
+            detection_object=obj,
+            tile=self.tile,
+            tile_set=self.tile_set,
+            geometry=geometry,
+        )
+        return obj
+
+    def _parcel_of(self, obj):
+        return DetectionObject.objects.get(id=obj.id).parcel_id
+
+    def test_sets_parcel_from_detection_centroid(self):
+        obj = self._create_object(MONTPELLIER_POINT)
+
+        call_command("update_detection_parcels")
+
+        self.assertEqual(self._parcel_of(obj), self.montpellier_parcel.id)
+
+    def test_uses_first_detection_when_object_has_several(self):
+        obj = self._create_object(BEZIERS_POINT)
+        create_detection(
+            detection_object=obj,
+            tile=self.tile,
+            tile_set=self.tile_set,
+            geometry=MONTPELLIER_POINT,
+        )
+
+        call_command("update_detection_parcels")
+
+        self.assertEqual(self._parcel_of(obj), self.beziers_parcel.id)
+
+    def test_skips_objects_that_already_have_a_parcel(self):
+        obj = self._create_object(MONTPELLIER_POINT, parcel=self.beziers_parcel)
+
+        call_command("update_detection_parcels")
+
+        self.assertEqual(self._parcel_of(obj), self.beziers_parcel.id)
+
+    def test_detection_outside_every_parcel_is_left_alone(self):
+        obj = self._create_object(NOWHERE_POINT)
+
+        call_command("update_detection_parcels")
+
+        self.assertIsNone(self._parcel_of(obj))
+
+    def test_batching_covers_every_object_after_an_unmatched_one(self):
+        unmatched = self._create_object(NOWHERE_POINT)
+        objects = [self._create_object(MONTPELLIER_POINT) for _ in range(4)]
+
+        call_command("update_detection_parcels", "--batch-size", "2")
+
+        self.assertIsNone(self._parcel_of(unmatched))
+        for obj in objects:
+            self.assertEqual(self._parcel_of(obj), self.montpellier_parcel.id)
+
+    def test_department_code_scopes_the_update(self):
+        nimes = create_nimes_commune(department=create_gard_department())
+        create_parcel(commune=nimes, id_parcellaire="30189000A0001", x=4.36, y=43.84)
+        herault_obj = self._create_object(MONTPELLIER_POINT)
+        gard_obj = self._create_object(NIMES_POINT, commune=nimes)
+
+        call_command("update_detection_parcels", department_code="34")
+
+        self.assertEqual(self._parcel_of(herault_obj), self.montpellier_parcel.id)
+        self.assertIsNone(self._parcel_of(gard_obj))
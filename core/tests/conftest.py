@@ -1,6 +1,8 @@
 import pytest
 from django.core.cache import cache
 
+from core.utils.cache import user_geo_local_cache
+
 
 @pytest.fixture(autouse=True)
 def clear_cache():
@@ -8,8 +10,11 @@ def clear_cache():
 
     The test DB is rolled back per test, but the cache backend (LocMemCache) is
     not — cached counts, geometries, and version counters would otherwise leak
-    between tests and make them order-dependent.
+    between tests and make them order-dependent. The same goes for the process-local
+    user-geo LRU, whose keys would otherwise collide across tests on reused ids.
     """
     cache.clear()
+    user_geo_local_cache.clear()
     yield
     cache.clear()
+    user_geo_local_cache.clear()
@@ -0,0 +1,147 @@
+"""Tests for DetectionProcessService.merge_double_detections.
+
+The merge of every duplicated object is computed by one grouped query per chunk;
+these pin what the kept detection ends up with (envelope, priorities, latest update,
+tile) and that the other detections of the group are removed.
+"""
+
+from django.contrib.gis.geos import Polygon
+
+from core.utils.tile import slippy_tile_xy
+from core.models.detection import Detection, DetectionSource
+from core.models.detection_data import (
+    DetectionControlStatus,
+    DetectionData,
+    DetectionPrescriptionStatus,
+    DetectionValidationStatus,
+)
+from core.models.tile import TILE_DEFAULT_ZOOM
+from core.services.detection_process import DetectionProcessService
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_data,
+    create_detection_object,
+    create_tile,
+    create_tile_set,
+)
+
+
+def _square(x, y, size=0.0001):
+    return Polygon.from_bbox((x, y, x + size, y + size))
+
+
+class MergeDoubleDetectionsTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tile_set = create_tile_set()
+        self.tile = create_tile()
+        self.detection_object = create_detection_object()
+
+    def _create_detection(
+        self,
+        geometry,
+        score=0.5,
+        detection_object=None,
+        tile=None,
+        detection_source=DetectionSource.ANALYSIS,
+        **data_kwargs,
+    ):
+        data_kwargs.setdefault(
+            "detection_control_status", DetectionControlStatus.NOT_CONTROLLED
+        )
+        data_kwargs.setdefault(
+            "detection_validation_status",
+            DetectionValidationStatus.DETECTED_NOT_VERIFIED,
+        )
+        geometry.srid = 4326
+        return create_detection(
+            detection_object=detection_object or self.detection_object,
+            tile=tile or self.tile,
+            tile_set=self.tile_set,
+            geometry=geometry,
+            score=score,
+            detection_source=detection_source,
+            detection_data=create_detection_data(**data_kwargs),
+        )
+
+    def test_keeps_best_scored_detection_with_the_group_envelope(self):
+        low = self._create_detection(_square(3.880, 43.610), score=0.4)
+        best = self._create_detection(_square(3.881, 43.611), score=0.9)
+
+        DetectionProcessService.merge_double_detections(tile_set_id=self.tile_set.id)
+
+        remaining = Detection.objects.get(detection_object=self.detection_object)
+        self.assertEqual(remaining.id, best.id)
+        self.assertFalse(
+            DetectionData.objects.filter(id=low.detection_data_id).exists()
+        )
+        for actual, expected in zip(
+            remaining.geometry.extent, (3.880, 43.610, 3.8811, 43.6111)
+        ):
+            self.assertAlmostEqual(actual, expected)
+
+    def test_keeps_highest_priority_statuses(self):
+        self._create_detection(
+            _square(3.880, 43.610),
+            score=0.9,
+            detection_validation_status=DetectionValidationStatus.SUSPECT,
+        )
+        self._create_detection(
+            _square(3.880, 43.610),
+            score=0.4,
+            detection_source=DetectionSource.INTERFACE_DRAWN,
+            detection_control_status=DetectionControlStatus.CONTROLLED_FIELD,
+            detection_validation_status=DetectionValidationStatus.ILLEGAL,
+            detection_prescription_status=DetectionPrescriptionStatus.PRESCRIBED,
+        )
+
+        DetectionProcessService.merge_double_detections(tile_set_id=self.tile_set.id)
+
+        remaining = Detection.objects.select_related("detection_data").get(
+            detection_object=self.detection_object
+        )
+        self.assertEqual(remaining.detection_source, DetectionSource.INTERFACE_DRAWN)
+        data = remaining.detection_data
+        self.assertEqual(
+            data.detection_control_status, DetectionControlStatus.CONTROLLED_FIELD
+        )
+        self.assertEqual(
+            data.detection_validation_status, DetectionValidationStatus.ILLEGAL
+        )
+        self.assertEqual(
+            data.detection_prescription_status, DetectionPrescriptionStatus.PRESCRIBED
+        )
+
+    def test_moves_to_the_tile_holding_the_envelope_centroid(self):
+        tile_x, tile_y = slippy_tile_xy(3.8805, 43.6105, TILE_DEFAULT_ZOOM)
+        centroid_tile = create_tile(x=tile_x, y=tile_y, z=TILE_DEFAULT_ZOOM)
+        other_tile = create_tile(x=1, y=1, z=TILE_DEFAULT_ZOOM)
+        self._create_detection(_square(3.880, 43.610), score=0.9)
+        self._create_detection(_square(3.8809, 43.6109), score=0.4, tile=other_tile)
+
+        DetectionProcessService.merge_double_detections(tile_set_id=self.tile_set.id)
+
+        remaining = Detection.objects.get(detection_object=self.detection_object)
+        self.assertEqual(remaining.tile_id, centroid_tile.id)
+
+    def test_merges_every_chunk_and_leaves_single_detections_alone(self):
+        other_objects = [create_detection_object() for _ in range(2)]
+        for detection_object in [self.detection_object, *other_objects]:
+            self._create_detection(
+                _square(3.880, 43.610), detection_object=detection_object
+            )
+            self._create_detection(
+                _square(3.880, 43.610), detection_object=detection_object
+            )
+        single = self._create_detection(
+            _square(3.880, 43.610), detection_object=create_detection_object()
+        )
+
+        DetectionProcessService.merge_double_detections(
+            tile_set_id=self.tile_set.id, chunk_size=1
+        )
+
+        for detection_object in [self.detection_object, *other_objects]:
+            self.assertEqual(detection_object.detections.count(), 1)
+        self.assertTrue(Detection.objects.filter(id=single.id).exists())
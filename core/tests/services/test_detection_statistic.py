@@ -0,0 +1,152 @@
+"""Tests for DetectionStatisticService.
+
+The rollup must count, for every key, the detections the detection list would count
+with the matching filters; these pin the grouping, the score buckets and the
+custom-zone flag, and that a refresh drops what is no longer there.
+"""
+
+from django.contrib.gis.geos import Polygon
+from django.test import override_settings
+
+from core.models.detection import Detection
+from core.models.detection_data import DetectionValidationStatus
+from core.models.detection_statistic import DetectionStatistic
+from core.models.geo_custom_zone import GeoCustomZone
+from core.services.detection_statistic import DetectionStatisticService
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_data,
+    create_detection_object,
+    create_object_type,
+    create_tile_set,
+)
+from core.tests.fixtures.geo_data import create_montpellier_commune
+
+
+class DetectionStatisticRefreshTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.commune = create_montpellier_commune()
+        self.tile_set = create_tile_set()
+        self.object_type = create_object_type()
+
+    def _create_detection(self, score=0.95, detection_object=None, **data_kwargs):
+        data_kwargs.setdefault(
+            "detection_validation_status",
+            DetectionValidationStatus.DETECTED_NOT_VERIFIED,
+        )
+        return create_detection(
+            detection_object=detection_object
+            or create_detection_object(
+                object_type=self.object_type, commune=self.commune
+            ),
+            tile_set=self.tile_set,
+            score=score,
+            detection_data=create_detection_data(**data_kwargs),
+        )
+
+    def _counts(self, *fields):
+        return {
+            tuple(row[field] for field in fields): row["detections_count"]
+            for row in DetectionStatistic.objects.values(*fields, "detections_count")
+        }
+
+    def test_counts_detections_per_key(self):
+        self._create_detection()
+        self._create_detection()
+        self._create_detection(
+            detection_validation_status=DetectionValidationStatus.SUSPECT
+        )
+
+        DetectionStatisticService.refresh([self.commune.id])
+
+        self.assertEqual(
+            self._counts("commune_id", "tile_set_id", "detection_validation_status"),
+            {
+                (
+                    self.commune.id,
+                    self.tile_set.id,
+                    DetectionValidationStatus.DETECTED_NOT_VERIFIED,
+                ): 2,
+                (
+                    self.commune.id,
+                    self.tile_set.id,
+                    DetectionValidationStatus.SUSPECT,
+                ): 1,
+            },
+        )
+
+    def test_buckets_scores_by_percentage(self):
+        self._create_detection(score=0.29)
+        self._create_detection(score=0.295)
+
+        DetectionStatisticService.refresh([self.commune.id])
+
+        self.assertEqual(self._counts("score_bucket"), {(29,): 2})
+
+    def test_flags_detections_linked_to_a_custom_zone(self):
+        zone = GeoCustomZone.objects.create(
+            name="ZAE", geometry=Polygon.from_bbox((3.8, 43.6, 3.9, 43.7))
+        )
+        linked = self._create_detection()
+        self._create_detection()
+        linked.detection_object.geo_custom_zones.add(zone)
+
+        DetectionStatisticService.refresh([self.commune.id])
+
+        self.assertEqual(self._counts("in_custom_zone"), {(True,): 1, (False,): 1})
+
+    @override_settings(DETECTION_STATISTICS_ENABLED=True)
+    def test_refresh_tile_sets_drops_the_rows_of_deleted_detections(self):
+        detection = self._create_detection()
+        DetectionStatisticService.refresh([self.commune.id])
+
+        Detection.objects.filter(id=detection.id).delete()
+        DetectionStatisticService.refresh_tile_sets([self.tile_set.id])
+
+        self.assertFalse(DetectionStatistic.objects.exists())
+
+
+class DetectionStatisticMaintenanceTests(BaseTestCase):
+    """Single-row writes rebuild their commune in a task after the commit, and only
+    while the rollup is enabled."""
+
+    def setUp(self):
+        super().setUp()
+        self.commune = create_montpellier_commune()
+
+    def _create_detection(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_detection(
+                detection_object=create_detection_object(
+                    object_type=create_object_type(), commune=self.commune
+                ),
+                tile_set=create_tile_set(),
+                detection_data=create_detection_data(
+                    detection_validation_status=DetectionValidationStatus.SUSPECT
+                ),
+            )
+
+    @override_settings(DETECTION_STATISTICS_ENABLED=True)
+    def test_a_write_refreshes_its_commune(self):
+        self._create_detection()
+
+        self.assertEqual(
+            list(DetectionStatistic.objects.values_list("commune_id", flat=True)),
+            [self.commune.id],
+        )
+
+    def test_writes_leave_the_rollup_alone_while_disabled(self):
+        self._create_detection()
+
+        self.assertFalse(DetectionStatistic.objects.exists())
+
+
+class DetectionStatisticScoreBucketTests(BaseTestCase):
+    def test_whole_percentages_map_to_their_bucket(self):
+        self.assertEqual(DetectionStatisticService.get_score_bucket(0.29), 29)
+        self.assertEqual(DetectionStatisticService.get_score_bucket(0), 0)
+
+    def test_thresholds_inside_a_bucket_are_not_answered(self):
+        self.assertIsNone(DetectionStatisticService.get_score_bucket(0.295))
@@ -0,0 +1,130 @@
+"""Tests for GeoCustomZoneService.associate_detections_to_custom_zones.
+
+Zones and sub-zones are associated by one statement over the detections; these pin
+that both M2M tables are filled by it, that chunking by Detection.id range gives the
+same links as a single pass, that the batch filter and outdated-link removal still
+apply, and that a caller refreshing the statistics itself can skip the service's.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point, Polygon
+
+from core.models.detection_object import DetectionObject
+from core.models.geo_custom_zone import GeoCustomZone
+from core.models.geo_sub_custom_zone import GeoSubCustomZone
+from core.services.detection_statistic import DetectionStatisticService
+from core.services.geo_custom_zone import GeoCustomZoneService
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_object,
+    create_tile,
+    create_tile_set,
+)
+
+ZONE_POLYGON = Polygon.from_bbox((3.0, 43.3, 3.2, 43.5))
+ZONE_POLYGON.srid = 4326
+SUB_ZONE_POLYGON = Polygon.from_bbox((3.0, 43.3, 3.1, 43.4))
+SUB_ZONE_POLYGON.srid = 4326
+
+IN_SUB_ZONE_POINT = Point(3.05, 43.35, srid=4326)
+IN_ZONE_ONLY_POINT = Point(3.15, 43.45, srid=4326)
+OUTSIDE_POINT = Point(4.0, 44.0, srid=4326)
+
+
+class AssociateDetectionsToCustomZonesTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.zone = GeoCustomZone.objects.create(name="ZAE", geometry=ZONE_POLYGON)
+        self.sub_zone = GeoSubCustomZone.objects.create(
+            name="ZAE - sub", geometry=SUB_ZONE_POLYGON, custom_zone=self.zone
+        )
+        self.tile_set = create_tile_set()
+        self.tile = create_tile()
+
+    def _create_object(self, geometry, batch_id="batch-1"):
+        obj = create_detection_object()
+        create_detection(
+            detection_object=obj,
+            tile=self.tile,
+            tile_set=self.tile_set,
+            geometry=geometry,
+            batch_id=batch_id,
+        )
+        return obj
+
+    def _zone_object_ids(self):
+        return set(self.zone.detection_objects.values_list("id", flat=True))
+
+    def _sub_zone_object_ids(self):
+        return set(
+            DetectionObject.objects.filter(
+                geo_sub_custom_zones=self.sub_zone
+            ).values_list("id", flat=True)
+        )
+
+    def test_associates_zones_and_sub_zones_in_one_call(self):
+        in_sub_zone = self._create_object(IN_SUB_ZONE_POINT)
+        in_zone_only = self._create_object(IN_ZONE_ONLY_POINT)
+        self._create_object(OUTSIDE_POINT)
+
+        GeoCustomZoneService.associate_detections_to_custom_zones(
+            custom_zone_ids=[self.zone.id]
+        )
+
+        self.assertEqual(self._zone_object_ids(), {in_sub_zone.id, in_zone_only.id})
+        self.assertEqual(self._sub_zone_object_ids(), {in_sub_zone.id})
+
+    def test_chunked_pass_gives_the_same_links(self):
+        objects = [
+            self._create_object(point)
+            for point in (IN_SUB_ZONE_POINT, OUTSIDE_POINT, IN_ZONE_ONLY_POINT)
+        ]
+
+        GeoCustomZoneService.associate_detections_to_custom_zones(
+            custom_zone_ids=[self.zone.id], chunk_size=1
+        )
+
+        self.assertEqual(self._zone_object_ids(), {objects[0].id, objects[2].id})
+        self.assertEqual(self._sub_zone_object_ids(), {objects[0].id})
+
+    def test_only_the_given_batches_are_associated(self):
+        in_batch = self._create_object(IN_SUB_ZONE_POINT, batch_id="batch-1")
+        self._create_object(IN_SUB_ZONE_POINT, batch_id="batch-2")
+
+        GeoCustomZoneService.associate_detections_to_custom_zones(
+            custom_zone_ids=[self.zone.id], batch_ids=["batch-1"]
+        )
+
+        self.assertEqual(self._zone_object_ids(), {in_batch.id})
+        self.assertEqual(self._sub_zone_object_ids(), {in_batch.id})
+
+    def test_remove_outdated_drops_zone_and_sub_zone_links(self):
+        moved_out = self._create_object(OUTSIDE_POINT)
+        moved_out.geo_custom_zones.add(self.zone)
+        moved_out.geo_sub_custom_zones.add(self.sub_zone)
+        still_in = self._create_object(IN_SUB_ZONE_POINT)
+
+        GeoCustomZoneService.associate_detections_to_custom_zones(
+            custom_zone_ids=[self.zone.id], remove_outdated=True
+        )
+
+        self.assertEqual(self._zone_object_ids(), {still_in.id})
+        self.assertEqual(self._sub_zone_object_ids(), {still_in.id})
+
+    def test_refreshes_the_statistics_unless_the_caller_does(self):
+        self._create_object(IN_SUB_ZONE_POINT)
+
+        for refresh_statistics, expected_calls in [(True, 1), (False, 0)]:
+            with self.subTest(refresh_statistics=refresh_statistics), patch.object(
+                DetectionStatisticService, "refresh_tile_sets"
+            ) as refresh_tile_sets:
+                self.zone.detection_objects.clear()
+                with self.captureOnCommitCallbacks(execute=True):
+                    GeoCustomZoneService.associate_detections_to_custom_zones(
+                        custom_zone_ids=[self.zone.id],
+                        refresh_statistics=refresh_statistics,
+                    )
+
+                self.assertEqual(refresh_tile_sets.call_count, expected_calls)
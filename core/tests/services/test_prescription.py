@@ -0,0 +1,172 @@
+"""Tests for the set-based prescription recompute and its dirty-object tracking.
+
+PrescriptionService.compute_prescriptions must reach the same statuses as the
+per-object compute_prescription; editing an object type's duration or a tile set's
+date must flag the affected objects for `compute_prescription --dirty-only`.
+"""
+
+import datetime
+
+from django.core.management import call_command
+
+from core.models.detection import Detection
+from core.models.detection_data import (
+    DetectionControlStatus,
+    DetectionPrescriptionStatus,
+    DetectionValidationStatus,
+)
+from core.models.detection_object import DetectionObject
+from core.services.prescription import PrescriptionService
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_data,
+    create_detection_object,
+    create_object_type,
+    create_tile,
+    create_tile_set,
+)
+
+
+class ComputePrescriptionsTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.object_type = create_object_type(
+            name="Pool", prescription_duration_years=2
+        )
+        self.tile_set_2019 = create_tile_set(
+            name="2019", date=datetime.date(2019, 6, 1)
+        )
+        self.tile_set_2020 = create_tile_set(
+            name="2020", date=datetime.date(2020, 6, 1)
+        )
+        self.tile_set_2022 = create_tile_set(
+            name="2022", date=datetime.date(2022, 6, 1)
+        )
+        self.tile = create_tile()
+        self.detection_object = create_detection_object(object_type=self.object_type)
+
+    def _create_detection(self, tile_set, auto_prescribed=False, **data_kwargs):
+        return create_detection(
+            detection_object=self.detection_object,
+            tile=self.tile,
+            tile_set=tile_set,
+            auto_prescribed=auto_prescribed,
+            detection_data=create_detection_data(
+                detection_control_status=DetectionControlStatus.NOT_CONTROLLED,
+                detection_validation_status=DetectionValidationStatus.SUSPECT,
+                **data_kwargs,
+            ),
+        )
+
+    def _state(self, detection):
+        detection = Detection.objects.select_related("detection_data").get(
+            id=detection.id
+        )
+        return (
+            detection.auto_prescribed,
+            detection.detection_data.detection_prescription_status,
+        )
+
+    def test_prescribes_detections_older_than_the_duration(self):
+        oldest = self._create_detection(self.tile_set_2019)
+        recent = self._create_detection(self.tile_set_2020)
+        prescribed = self._create_detection(self.tile_set_2022)
+
+        changed = PrescriptionService.compute_prescriptions([self.detection_object.id])
+
+        self.assertEqual(changed, 1)
+        self.assertEqual(self._state(oldest), (False, None))
+        self.assertEqual(self._state(recent), (False, None))
+        self.assertEqual(
+            self._state(prescribed), (True, DetectionPrescriptionStatus.PRESCRIBED)
+        )
+
+    def test_unprescribes_when_no_longer_old_enough(self):
+        self._create_detection(self.tile_set_2020)
+        detection = self._create_detection(
+            self.tile_set_2022,
+            auto_prescribed=True,
+            detection_prescription_status=DetectionPrescriptionStatus.PRESCRIBED,
+        )
+        self.object_type.prescription_duration_years = 5
+        self.object_type.save()
+
+        PrescriptionService.compute_prescriptions([self.detection_object.id])
+
+        self.assertEqual(
+            self._state(detection), (False, DetectionPrescriptionStatus.NOT_PRESCRIBED)
+        )
+
+    def test_resets_when_the_object_type_has_no_duration(self):
+        detection = self._create_detection(
+            self.tile_set_2022,
+            auto_prescribed=True,
+            detection_prescription_status=DetectionPrescriptionStatus.PRESCRIBED,
+        )
+        self.object_type.prescription_duration_years = None
+        self.object_type.save()
+
+        PrescriptionService.compute_prescriptions([self.detection_object.id])
+
+        self.assertEqual(self._state(detection), (False, None))
+
+    def test_object_type_duration_change_flags_its_objects(self):
+        self._create_detection(self.tile_set_2019)
+        self.object_type.prescription_duration_years = 3
+        self.object_type.save()
+
+        self.detection_object.refresh_from_db()
+        self.assertTrue(self.detection_object.prescription_dirty)
+
+        PrescriptionService.compute_prescriptions([self.detection_object.id])
+
+        self.detection_object.refresh_from_db()
+        self.assertFalse(self.detection_object.prescription_dirty)
+
+    def test_tile_set_date_change_flags_its_objects(self):
+        self._create_detection(self.tile_set_2019)
+        other_object = create_detection_object(object_type=self.object_type)
+
+        self.tile_set_2019.date = datetime.date(2018, 6, 1)
+        self.tile_set_2019.save()
+
+        self.assertEqual(
+            set(
+                DetectionObject.objects.filter(prescription_dirty=True).values_list(
+                    "id", flat=True
+                )
+            ),
+            {self.detection_object.id},
+        )
+        other_object.refresh_from_db()
+        self.assertFalse(other_object.prescription_dirty)
+
+    def test_dirty_only_command_recomputes_flagged_objects(self):
+        self._create_detection(self.tile_set_2019)
+        flagged = self._create_detection(self.tile_set_2022)
+        clean_object = create_detection_object(object_type=self.object_type)
+        for tile_set in (self.tile_set_2019, self.tile_set_2022):
+            create_detection(
+                detection_object=clean_object,
+                tile=self.tile,
+                tile_set=tile_set,
+                detection_data=create_detection_data(
+                    detection_control_status=DetectionControlStatus.NOT_CONTROLLED,
+                    detection_validation_status=DetectionValidationStatus.SUSPECT,
+                ),
+            )
+        PrescriptionService.mark_dirty(
+            DetectionObject.objects.filter(id=self.detection_object.id)
+        )
+
+        call_command("compute_prescription", "--dirty-only")
+
+        self.assertEqual(
+            self._state(flagged), (True, DetectionPrescriptionStatus.PRESCRIBED)
+        )
+        self.assertFalse(
+            Detection.objects.filter(
+                detection_object=clean_object, auto_prescribed=True
+            ).exists()
+        )
@@ -7,9 +7,10 @@ the one used before". These tests assert that property rather than poking at
 Redis internals.
 """
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import SimpleTestCase, TestCase
 
 from core.models import User, UserUserGroup
 from core.models.geo_custom_zone import GeoCustomZone, GeoCustomZoneStatus
@@ -20,7 +21,12 @@ from core.tests.fixtures.detection_data import (
     create_detection_object,
     create_object_type,
 )
+from core.tests.fixtures.geo_data import (
+    create_montpellier_commune,
+    create_nimes_commune,
+)
 from core.tests.fixtures.users import (
+    add_user_to_group,
     create_regular_user,
     create_super_admin,
     create_user_group,
@@ -28,7 +34,11 @@ from core.tests.fixtures.users import (
 )
 from core.utils import cache as cache_utils
 from core.utils.cache import (
+    LocalLRUCache,
+    decode_geometry,
+    encode_geometry,
     get_count_cache_version,
+    get_count_cache_versions,
     get_tileset_filter_cache_key,
     get_user_geo_cache_key,
     invalidate_caches_for_group,
@@ -82,6 +92,30 @@ class CacheVersioningTests(TestCase):
         invalidate_count_caches()
         self.assertNotEqual(key1, generate_query_cache_key(queryset))
 
+    def test_department_invalidation_keeps_other_departments_counts(self):
+        queryset = User.objects.all()
+        key_1 = generate_query_cache_key(queryset, department_ids=[1])
+        key_2 = generate_query_cache_key(queryset, department_ids=[2])
+        key_1_and_2 = generate_query_cache_key(queryset, department_ids=[1, 2])
+        unscoped_key = generate_query_cache_key(queryset)
+
+        invalidate_count_caches(department_ids=[1])
+
+        self.assertNotEqual(
+            key_1, generate_query_cache_key(queryset, department_ids=[1])
+        )
+        self.assertNotEqual(
+            key_1_and_2, generate_query_cache_key(queryset, department_ids=[1, 2])
+        )
+        self.assertNotEqual(unscoped_key, generate_query_cache_key(queryset))
+        self.assertEqual(key_2, generate_query_cache_key(queryset, department_ids=[2]))
+
+    def test_global_invalidation_reaches_department_counts(self):
+        queryset = User.objects.all()
+        key = generate_query_cache_key(queryset, department_ids=[1])
+        invalidate_count_caches()
+        self.assertNotEqual(key, generate_query_cache_key(queryset, department_ids=[1]))
+
     def test_count_cache_key_is_user_scoped(self):
         # Two users must never share a cached count, even for identical SQL.
         queryset = User.objects.all()
@@ -114,9 +148,102 @@ class CacheFailOpenTests(TestCase):
             cache_utils.cache, "set", side_effect=Exception("down")
         ), patch.object(cache_utils.cache, "add", side_effect=Exception("down")):
             self.assertEqual(
-                get_user_geo_cache_key(1, None), "aigle:v1:user_geo:1:1:1:0"
+                get_user_geo_cache_key(1, None), "aigle:v2:user_geo:1:1:1:0"
             )
 
+    def test_simplified_tier_has_its_own_key(self):
+        self.assertNotEqual(
+            get_user_geo_cache_key(1, None),
+            get_user_geo_cache_key(1, None, simplified=True),
+        )
+
+
+class CacheBatchingTests(TestCase):
+    def test_key_reads_all_its_versions_in_one_round_trip(self):
+        with patch.object(
+            cache_utils, "safe_cache_get_many", wraps=cache_utils.safe_cache_get_many
+        ) as get_many:
+            get_user_geo_cache_key(1, None)
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args.args[0]), 2)
+
+    def test_group_members_are_bumped_in_one_pipeline(self):
+        group = create_user_group(name="PipelineGroup")
+        for email in ("p1@example.com", "p2@example.com"):
+            add_user_to_group(create_regular_user(email=email), group)
+        client = MagicMock()
+
+        with patch.object(cache_utils, "_get_redis_client", return_value=client):
+            invalidate_caches_for_group(group.id)
+
+        pipeline = client.pipeline.return_value
+        self.assertEqual(pipeline.incr.call_count, 2)
+        pipeline.execute.assert_called_once()
+
+
+class GeometryEncodingTests(SimpleTestCase):
+    def setUp(self):
+        self.geometry = MultiPolygon(
+            Polygon.from_bbox((3.80, 43.55, 3.96, 43.67)), srid=4326
+        )
+
+    def test_round_trip_keeps_geometry_and_srid(self):
+        decoded = decode_geometry(encode_geometry(self.geometry))
+        self.assertTrue(decoded.equals_exact(self.geometry))
+        self.assertEqual(decoded.srid, 4326)
+
+    def test_reads_entries_written_without_compression(self):
+        with patch.object(cache_utils, "USER_GEO_CACHE_COMPRESS", False):
+            encoded = encode_geometry(self.geometry)
+        self.assertTrue(decode_geometry(encoded).equals_exact(self.geometry))
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    def test_records_hits_and_misses(self):
+        lru = LocalLRUCache(max_entries=2, timeout=60)
+        self.assertIsNone(lru.get("a"))
+        lru.set("a", 1)
+        self.assertEqual(lru.get("a"), 1)
+        self.assertEqual(lru.stats()["hits"], 1)
+        self.assertEqual(lru.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(max_entries=2, timeout=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")  # "b" is now the least recently used
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("a"), 1)
+        self.assertEqual(lru.get("c"), 3)
+
+    def test_expired_entry_is_a_miss(self):
+        lru = LocalLRUCache(max_entries=2, timeout=60)
+        with patch.object(cache_utils.time, "monotonic", return_value=0):
+            lru.set("a", 1)
+        with patch.object(cache_utils.time, "monotonic", return_value=61):
+            self.assertIsNone(lru.get("a"))
+        self.assertEqual(lru.stats()["size"], 0)
+
+    def test_logs_its_stats_every_n_lookups(self):
+        lru = LocalLRUCache(max_entries=2, timeout=60, name="test", stats_log_every=3)
+        lru.set("a", 1)
+        with self.assertLogs("core.utils.cache", "INFO") as logs:
+            lru.get("a")
+            lru.get("b")
+            lru.get("a")
+            lru.get("a")
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("test cache", logs.output[0])
+        self.assertIn(
+            "2 hit(s), 1 miss(es), 66.7% hit rate, 1/2 entries", logs.output[0]
+        )
+
+    def test_zero_size_disables_the_cache(self):
+        lru = LocalLRUCache(max_entries=0, timeout=60)
+        lru.set("a", 1)
+        self.assertIsNone(lru.get("a"))
+
 
 class CacheSignalTests(TestCase):
     """Signals defer invalidation to transaction.on_commit, so each test runs the
@@ -181,13 +308,47 @@ class UserServiceCacheInvalidationTests(TestCase):
 
 class CountInvalidationSignalTests(TestCase):
     """Count-relevant writes beyond Detection/DetectionData/Parcel must also bump
-    the count version: single DetectionObject saves and custom-zone associations."""
+    the count versions: single DetectionObject saves and custom-zone associations.
+    Objects without commune only reach the unscoped counts."""
 
     def test_detection_object_save_invalidates_count(self):
-        version_before = get_count_cache_version()
+        version_before = get_count_cache_versions()
         with self.captureOnCommitCallbacks(execute=True):
             create_detection_object(object_type=create_object_type(name="CountSigType"))
-        self.assertNotEqual(version_before, get_count_cache_version())
+        self.assertNotEqual(version_before, get_count_cache_versions())
+
+    def test_detection_object_save_invalidates_only_its_department_counts(self):
+        montpellier = create_montpellier_commune()
+        nimes = create_nimes_commune()
+        herault_before = get_count_cache_versions([montpellier.department_id])
+        gard_before = get_count_cache_versions([nimes.department_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_detection_object(
+                object_type=create_object_type(name="CountSigScoped"),
+                commune=montpellier,
+            )
+
+        self.assertNotEqual(
+            herault_before, get_count_cache_versions([montpellier.department_id])
+        )
+        self.assertEqual(gard_before, get_count_cache_versions([nimes.department_id]))
+
+    def test_detection_object_move_invalidates_its_previous_department_counts(self):
+        montpellier = create_montpellier_commune()
+        nimes = create_nimes_commune()
+        detection_object = create_detection_object(
+            object_type=create_object_type(name="CountSigMove"), commune=montpellier
+        )
+        herault_before = get_count_cache_versions([montpellier.department_id])
+
+        detection_object.commune = nimes
+        with self.captureOnCommitCallbacks(execute=True):
+            detection_object.save()
+
+        self.assertNotEqual(
+            herault_before, get_count_cache_versions([montpellier.department_id])
+        )
 
     def test_suppress_context_skips_count_invalidation(self):
         # merge_double_detections suppresses the per-row signal and invalidates once
@@ -195,16 +356,16 @@ class CountInvalidationSignalTests(TestCase):
         obj = create_detection_object(
             object_type=create_object_type(name="CountSigSuppress")
         )
-        version_before = get_count_cache_version()
+        version_before = get_count_cache_versions()
         with self.captureOnCommitCallbacks(execute=True):
             with suppress_count_cache_invalidation():
                 obj.save()
-        self.assertEqual(version_before, get_count_cache_version())
+        self.assertEqual(version_before, get_count_cache_versions())
 
         # signal fires normally again once outside the suppression block
         with self.captureOnCommitCallbacks(execute=True):
             obj.save()
-        self.assertNotEqual(version_before, get_count_cache_version())
+        self.assertNotEqual(version_before, get_count_cache_versions())
 
     def test_custom_zone_association_invalidates_count(self):
         detection_object = create_detection_object(
@@ -214,7 +375,7 @@ class CountInvalidationSignalTests(TestCase):
             name="CountSigZone",
             geo_custom_zone_status=GeoCustomZoneStatus.ACTIVE,
         )
-        version_before = get_count_cache_version()
+        version_before = get_count_cache_versions()
         with self.captureOnCommitCallbacks(execute=True):
             detection_object.geo_custom_zones.add(zone)
-        self.assertNotEqual(version_before, get_count_cache_version())
+        self.assertNotEqual(version_before, get_count_cache_versions())
@@ -42,7 +42,12 @@ from core.tests.fixtures.users import (
     create_user_with_group,
 )
 from core.utils import cache as cache_utils
-from core.utils.pagination import CachedCountLimitOffsetPagination
+from core.utils import pagination as pagination_utils
+from core.utils.pagination import (
+    CachedCountLimitOffsetPagination,
+    EstimatedCountLimitOffsetPagination,
+)
+from core.utils.tasks import compute_query_count
 
 # bbox params as strings, matching how they arrive on the request
 MONTPELLIER_BBOX = {
@@ -154,6 +159,47 @@ class CacheDetectionVisibilityTests(BaseAPITestCase):
         self.assertIsNotNone(cold)
         self.assertTrue(cold.equals(warm))
 
+    def test_geo_union_is_served_from_the_local_cache(self):
+        bbox = _bbox_polygon(MONTPELLIER_BBOX)
+        UserPermission(user=self.user_a).get_accessible_geometry(
+            intersects_geometry=bbox
+        )
+        with patch(
+            "core.permissions.user.get_or_compute",
+            side_effect=AssertionError("not served locally"),
+        ):
+            warm = UserPermission(user=self.user_a).get_accessible_geometry(
+                intersects_geometry=bbox
+            )
+        self.assertIsNotNone(warm)
+        self.assertEqual(cache_utils.user_geo_local_cache.stats()["hits"], 1)
+
+    def test_bbox_is_read_from_the_simplified_tier(self):
+        permission = UserPermission(user=self.user_a)
+        full = permission.get_accessible_geometry(bbox=False)
+        envelope = permission.get_accessible_geometry(bbox=True)
+
+        self.assertIsNotNone(
+            cache_utils.safe_cache_get(
+                cache_utils.get_user_geo_cache_key(
+                    self.user_a.id, None, simplified=True
+                )
+            )
+        )
+        tolerance = cache_utils.USER_GEO_SIMPLIFY_TOLERANCE
+        for full_bound, simplified_bound in zip(full.extent, envelope.extent):
+            self.assertAlmostEqual(full_bound, simplified_bound, delta=tolerance)
+
+    def test_geo_union_local_cache_follows_invalidation(self):
+        UserPermission(user=self.user_a).get_accessible_geometry()
+        self.group_a.geo_zones.set([self.paris])
+        cache_utils.invalidate_caches_for_group(self.group_a.id)
+
+        geometry = UserPermission(user=self.user_a).get_accessible_geometry(
+            intersects_geometry=_bbox_polygon(MONTPELLIER_BBOX)
+        )
+        self.assertIsNone(geometry)
+
     # --- isolation: user B can never be served user A's data ---
 
     def test_user_b_cannot_see_user_a_detection_via_service(self):
@@ -238,6 +284,54 @@ class CacheDetectionVisibilityTests(BaseAPITestCase):
         count_after = pagination.get_count(queryset)
         self.assertEqual(count_after, count_before + 1)
 
+    def test_estimated_count_below_threshold_is_exact(self):
+        pagination = EstimatedCountLimitOffsetPagination()
+        with patch.object(
+            pagination_utils, "ESTIMATED_COUNT_ENABLED", True
+        ), patch.object(pagination_utils, "ESTIMATED_COUNT_THRESHOLD", 10):
+            count = pagination.get_count(Detection.objects.all())
+
+        self.assertEqual(count, 2)
+        self.assertFalse(pagination.count_approximate)
+
+    def test_estimated_count_above_threshold_is_followed_by_the_exact_count(self):
+        pagination = EstimatedCountLimitOffsetPagination()
+        queryset = Detection.objects.all()
+        with patch.object(
+            pagination_utils, "ESTIMATED_COUNT_ENABLED", True
+        ), patch.object(pagination_utils, "ESTIMATED_COUNT_THRESHOLD", 1):
+            estimated = pagination.get_count(queryset)
+            self.assertTrue(pagination.count_approximate)
+            self.assertGreaterEqual(estimated, 2)
+
+            # the background count (eager in tests) cached the exact count
+            count = pagination.get_count(queryset)
+
+        self.assertEqual(count, 2)
+        self.assertFalse(pagination.count_approximate)
+
+    def test_exact_count_inlines_geometry_and_scalar_params(self):
+        pagination = EstimatedCountLimitOffsetPagination()
+        queryset = Detection.objects.filter(
+            geometry__intersects=Polygon.from_bbox((3.0, 43.0, 5.0, 44.0)),
+            score__gte=0.5,
+        )
+        with patch.object(
+            pagination_utils, "ESTIMATED_COUNT_ENABLED", True
+        ), patch.object(pagination_utils, "ESTIMATED_COUNT_THRESHOLD", 1):
+            pagination.get_count(queryset)
+            count = pagination.get_count(queryset)
+
+        self.assertEqual(count, queryset.count())
+        self.assertFalse(pagination.count_approximate)
+
+    def test_exact_count_task_rejects_an_unsigned_query(self):
+        compute_query_count(
+            query="SELECT 1", cache_key="query_count_unsigned", timeout=60
+        )
+
+        self.assertIsNone(cache_utils.safe_cache_get("query_count_unsigned"))
+
     # --- fail-open: a Redis outage must recompute, never 500 or change results ---
 
     def test_detection_geo_endpoint_fails_open_when_cache_unavailable(self):
@@ -2,14 +2,19 @@
 
 The queries need the external `detections` schema (absent from the test DB), so
 these cover what can silently break without it: the column lists the SELECTs are
-built from must stay in sync with their serializers.
+built from must stay in sync with their serializers, and the keyset paging of the
+inference rows, driven here by a fake cursor.
 """
 
+from unittest.mock import MagicMock, patch
+
 from core.services.detections_schema import (
     BATCH_COLUMNS,
     INFERENCE_COLUMNS,
     BatchRowSerializer,
     DetectionRowSerializer,
+    DetectionsSchemaService,
+    InferenceFilter,
 )
 
 
@@ -23,3 +28,44 @@ def test_inference_columns_track_the_serializer():
 
 def test_batch_columns_track_the_serializer():
     assert BATCH_COLUMNS == list(BatchRowSerializer().get_fields().keys())
+
+
+def _inference_tuple(score, id):
+    row = dict.fromkeys(INFERENCE_COLUMNS)
+    row.update(score=score, id=id)
+    return tuple(row[column] for column in INFERENCE_COLUMNS)
+
+
+def _read_keyset(pages, page_size):
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = pages
+    with patch("core.services.detections_schema.connection") as connection:
+        connection.cursor.return_value.__enter__.return_value = cursor
+        rows = list(
+            DetectionsSchemaService.get_inference_rows_keyset(
+                InferenceFilter(batch_id="b"), page_size=page_size
+            )
+        )
+    return rows, cursor.execute.call_args_list
+
+
+def test_keyset_pages_resume_after_the_last_score_and_id():
+    rows, executes = _read_keyset(
+        [
+            [_inference_tuple(0.9, 3), _inference_tuple(0.8, 7)],
+            [_inference_tuple(0.8, 2)],
+        ],
+        page_size=2,
+    )
+
+    assert [(row["score"], row["id"]) for row in rows] == [(0.9, 3), (0.8, 7), (0.8, 2)]
+    assert executes[0].args[1] == ["b", 2]
+    assert "(score, id) < (%s, %s)" in executes[1].args[0]
+    assert executes[1].args[1] == ["b", 0.8, 7, 2]
+
+
+def test_keyset_stops_on_an_empty_page_after_a_full_one():
+    rows, executes = _read_keyset([[_inference_tuple(0.5, 1)], []], page_size=1)
+
+    assert [row["id"] for row in rows] == [1]
+    assert len(executes) == 2
@@ -2,14 +2,22 @@
 
 The HTTP download is bypassed: the function is fed synthetic Etalab-shaped
 features directly, so these tests cover the parts that can actually break —
-upsert-by-id_parcellaire, department-scoped stale deletion, unknown-commune
-skipping, and DetectionObject.parcel link preservation.
+the COPY/staging upsert-by-id_parcellaire, department-scoped stale deletion,
+unknown-commune skipping, and DetectionObject.parcel link preservation.
 """
 
+import gzip
+import json
+import os
+import tempfile
+from concurrent.futures import Executor, Future
 from unittest.mock import MagicMock, patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
 
+from core.management.commands._common.geojson import GeoJSONFeatureReader
 from core.management.commands.import_parcels import import_department_parcels
 from core.models.parcel import Parcel
 from core.tests.base import BaseTestCase
@@ -100,6 +108,32 @@ class ImportDepartmentParcelsTests(BaseTestCase):
         self.assertEqual(parcel.id, parcel_id)  # same row (PK preserved)
         self.assertEqual(parcel.contenance, 2500)  # refreshed in place
 
+    def test_duplicate_feature_is_upserted_once(self):
+        features = [
+            make_feature("34172000A0001", "34172", contenance=1000),
+            make_feature("34172000A0001", "34172", contenance=1000),
+        ]
+        upserted, deleted, skipped = import_department_parcels("34", features)
+
+        self.assertEqual((upserted, deleted, skipped), (1, 0, 0))
+        self.assertEqual(Parcel.objects.count(), 1)
+
+    def test_empty_prefix_and_section_are_stored_as_empty_strings(self):
+        upserted, deleted, skipped = import_department_parcels(
+            "34", [make_feature("34172000A0001", "34172", prefixe="", section="")]
+        )
+
+        self.assertEqual((upserted, deleted, skipped), (1, 0, 0))
+        parcel = Parcel.objects.get(id_parcellaire="34172000A0001")
+        self.assertEqual((parcel.prefix, parcel.section), ("", ""))
+
+    def test_stores_geometry_in_wgs84(self):
+        import_department_parcels("34", [make_feature("34172000A0001", "34172")])
+
+        parcel = Parcel.objects.only("geometry").get(id_parcellaire="34172000A0001")
+        self.assertEqual(parcel.geometry.srid, 4326)
+        self.assertAlmostEqual(parcel.geometry.centroid.x, 3.88)
+
     def test_deletes_stale_parcels_scoped_to_department(self):
         # A parcel in another department must survive a Hérault import.
         gard = create_gard_department()
@@ -208,3 +242,157 @@ class ImportDepartmentParcelsTests(BaseTestCase):
         call_command("import_parcels", "--department-code", "34", "--dry-run")
 
         mock_refresh.assert_not_called()
+
+
+class InlineExecutor(Executor):
+    """Stands in for the process pool: runs each task in the test's own process
+    and transaction, where forked workers could not see the test data."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+@patch("core.management.commands.import_parcels.connections", MagicMock())
+@patch("core.management.commands.import_parcels.ProcessPoolExecutor", InlineExecutor)
+@patch("core.management.commands.import_parcels.DeployedDataService.refresh_cache")
+@patch("core.management.commands.import_parcels.get_data_parcels")
+class ImportParcelsParallelTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        create_montpellier_commune(department=create_herault_department())
+        create_nimes_commune(department=create_gard_department())
+        self.features_by_department = {
+            "34": [make_feature("34172000A0001", "34172")],
+            "30": [make_feature("30189000A0001", "30189")],
+        }
+
+    def _get_data_parcels(self, department):
+        return MagicMock(), self.features_by_department[department]
+
+    def test_imports_every_department_and_refreshes_once(self, mock_get, mock_refresh):
+        mock_get.side_effect = self._get_data_parcels
+
+        call_command(
+            "import_parcels",
+            "--department-code",
+            "34",
+            "--department-code",
+            "30",
+            "--parallel",
+            "2",
+        )
+
+        self.assertEqual(Parcel.objects.count(), 2)
+        mock_refresh.assert_called_once()
+
+    def test_failed_department_does_not_stop_the_others(self, mock_get, mock_refresh):
+        def get_data_parcels(department):
+            if department == "30":
+                raise CommandError("download failed")
+            return self._get_data_parcels(department)
+
+        mock_get.side_effect = get_data_parcels
+
+        with self.assertRaisesMessage(CommandError, "30"):
+            call_command(
+                "import_parcels",
+                "--department-code",
+                "34",
+                "--department-code",
+                "30",
+                "--parallel",
+                "2",
+            )
+
+        self.assertTrue(Parcel.objects.filter(id_parcellaire="34172000A0001").exists())
+        mock_refresh.assert_called_once()
+
+    def test_runs_serially_under_a_daemonic_process(self, mock_get, mock_refresh):
+        mock_get.side_effect = self._get_data_parcels
+
+        with patch(
+            "core.management.commands.import_parcels.multiprocessing.current_process",
+            return_value=MagicMock(daemon=True),
+        ), patch(
+            "core.management.commands.import_parcels.ProcessPoolExecutor",
+            side_effect=AssertionError(
+                "daemonic processes are not allowed to have children"
+            ),
+        ):
+            call_command(
+                "import_parcels",
+                "--department-code",
+                "34",
+                "--department-code",
+                "30",
+                "--parallel",
+                "2",
+            )
+
+        self.assertEqual(Parcel.objects.count(), 2)
+        mock_refresh.assert_called_once()
+
+
+def write_feature_collection(features, indent=None):
+    file = tempfile.NamedTemporaryFile(suffix=".json.gz", delete=False)
+    file.close()
+    with gzip.open(file.name, "wt") as gz_file:
+        json.dump(
+            {"type": "FeatureCollection", "features": features}, gz_file, indent=indent
+        )
+    return file.name
+
+
+class GeoJSONFeatureReaderTests(SimpleTestCase):
+    def _read(self, features, **kwargs):
+        file_path = write_feature_collection(features, **kwargs)
+        self.addCleanup(os.remove, file_path)
+        # tiny chunks so features and separators straddle chunk boundaries
+        return list(GeoJSONFeatureReader(file_path, chunk_size=64))
+
+    def test_yields_every_feature_in_order(self):
+        features = [
+            make_feature(f"34172000A{index:04d}", "34172") for index in range(50)
+        ]
+        self.assertEqual(self._read(features), features)
+        self.assertEqual(self._read(features, indent=2), features)
+
+    def test_empty_collection(self):
+        self.assertEqual(self._read([]), [])
+
+    def test_truncated_file_raises(self):
+        file = tempfile.NamedTemporaryFile(suffix=".json.gz", delete=False)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        with gzip.open(file.name, "wt") as gz_file:
+            gz_file.write('{"type": "FeatureCollection", "features": [{"type": "Fea')
+
+        with self.assertRaises(ValueError):
+            list(GeoJSONFeatureReader(file.name, chunk_size=16))
+
+
+class ImportDepartmentParcelsStreamTests(BaseTestCase):
+    def test_imports_from_a_feature_stream(self):
+        herault = create_herault_department()
+        create_montpellier_commune(department=herault)
+        file_path = write_feature_collection(
+            [
+                make_feature("34172000A0001", "34172"),
+                make_feature("99999000A0001", "99999"),
+            ]
+        )
+        self.addCleanup(os.remove, file_path)
+
+        upserted, deleted, skipped = import_department_parcels(
+            "34", GeoJSONFeatureReader(file_path)
+        )
+
+        self.assertEqual((upserted, deleted, skipped), (1, 0, 1))
@@ -0,0 +1,108 @@
+"""Tests for the keyset (cursor) mode of the list pagination.
+
+Walking every page by cursor must return exactly the rows of the ordered queryset,
+in order, whatever the ordering: ties (resolved by id), descending fields, and
+nullable relations (NULLs last ascending, first descending).
+"""
+
+from django.contrib.gis.geos import Point
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models.detection import Detection
+from core.tests.base import BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_object,
+    create_object_type,
+    create_tile,
+    create_tile_set,
+)
+from core.tests.fixtures.geo_data import create_montpellier_commune, create_parcel
+from core.utils.pagination import EstimatedCountLimitOffsetPagination
+
+
+def _request(**params):
+    return Request(APIRequestFactory().get("/detections/", params))
+
+
+class KeysetPaginationTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        commune = create_montpellier_commune()
+        object_type = create_object_type()
+        tile_set = create_tile_set()
+        tile = create_tile()
+        parcels = [
+            create_parcel(commune=commune, id_parcellaire=f"00000{i}", x=3.88, y=43.61)
+            for i in range(2)
+        ]
+
+        for i, score in enumerate([0.5, 0.9, 0.5, 0.7, 0.5, 0.9, 0.3]):
+            create_detection(
+                detection_object=create_detection_object(
+                    object_type=object_type,
+                    commune=commune,
+                    parcel=parcels[i % 2] if i % 3 else None,
+                ),
+                tile=tile,
+                tile_set=tile_set,
+                geometry=Point(3.88, 43.61, srid=4326),
+                score=score,
+            )
+
+    def _walk(self, queryset, limit=2):
+        ids = []
+        cursor = ""
+        while True:
+            pagination = EstimatedCountLimitOffsetPagination()
+            page = pagination.paginate_queryset(
+                queryset, _request(cursor=cursor, limit=limit)
+            )
+            ids += [detection.id for detection in page]
+            if pagination.next_cursor is None:
+                return ids
+            cursor = pagination.next_cursor
+
+    def _assert_walks_the_whole_ordering(self, *ordering):
+        queryset = Detection.objects.order_by(*ordering)
+        self.assertEqual(
+            self._walk(queryset), list(queryset.values_list("id", flat=True))
+        )
+
+    def test_descending_score_with_ties(self):
+        self._assert_walks_the_whole_ordering("-score", "id")
+
+    def test_nullable_relation_ascending(self):
+        self._assert_walks_the_whole_ordering(
+            "detection_object__parcel__section",
+            "detection_object__parcel__num_parcel",
+            "id",
+        )
+
+    def test_nullable_relation_descending(self):
+        self._assert_walks_the_whole_ordering(
+            "-detection_object__parcel__section",
+            "-detection_object__parcel__num_parcel",
+            "id",
+        )
+
+    def test_id_is_added_to_make_the_key_unique(self):
+        queryset = Detection.objects.order_by("score")
+        self.assertEqual(
+            self._walk(queryset),
+            list(queryset.order_by("score", "id").values_list("id", flat=True)),
+        )
+
+    def test_cursor_of_another_ordering_is_rejected(self):
+        pagination = EstimatedCountLimitOffsetPagination()
+        pagination.paginate_queryset(
+            Detection.objects.order_by("score", "id"), _request(cursor="", limit=2)
+        )
+
+        with self.assertRaises(NotFound):
+            EstimatedCountLimitOffsetPagination().paginate_queryset(
+                Detection.objects.order_by("-score", "id"),
+                _request(cursor=pagination.next_cursor, limit=2),
+            )
@@ -0,0 +1,78 @@
+"""Tests for the request-scoped memo (core/utils/request_cache.py).
+
+Inside a scope each key is computed once; outside one every call recomputes, and a
+version bump made during the request must be visible to the rest of that request.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase
+
+from core.permissions.user import UserPermission
+from core.tests.fixtures.detection_data import create_object_type
+from core.tests.fixtures.users import create_super_admin
+from core.utils import cache as cache_utils
+from core.utils.cache import get_count_cache_version, invalidate_count_caches
+from core.utils.request_cache import (
+    forget_request_memo,
+    request_cache_scope,
+    request_memoize,
+)
+
+
+class RequestMemoizeTests(SimpleTestCase):
+    def test_computes_once_per_scope(self):
+        compute = MagicMock(return_value=1)
+        with request_cache_scope():
+            self.assertEqual(request_memoize("k", compute), 1)
+            self.assertEqual(request_memoize("k", compute), 1)
+        self.assertEqual(compute.call_count, 1)
+
+    def test_scopes_do_not_share_values(self):
+        compute = MagicMock(return_value=1)
+        with request_cache_scope():
+            request_memoize("k", compute)
+        with request_cache_scope():
+            request_memoize("k", compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_recomputes_outside_a_scope(self):
+        compute = MagicMock(return_value=1)
+        request_memoize("k", compute)
+        request_memoize("k", compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_forget_recomputes_on_next_use(self):
+        compute = MagicMock(return_value=1)
+        with request_cache_scope():
+            request_memoize("k", compute)
+            forget_request_memo("k")
+            request_memoize("k", compute)
+        self.assertEqual(compute.call_count, 2)
+
+
+class RequestCacheVersionTests(TestCase):
+    def test_version_is_read_once_per_request(self):
+        with request_cache_scope(), patch.object(
+            cache_utils, "safe_cache_get_many", wraps=cache_utils.safe_cache_get_many
+        ) as safe_cache_get_many:
+            get_count_cache_version()
+            get_count_cache_version()
+        self.assertEqual(safe_cache_get_many.call_count, 1)
+
+    def test_bump_during_the_request_is_visible(self):
+        with request_cache_scope():
+            before = get_count_cache_version()
+            invalidate_count_caches()
+            self.assertNotEqual(before, get_count_cache_version())
+
+    def test_object_types_are_queried_once_per_request(self):
+        user = create_super_admin()
+        create_object_type(name="Pool")
+        with request_cache_scope():
+            UserPermission(user=user).get_user_object_types_with_status()
+            with self.assertNumQueries(0):
+                object_types = UserPermission(
+                    user=user
+                ).get_user_object_types_with_status()
+        self.assertEqual([ot.name for ot, _ in object_types], ["Pool"])
@@ -0,0 +1,128 @@
+"""Tests for the annotation grid's SQL binning.
+
+The grid counts detections per cell with one GROUP BY on the slippy tile of their
+centroid, so CentroidTileX/Y must land on the same tile as slippy_tile_xy (which
+import_detections uses to attach detections to their tile), and a detection joined
+once per selected custom zone must still count once.
+"""
+
+from django.contrib.gis.geos import GEOSGeometry, Point, Polygon
+from django.urls import reverse
+from rest_framework import status
+
+from core.utils.tile import slippy_tile_xy
+from core.models.detection import Detection
+from core.models.detection_data import DetectionValidationStatus
+from core.models.geo_custom_zone import GeoCustomZone
+from core.models.tile import TILE_DEFAULT_ZOOM
+from core.models.tile_set import TileSetType
+from core.tests.base import BaseAPITestCase, BaseTestCase
+from core.tests.fixtures.detection_data import (
+    create_detection,
+    create_detection_data,
+    create_detection_object,
+    create_object_type,
+    create_tile,
+    create_tile_set,
+)
+from core.tests.fixtures.geo_data import create_complete_geo_hierarchy
+from core.tests.fixtures.users import create_user_with_group
+from core.views.utils.get_annotation_grid import (
+    GRID_SIZE,
+    CentroidTileX,
+    CentroidTileY,
+    grid_cell,
+)
+
+GEOMETRY = (
+    "POLYGON ((3.88 43.61, 3.8801 43.61, 3.8801 43.6101, 3.88 43.6101, 3.88 43.61))"
+)
+CENTROID_LON, CENTROID_LAT = 3.88005, 43.61005
+
+
+class AnnotationGridBinningTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.detection = create_detection(geometry=GEOSGeometry(GEOMETRY, srid=4326))
+
+    def test_centroid_tile_matches_slippy_tile_xy(self):
+        tile = Detection.objects.annotate(
+            tile_x=CentroidTileX("geometry", zoom=TILE_DEFAULT_ZOOM),
+            tile_y=CentroidTileY("geometry", zoom=TILE_DEFAULT_ZOOM),
+        ).values("tile_x", "tile_y")[0]
+
+        self.assertEqual(
+            (int(tile["tile_x"]), int(tile["tile_y"])),
+            slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM),
+        )
+
+    def test_grid_cell_groups_tiles_by_grid_size(self):
+        cell = Detection.objects.annotate(
+            cell_x=grid_cell(CentroidTileX("geometry", zoom=TILE_DEFAULT_ZOOM)),
+            cell_y=grid_cell(CentroidTileY("geometry", zoom=TILE_DEFAULT_ZOOM)),
+        ).values("cell_x", "cell_y")[0]
+        tile_x, tile_y = slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM)
+
+        self.assertEqual(
+            (cell["cell_x"], cell["cell_y"]),
+            (tile_x // GRID_SIZE * GRID_SIZE, tile_y // GRID_SIZE * GRID_SIZE),
+        )
+
+
+class AnnotationGridEndpointTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        montpellier = create_complete_geo_hierarchy()["communes"]["montpellier"]
+        self.user, _, _ = create_user_with_group(
+            email="grid@test.com", geo_zones=[montpellier]
+        )
+        self.object_type = create_object_type(name="Pool")
+        tile_set = create_tile_set(name="TS grid", tile_set_type=TileSetType.BACKGROUND)
+        tile_set.geo_zones.set([montpellier])
+
+        tile_x, tile_y = slippy_tile_xy(CENTROID_LON, CENTROID_LAT, TILE_DEFAULT_ZOOM)
+        cell_x, cell_y = (
+            tile_x // GRID_SIZE * GRID_SIZE,
+            tile_y // GRID_SIZE * GRID_SIZE,
+        )
+        for x in range(cell_x, cell_x + GRID_SIZE):
+            for y in range(cell_y, cell_y + GRID_SIZE):
+                create_tile(x=x, y=y, z=TILE_DEFAULT_ZOOM)
+
+        detection = create_detection(
+            detection_object=create_detection_object(
+                object_type=self.object_type, commune=montpellier
+            ),
+            tile_set=tile_set,
+            geometry=Point(CENTROID_LON, CENTROID_LAT, srid=4326),
+            detection_data=create_detection_data(
+                detection_validation_status=DetectionValidationStatus.SUSPECT
+            ),
+        )
+        self.zones = [
+            GeoCustomZone.objects.create(
+                name=name, geometry=Polygon.from_bbox((3.8, 43.5, 4.0, 43.7))
+            )
+            for name in ["Zone grid A", "Zone grid B"]
+        ]
+        detection.detection_object.geo_custom_zones.add(*self.zones)
+
+    def test_detection_in_two_selected_zones_is_counted_once(self):
+        self.authenticate_user(self.user)
+
+        response = self.client.get(
+            reverse("get-annotation-grid/"),
+            {
+                "swLng": CENTROID_LON - 0.0001,
+                "swLat": CENTROID_LAT - 0.0001,
+                "neLng": CENTROID_LON + 0.0001,
+                "neLat": CENTROID_LAT + 0.0001,
+                "objectTypesUuids": str(self.object_type.uuid),
+                "customZonesUuids": ",".join(str(zone.uuid) for zone in self.zones),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (feature,) = response.json()["features"]
+        self.assertEqual(feature["properties"]["total"], 1)
+        self.assertEqual(feature["properties"]["reviewed"], 1)
@@ -3,6 +3,7 @@ from rest_framework import status
 
 from core.models.detection import Detection
 from core.models.geo_custom_zone import GeoCustomZone
+from core.services.detection_mvt import DetectionMvtService
 from core.tests.base import BaseAPITestCase
 from core.tests.fixtures.users import create_super_admin, create_regular_user
 from core.tests.fixtures.detection_data import (
@@ -144,3 +145,83 @@ class DetectionCreateCustomZoneTests(BaseAPITestCase):
         )
         response = self._post()
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DetectionGeoTilesTests(BaseAPITestCase):
+    """The vector tile route reuses the list's filters: same custom zone
+    requirement, the tile bounds standing in for the bbox."""
+
+    # tile holding the fixture's detection point (3.88, 43.61)
+    TILE_URL_KWARGS = {"z": "14", "x": "8368", "y": "5982"}
+
+    def setUp(self):
+        super().setUp()
+        self.regular = create_regular_user(email="dgtiles@test.com")
+        self.geo_data = create_complete_geo_hierarchy()
+        self.detection_setup = create_complete_detection_setup(
+            commune=self.geo_data["communes"]["montpellier"],
+        )
+        self.custom_zone = GeoCustomZone.objects.create(
+            name="Zone MTP tiles",
+            geometry=self.create_bbox_polygon(3.0, 43.0, 4.0, 44.0),
+        )
+
+    def _get(self, params, **url_kwargs):
+        url = reverse(
+            "DetectionGeoViewSet-tiles", kwargs=url_kwargs or self.TILE_URL_KWARGS
+        )
+        return self.client.get(url, params)
+
+    def test_returns_a_vector_tile(self):
+        self.authenticate_user(self.regular)
+        response = self._get({"customZonesUuids": str(self.custom_zone.uuid)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+
+    def test_tile_with_a_zero_bound_is_not_empty(self):
+        # z1/1/0 spans lng 0..180 and lat 0..85: its west and south bounds are 0.0
+        setup = self.detection_setup
+        setup["tile_set"].geo_zones.set([self.geo_data["communes"]["montpellier"]])
+        setup["detection_object"].geo_custom_zones.add(self.custom_zone)
+        self.authenticate_user(create_super_admin(email="dgtilesadmin@test.com"))
+
+        response = self._get(
+            {
+                "customZonesUuids": str(self.custom_zone.uuid),
+                "objectTypesUuids": str(setup["object_type"].uuid),
+            },
+            z="1",
+            x="1",
+            y="0",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(response.content), 0)
+
+    def test_without_custom_zones_returns_400(self):
+        self.authenticate_user(self.regular)
+        response = self._get({})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tile_out_of_range_returns_400(self):
+        self.authenticate_user(self.regular)
+        response = self._get(
+            {"customZonesUuids": str(self.custom_zone.uuid)}, z="2", x="4", y="0"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthenticated(self):
+        response = self._get({})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tile_bbox_contains_the_detection(self):
+        sw_lng, sw_lat, ne_lng, ne_lat = DetectionMvtService.get_tile_bbox(
+            14, 8368, 5982
+        )
+
+        self.assertTrue(sw_lng <= 3.88 <= ne_lng)
+        self.assertTrue(sw_lat <= 43.61 <= ne_lat)
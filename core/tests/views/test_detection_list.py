@@ -1,16 +1,42 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 
+from core.models.detection import DetectionSource
+from core.models.detection_data import (
+    DetectionControlStatus,
+    DetectionPrescriptionStatus,
+    DetectionValidationStatus,
+)
 from core.models.geo_custom_zone import GeoCustomZone
+from core.services.detection_statistic import DetectionStatisticService
 from core.tests.base import BaseAPITestCase
 from core.tests.fixtures.users import (
     create_super_admin,
     create_regular_user,
     create_user_group,
+    create_user_with_group,
     add_user_to_group,
 )
-from core.tests.fixtures.detection_data import create_complete_detection_setup
+from core.tests.fixtures.detection_data import (
+    create_complete_detection_setup,
+    create_detection,
+    create_detection_data,
+    create_detection_object,
+    create_object_type,
+    create_tile,
+    create_tile_set,
+)
 from core.tests.fixtures.geo_data import create_complete_geo_hierarchy
+from core.views.detection.detection_list import (
+    DOWNLOAD_VALUES,
+    add_detection_object_names,
+    process_rows,
+)
 
 
 class DetectionListViewSetTests(BaseAPITestCase):
@@ -52,3 +78,221 @@ class DetectionListViewSetTests(BaseAPITestCase):
         url = reverse("DetectionListViewSet-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_download_csv_streams_the_header_and_rows(self):
+        self.authenticate_user(self.regular)
+        url = reverse("DetectionListViewSet-download")
+        response = self.client.get(
+            url,
+            {"customZonesUuids": str(self.custom_zone.uuid), "outputFormat": "csv"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[0], "Object n°")
+
+    def test_download_xlsx(self):
+        self.authenticate_user(self.regular)
+        url = reverse("DetectionListViewSet-download")
+        response = self.client.get(
+            url,
+            {"customZonesUuids": str(self.custom_zone.uuid), "outputFormat": "xlsx"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('filename="detection_list.xlsx"', response["Content-Disposition"])
+
+    def test_add_detection_object_names_inserts_the_names_after_the_values(self):
+        detection_object = self.detection_setup["detection_object"]
+        detection_object.geo_custom_zones.add(self.custom_zone)
+        row = [detection_object.id] + [None] * (len(DOWNLOAD_VALUES) - 1) + ["center"]
+
+        (result,) = add_detection_object_names(iter([row]))
+
+        self.assertEqual(
+            result[len(DOWNLOAD_VALUES) :],
+            [["Montpellier 2024"], ["Zone DL"], "center"],
+        )
+
+
+class ProcessRowsTests(SimpleTestCase):
+    """process_rows merges the adjacent rows of a detection object as they stream."""
+
+    @staticmethod
+    def _row(object_id, tile_sets, custom_zones):
+        return [
+            object_id,
+            f"uuid-{object_id}",
+            "Montpellier",
+            "Piscine",
+            "AB",
+            "12",
+            0.5,
+            "ANALYSIS",
+            "NOT_CONTROLLED",
+            None,
+            "DETECTED_NOT_VERIFIED",
+            tile_sets,
+            custom_zones,
+            Point(3.88, 43.61, srid=4326),
+        ]
+
+    def test_merges_rows_of_the_same_object(self):
+        results = list(
+            process_rows(
+                iter(
+                    [
+                        self._row(1, ["2021"], ["Zone A"]),
+                        self._row(1, ["2024"], [None]),
+                        self._row(2, ["2024"], []),
+                    ]
+                )
+            )
+        )
+
+        self.assertEqual([row[0] for row in results], [1, 2])
+        self.assertEqual(set(results[0][11].split(", ")), {"2021", "2024"})
+        self.assertEqual(results[0][12], "Zone A")
+        self.assertEqual(results[0][13:], [3.88, 43.61])
+
+    def test_no_rows(self):
+        self.assertEqual(list(process_rows(iter([]))), [])
+
+
+class DetectionListOverviewStatisticsTests(BaseAPITestCase):
+    """The overview must count the same detections from the DetectionStatistic rollup
+    as from the detections themselves, for every filter the rollup answers."""
+
+    def setUp(self):
+        super().setUp()
+        montpellier = create_complete_geo_hierarchy()["communes"]["montpellier"]
+        self.user, _, _ = create_user_with_group(
+            email="overview@test.com", geo_zones=[montpellier]
+        )
+        self.object_type = create_object_type(name="Pool")
+        self.custom_zone = GeoCustomZone.objects.create(
+            name="Zone overview",
+            geometry=self.create_bbox_polygon(3.0, 43.0, 4.0, 44.0),
+        )
+        tile_set_2021 = create_tile_set(name="Overview 2021", date=date(2021, 6, 1))
+        tile_set_2024 = create_tile_set(name="Overview 2024", date=date(2024, 6, 1))
+        for tile_set in [tile_set_2021, tile_set_2024]:
+            tile_set.geo_zones.set([montpellier])
+
+        for tile_set, score, source, validation_status, prescription, in_zone in [
+            # not in the last tile set: left out by both
+            (
+                tile_set_2021,
+                0.9,
+                DetectionSource.ANALYSIS,
+                DetectionValidationStatus.SUSPECT,
+                None,
+                True,
+            ),
+            (
+                tile_set_2024,
+                0.9,
+                DetectionSource.ANALYSIS,
+                DetectionValidationStatus.DETECTED_NOT_VERIFIED,
+                None,
+                True,
+            ),
+            (
+                tile_set_2024,
+                0.4,
+                DetectionSource.ANALYSIS,
+                DetectionValidationStatus.SUSPECT,
+                DetectionPrescriptionStatus.PRESCRIBED,
+                True,
+            ),
+            (
+                tile_set_2024,
+                0.6,
+                DetectionSource.ANALYSIS,
+                DetectionValidationStatus.ILLEGAL,
+                DetectionPrescriptionStatus.NOT_PRESCRIBED,
+                False,
+            ),
+            (
+                tile_set_2024,
+                0.2,
+                DetectionSource.INTERFACE_DRAWN,
+                DetectionValidationStatus.SUSPECT,
+                None,
+                False,
+            ),
+            (
+                tile_set_2024,
+                0.7,
+                DetectionSource.INTERFACE_DRAWN,
+                DetectionValidationStatus.LEGITIMATE,
+                DetectionPrescriptionStatus.PRESCRIBED,
+                True,
+            ),
+        ]:
+            detection = create_detection(
+                detection_object=create_detection_object(
+                    object_type=self.object_type, commune=montpellier
+                ),
+                tile=create_tile(),
+                tile_set=tile_set,
+                score=score,
+                detection_source=source,
+                detection_data=create_detection_data(
+                    detection_control_status=DetectionControlStatus.NOT_CONTROLLED,
+                    detection_validation_status=validation_status,
+                    detection_prescription_status=prescription,
+                ),
+            )
+            if in_zone:
+                detection.detection_object.geo_custom_zones.add(self.custom_zone)
+
+        with override_settings(DETECTION_STATISTICS_ENABLED=True):
+            DetectionStatisticService.refresh_all()
+
+    def _overview(self, params, statistics_enabled):
+        with override_settings(DETECTION_STATISTICS_ENABLED=statistics_enabled):
+            response = self.client.get(
+                reverse("DetectionListViewSet-get-overview"),
+                {
+                    "objectTypesUuids": str(self.object_type.uuid),
+                    "customZonesUuids": str(self.custom_zone.uuid),
+                    **params,
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_rollup_and_live_overviews_are_equal(self):
+        self.authenticate_user(self.user)
+
+        for params in [
+            {},
+            {"score": "0.5"},
+            {"interfaceDrawn": "ALL"},
+            {"interfaceDrawn": "INSIDE_SELECTED_ZONES"},
+            {"interfaceDrawn": "NONE"},
+            {"prescripted": "true"},
+            {"prescripted": "false"},
+            {"interfaceDrawn": "ALL", "score": "0.5", "prescripted": "false"},
+        ]:
+            with self.subTest(params=params):
+                live = self._overview(params, statistics_enabled=False)
+                with patch.object(
+                    DetectionStatisticService,
+                    "count_by_validation_status",
+                    wraps=DetectionStatisticService.count_by_validation_status,
+                ) as count_by_validation_status:
+                    rollup = self._overview(params, statistics_enabled=True)
+
+                count_by_validation_status.assert_called_once()
+                self.assertEqual(rollup, live)
+
+    def test_overview_is_not_empty(self):
+        self.authenticate_user(self.user)
+
+        overview = self._overview({"interfaceDrawn": "ALL"}, statistics_enabled=False)
+
+        # the 2021 detection is not in the last tile set
+        self.assertEqual(overview["totalCount"], 5)
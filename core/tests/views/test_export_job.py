@@ -0,0 +1,134 @@
+"""Tests for the background export jobs.
+
+A job replays the synchronous export endpoint as its user: the file it stores must
+be what that endpoint returns, and an export the user may not run must end in
+ERROR instead of leaking data.
+"""
+
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.models.command_run import CommandRunStatus
+from core.models.export_job import ExportJob, ExportJobType
+from core.tests.base import BaseAPITestCase
+from core.tests.fixtures.detection_data import create_tile_set
+from core.tests.fixtures.users import create_regular_user, create_super_admin
+from core.utils.tasks import reap_orphaned_export_jobs
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportJobViewSetTests(BaseAPITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.super_admin = create_super_admin(email="exportadmin@test.com")
+        self.regular = create_regular_user(email="exportuser@test.com")
+        create_tile_set(name="Export 2024")
+
+    def _create(self, params):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"{reverse('ExportJobViewSet-list')}?{params}", format="json"
+            )
+
+    def test_runs_the_export_and_serves_the_file(self):
+        self.authenticate_user(self.super_admin)
+
+        response = self._create(f"exportType={ExportJobType.TILE_SET}")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        export_job = ExportJob.objects.get(uuid=response.json()["uuid"])
+        self.assertEqual(export_job.status, CommandRunStatus.SUCCESS)
+
+        detail = self.client.get(
+            reverse("ExportJobViewSet-detail", kwargs={"uuid": export_job.uuid})
+        )
+        self.assertIsNotNone(detail.json()["downloadUrl"])
+
+        download = self.client.get(
+            reverse("ExportJobViewSet-download", kwargs={"uuid": export_job.uuid})
+        )
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertIn(b"Export 2024", b"".join(download.streaming_content))
+
+    def test_export_the_user_may_not_run_ends_in_error(self):
+        self.authenticate_user(self.regular)
+
+        response = self._create(f"exportType={ExportJobType.TILE_SET}")
+
+        export_job = ExportJob.objects.get(uuid=response.json()["uuid"])
+        self.assertEqual(export_job.status, CommandRunStatus.ERROR)
+        self.assertFalse(export_job.file)
+
+    def test_jobs_of_other_users_are_not_visible(self):
+        self.authenticate_user(self.super_admin)
+        response = self._create(f"exportType={ExportJobType.TILE_SET}")
+
+        self.authenticate_user(self.regular)
+        detail = self.client.get(
+            reverse("ExportJobViewSet-detail", kwargs={"uuid": response.json()["uuid"]})
+        )
+
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_export_type_returns_400(self):
+        self.authenticate_user(self.super_admin)
+
+        response = self._create("exportType=NOPE")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ExportJob.objects.exists())
+
+
+class ReapOrphanedExportJobsTests(BaseAPITestCase):
+    """A worker restart must not leave export jobs RUNNING forever, and only the
+    exports worker may reap them."""
+
+    @staticmethod
+    def _worker(*queues):
+        return SimpleNamespace(
+            app=SimpleNamespace(
+                amqp=SimpleNamespace(
+                    queues=SimpleNamespace(
+                        consume_from={queue: None for queue in queues}
+                    )
+                )
+            )
+        )
+
+    def setUp(self):
+        super().setUp()
+        user = create_regular_user(email="reaper@test.com")
+        self.running = ExportJob.objects.create(
+            user=user,
+            export_type=ExportJobType.TILE_SET,
+            status=CommandRunStatus.RUNNING,
+        )
+        self.pending = ExportJob.objects.create(
+            user=user, export_type=ExportJobType.TILE_SET
+        )
+
+    def test_exports_worker_boot_marks_running_jobs_as_error(self):
+        reap_orphaned_export_jobs(sender=self._worker("exports"))
+
+        self.running.refresh_from_db()
+        self.pending.refresh_from_db()
+        self.assertEqual(self.running.status, CommandRunStatus.ERROR)
+        self.assertEqual(self.pending.status, CommandRunStatus.PENDING)
+
+    def test_other_worker_boot_leaves_export_jobs(self):
+        reap_orphaned_export_jobs(sender=self._worker("celery", "sequential_commands"))
+
+        self.running.refresh_from_db()
+        self.assertEqual(self.running.status, CommandRunStatus.RUNNING)
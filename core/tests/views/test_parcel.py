@@ -37,6 +37,16 @@ class ParcelViewSetTests(BaseAPITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_download_streams_a_csv(self):
+        self.authenticate_user(self.regular)
+        url = reverse("ParcelViewSet-download")
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[0], "Commune")
+
     def test_retrieve(self):
         self.authenticate_user(self.regular)
         parcel = self.parcels[0]
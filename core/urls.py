@@ -2,6 +2,7 @@ from core.views.detection import DetectionGeoViewSet
 from core.views.detection.detection_list import DetectionListViewSet
 from core.views.detection_data import DetectionDataViewSet
 from core.views.detection_object import DetectionObjectViewSet
+from core.views.export_job import ExportJobViewSet
 from core.views.external_api import (
     ExternalAPITestView,
     ExternalAPIUpdateControlStatusView,
@@ -73,6 +74,7 @@ router.register(
 )
 router.register("detection-data", DetectionDataViewSet, basename="DetectionDataViewSet")
 router.register("run-command", CommandAsyncViewSet, basename="CommandAsyncViewSet")
+router.register("export-job", ExportJobViewSet, basename="ExportJobViewSet")
 router.register(
     "user-action-log", UserActionLogViewSet, basename="UserActionLogViewSet"
 )
@@ -17,15 +17,25 @@ re-cache not-yet-committed data under the new version, which is worse.
 Caches and their invalidation contract
 --------------------------------------
 1. user-geo union  — UserPermission.get_accessible_geometry; key get_user_geo_cache_key.
+   Stored as EWKB (encode_geometry), full resolution plus a simplified tier.
    Invalidated by: the user's version (group-membership change), the group's version
    (group.geo_zones change), or the global geo version (geo-zone geometry re-import).
+   Fronted by a per-process LRU (user_geo_local_cache) holding the union prepared
+   for predicates, keyed on the same versioned key so the same bumps reach it.
 2. tileset filter  — TileSetPermission._get_cached_tilesets; key get_tileset_filter_cache_key.
    Invalidated by: the user's/group's version (accessible-zone change) or the global
    tileset version (TileSet save/delete or TileSet.geo_zones change).
-3. pagination count — CachedCountLimitOffsetPagination; key folds in get_count_cache_version().
-   Invalidated by: the global count version, bumped on any write to Detection,
-   DetectionData, DetectionObject or Parcel, or a DetectionObject.geo_custom_zones m2m
-   change.
+3. pagination count — CachedCountLimitOffsetPagination; key folds in
+   get_count_cache_versions(department_ids). Partitioned by department: a count whose
+   rows are restricted to some departments (the list's collectivity filter) depends on
+   those departments' versions, any other count on the "unscoped" version.
+   Invalidated by: a write to Detection, DetectionData, DetectionObject or Parcel, or a
+   DetectionObject.geo_custom_zones m2m change, which bumps the departments of the rows
+   it touched (get_count_cache_department_ids) and the unscoped version; writes whose
+   scope is not worth resolving (offline geo/parcel re-imports) bump the global count
+   version every count key also folds in.
+   In estimated-count mode a miss caches the count only once it is exact: right away
+   under the threshold, else from the compute_query_count background task.
 4. deployed-data overview — DeployedDataService (SUPER_ADMIN dashboard); keys fold in
    get_deployed_data_cache_version(). Invalidated ONLY by invalidate_deployed_data_cache(),
    called out-of-band by `warm_deployed_data_cache` after a detection/parcel import — NOT
@@ -42,19 +52,27 @@ Fail-open contract
 ------------------
 Redis sits in the request path and in write-path signals, so a backend outage must
 degrade to "recompute" — never 500 a read, block a write, or serve corrupt data.
-Every access goes through safe_cache_get / safe_cache_set / get_or_compute /
-_increment_version, which swallow and log backend errors; with the version counters
+Every access goes through safe_cache_get / safe_cache_set / safe_cache_add /
+get_or_compute / _increment_version, which swallow and log backend errors; with the version counters
 unreachable, every key resolves to version 1 consistently, so callers just recompute.
 """
 
 import contextvars
 import logging
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Callable, Optional, TypeVar
+from typing import Callable, Iterable, List, Optional, Set, TypeVar
 
+from django.contrib.gis.geos import GEOSGeometry
 from django.core.cache import cache
 
+from core.utils.parsing import strtobool
+from core.utils.request_cache import forget_request_memo, request_memoize_many
+
 logger = logging.getLogger(__name__)
 
 # When set, the count-cache signal handlers skip their per-row invalidation. For
@@ -83,7 +101,7 @@ def count_cache_invalidation_suppressed() -> bool:
 # Namespace + schema version for every key. Bump CACHE_SCHEMA_VERSION to force a
 # one-time cold start of the whole cache (e.g. if a cached value's pickled shape
 # changes); old keys are simply orphaned and expire by TTL.
-CACHE_SCHEMA_VERSION = 1
+CACHE_SCHEMA_VERSION = 2
 _NS = f"aigle:v{CACHE_SCHEMA_VERSION}"
 
 # TTLs in seconds, overridable via env so they can be tuned on the server (edit .env,
@@ -96,6 +114,20 @@ TILESET_FILTER_CACHE_TTL = int(
     os.environ.get("TILESET_FILTER_CACHE_TTL", 24 * 60 * 60)
 )  # 24h
 COUNT_CACHE_TTL = int(os.environ.get("COUNT_CACHE_TTL", 2 * 60 * 60))  # 2h
+# Per-process L1 in front of the user-geo cache (see LocalLRUCache). Entries are keyed
+# on the versioned key so invalidation reaches them too; the TTL only bounds how long
+# a process keeps a union it has stopped being asked for.
+USER_GEO_L1_MAX_ENTRIES = int(os.environ.get("USER_GEO_L1_MAX_ENTRIES", 256))
+USER_GEO_L1_TTL = int(os.environ.get("USER_GEO_L1_TTL", 10 * 60))  # 10min
+# Each process logs its L1 hit/miss counters at INFO every this many lookups (0: never).
+USER_GEO_L1_STATS_LOG_EVERY = int(os.environ.get("USER_GEO_L1_STATS_LOG_EVERY", 1000))
+# User-geo unions are stored as (optionally zlib-compressed) EWKB, in two tiers: the
+# full-resolution union for permission-exact filtering, and one simplified by this
+# tolerance (degrees, ~100m) for coarse uses such as the map's initial bbox.
+USER_GEO_CACHE_COMPRESS = strtobool(os.environ.get("USER_GEO_CACHE_COMPRESS", "true"))
+USER_GEO_SIMPLIFY_TOLERANCE = float(
+    os.environ.get("USER_GEO_SIMPLIFY_TOLERANCE", 0.001)
+)
 VERSION_TTL = None  # version counters anchor invalidation — must never expire
 
 T = TypeVar("T")
@@ -112,6 +144,14 @@ def safe_cache_get(key: str, default=None):
         return default
 
 
+def safe_cache_get_many(keys: List[str]) -> dict:
+    try:
+        return cache.get_many(keys)
+    except Exception:
+        logger.exception("Cache get_many failed for %d key(s)", len(keys))
+        return {}
+
+
 def safe_cache_set(key: str, value, timeout) -> None:
     try:
         cache.set(key, value, timeout=timeout)
@@ -119,6 +159,16 @@ def safe_cache_set(key: str, value, timeout) -> None:
         logger.exception("Cache set failed for key %s", key)
 
 
+def safe_cache_add(key: str, value, timeout) -> bool:
+    """cache.add: True if the key was absent and is now set. False on a backend
+    error, so callers treat an outage as "someone else holds it"."""
+    try:
+        return cache.add(key, value, timeout=timeout)
+    except Exception:
+        logger.exception("Cache add failed for key %s", key)
+        return False
+
+
 def get_or_compute(
     key: str, compute: Callable[[], Optional[T]], timeout
 ) -> Optional[T]:
@@ -138,27 +188,178 @@ def get_or_compute(
     return value
 
 
+# --- Geometry serialization -------------------------------------------------------
+
+# One-byte header so entries written with and without compression can be read back
+# whatever USER_GEO_CACHE_COMPRESS is currently set to.
+_GEOMETRY_RAW = b"\x00"
+_GEOMETRY_ZLIB = b"\x01"
+
+
+def encode_geometry(geometry: GEOSGeometry) -> bytes:
+    """EWKB (keeps the SRID), compressed unless disabled, instead of a pickled GEOS
+    object: smaller in Redis and parsed straight by GEOS on the way back."""
+    ewkb = bytes(geometry.ewkb)
+    if USER_GEO_CACHE_COMPRESS:
+        return _GEOMETRY_ZLIB + zlib.compress(ewkb)
+    return _GEOMETRY_RAW + ewkb
+
+
+def decode_geometry(value: bytes) -> GEOSGeometry:
+    header, payload = value[:1], value[1:]
+    if header == _GEOMETRY_ZLIB:
+        payload = zlib.decompress(payload)
+    elif header != _GEOMETRY_RAW:
+        raise ValueError(f"Unknown geometry encoding {header!r}")
+    return GEOSGeometry(memoryview(payload))
+
+
+# --- Process-local L1 --------------------------------------------------------------
+
+
+class LocalLRUCache:
+    """Bounded, thread-safe in-process LRU with a per-entry TTL.
+
+    Sits in front of the shared cache for values that are expensive to transfer and
+    deserialize (the user-geo union is megabytes for a department-scoped user). It
+    must only ever be keyed on a *versioned* key: it is never invalidated directly, a
+    version bump simply makes the next lookup build a key it does not hold. Evicted
+    or superseded entries are dropped least-recently-used first.
+
+    Counters are per process, so every ``stats_log_every`` lookups the cache logs its
+    ``stats()`` at INFO under ``name``, tagged with the pid.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        timeout: int,
+        name: str = "local",
+        stats_log_every: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.name = name
+        self.stats_log_every = stats_log_every
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            lookups = self.hits + self.misses
+        if self.stats_log_every > 0 and lookups % self.stats_log_every == 0:
+            self.log_stats()
+        return None if entry is None else entry[1]
+
+    def set(self, key: str, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        logger.info(
+            "%s cache (pid %d): %d hit(s), %d miss(es), %.1f%% hit rate, %d/%d entries",
+            self.name,
+            os.getpid(),
+            stats["hits"],
+            stats["misses"],
+            100 * stats["hits"] / lookups if lookups else 0.0,
+            stats["size"],
+            stats["max_entries"],
+        )
+
+
+user_geo_local_cache = LocalLRUCache(
+    USER_GEO_L1_MAX_ENTRIES,
+    USER_GEO_L1_TTL,
+    name="user-geo L1",
+    stats_log_every=USER_GEO_L1_STATS_LOG_EVERY,
+)
+
+
 # --- Version counters (the invalidation mechanism) ------------------------------
 
 
 def _get_version(version_key: str) -> int:
-    version = safe_cache_get(version_key)
-    if version is None:
-        # SETNX init (cache.add only writes if absent) so a reader can never clobber a
-        # concurrent _increment_version by writing 1 over an already-bumped value —
-        # the cold-start / post-Redis-restart lost-update race. Re-read to pick up
-        # whichever value actually won.
-        try:
-            cache.add(version_key, 1, timeout=VERSION_TTL)
-            version = cache.get(version_key)
-        except Exception:
-            logger.exception("Cache add failed for key %s", version_key)
+    return _get_versions(version_key)[0]
+
+
+def _get_versions(*version_keys: str) -> List[int]:
+    """Resolve several version counters in one round-trip (MGET on Redis).
+
+    Each counter is read once per request: a map request builds the same keys many
+    times over, and counters already memoized are not fetched again.
+    """
+    versions = request_memoize_many(
+        [("cache_version", version_key) for version_key in version_keys],
+        _read_versions,
+    )
+    return [versions[("cache_version", version_key)] for version_key in version_keys]
+
+
+def _read_versions(memo_keys: List[tuple]) -> dict:
+    version_keys = [version_key for _, version_key in memo_keys]
+    found = safe_cache_get_many(version_keys)
+    versions = {}
+    for version_key in version_keys:
+        version = found.get(version_key)
         if version is None:
-            version = 1
+            version = _init_version(version_key)
+        versions[("cache_version", version_key)] = version
+    return versions
+
+
+def _init_version(version_key: str) -> int:
+    # SETNX init (cache.add only writes if absent) so a reader can never clobber a
+    # concurrent _increment_version by writing 1 over an already-bumped value — the
+    # cold-start / post-Redis-restart lost-update race. Re-read to pick up whichever
+    # value actually won.
+    version = None
+    try:
+        cache.add(version_key, 1, timeout=VERSION_TTL)
+        version = cache.get(version_key)
+    except Exception:
+        logger.exception("Cache add failed for key %s", version_key)
+    if version is None:
+        version = 1
     return version
 
 
 def _increment_version(version_key: str) -> None:
+    # A request that writes and then reads must build its keys from the new version.
+    forget_request_memo(("cache_version", version_key))
     try:
         # add() is a no-op if the key exists; it guarantees incr() has a base so we
         # never fall back to an unconditional set(2) that could clobber a higher,
@@ -170,6 +371,41 @@ def _increment_version(version_key: str) -> None:
         logger.exception("Cache incr failed for key %s", version_key)
 
 
+def _increment_versions(version_keys: List[str]) -> None:
+    """_increment_version for many counters, in one Redis pipeline (SET NX 0 + INCR
+    per key, the same add-then-incr as above). Backends without a Redis client (the
+    tests' LocMemCache) fall back to one _increment_version per key."""
+    client = _get_redis_client()
+    if client is None:
+        for version_key in version_keys:
+            _increment_version(version_key)
+        return
+
+    for version_key in version_keys:
+        forget_request_memo(("cache_version", version_key))
+    try:
+        pipeline = client.pipeline()
+        for version_key in version_keys:
+            redis_key = cache.make_and_validate_key(version_key)
+            pipeline.set(redis_key, 0, nx=True)
+            pipeline.incr(redis_key)
+        pipeline.execute()
+    except Exception:
+        logger.exception("Cache incr failed for %d version key(s)", len(version_keys))
+
+
+def _get_redis_client():
+    """Raw write client of Django's RedisCache, or None for any other backend."""
+    get_client = getattr(getattr(cache, "_cache", None), "get_client", None)
+    if get_client is None:
+        return None
+    try:
+        return get_client(write=True)
+    except Exception:
+        logger.exception("Could not get a Redis client")
+        return None
+
+
 def _user_version_key(user_id: int) -> str:
     return f"{_NS}:ver:user:{user_id}"
 
@@ -182,32 +418,42 @@ def _group_version_key(group_id: int) -> str:
 _GEO_VERSION_KEY = f"{_NS}:ver:geo"
 _TILESET_VERSION_KEY = f"{_NS}:ver:tileset"
 _COUNT_VERSION_KEY = f"{_NS}:ver:count"
+_COUNT_UNSCOPED_VERSION_KEY = f"{_NS}:ver:count:unscoped"
 _DEPLOYED_DATA_VERSION_KEY = f"{_NS}:ver:deployed_data"
 
 
 # --- Cache-key builders ---------------------------------------------------------
 
 
-def _scope_version(user_id: int, scoped_user_group_id) -> int:
-    """Version that scopes a per-user cache: the group's when impersonating a group,
+def _count_department_version_key(department_id: int) -> str:
+    return f"{_NS}:ver:count:department:{department_id}"
+
+
+def _scope_version_key(user_id: int, scoped_user_group_id) -> str:
+    """Counter that scopes a per-user cache: the group's when impersonating a group,
     else the user's own. invalidate_caches_for_group bumps both, so either is safe."""
     if scoped_user_group_id:
-        return _get_version(_group_version_key(scoped_user_group_id))
-    return _get_version(_user_version_key(user_id))
+        return _group_version_key(scoped_user_group_id)
+    return _user_version_key(user_id)
 
 
-def get_user_geo_cache_key(user_id: int, scoped_user_group_id) -> str:
-    geo_version = _get_version(_GEO_VERSION_KEY)
-    version = _scope_version(user_id, scoped_user_group_id)
+def get_user_geo_cache_key(
+    user_id: int, scoped_user_group_id, simplified: bool = False
+) -> str:
+    geo_version, version = _get_versions(
+        _GEO_VERSION_KEY, _scope_version_key(user_id, scoped_user_group_id)
+    )
     group_part = scoped_user_group_id or 0
-    return f"{_NS}:user_geo:{geo_version}:{version}:{user_id}:{group_part}"
+    tier = "user_geo_simplified" if simplified else "user_geo"
+    return f"{_NS}:{tier}:{geo_version}:{version}:{user_id}:{group_part}"
 
 
 def get_tileset_filter_cache_key(
     user_id: int, scoped_user_group_id, filter_hash: str
 ) -> str:
-    version = _scope_version(user_id, scoped_user_group_id)
-    ts_version = _get_version(_TILESET_VERSION_KEY)
+    version, ts_version = _get_versions(
+        _scope_version_key(user_id, scoped_user_group_id), _TILESET_VERSION_KEY
+    )
     group_part = scoped_user_group_id or 0
     return (
         f"{_NS}:ts_filter:{version}:{ts_version}:{user_id}:{group_part}:{filter_hash}"
@@ -218,6 +464,30 @@ def get_count_cache_version() -> int:
     return _get_version(_COUNT_VERSION_KEY)
 
 
+def get_count_cache_versions(department_ids: Optional[Iterable[int]] = None) -> str:
+    """The versions a cached count depends on, as a key part: the global one, then the
+    unscoped one (department_ids None: the count may include any department's rows)
+    or each of these departments'."""
+    if department_ids is None:
+        version, unscoped_version = _get_versions(
+            _COUNT_VERSION_KEY, _COUNT_UNSCOPED_VERSION_KEY
+        )
+        return f"{version}_all{unscoped_version}"
+
+    department_ids = sorted(set(department_ids))
+    version, *department_versions = _get_versions(
+        _COUNT_VERSION_KEY,
+        *[_count_department_version_key(d) for d in department_ids],
+    )
+    department_part = "-".join(
+        f"d{department_id}.{department_version}"
+        for department_id, department_version in zip(
+            department_ids, department_versions
+        )
+    )
+    return f"{version}_{department_part}"
+
+
 def get_deployed_data_cache_version() -> int:
     return _get_version(_DEPLOYED_DATA_VERSION_KEY)
 
@@ -251,8 +521,7 @@ def invalidate_caches_for_group(group_id: int) -> None:
         )
         return
 
-    for uid in user_ids:
-        _increment_version(_user_version_key(uid))
+    _increment_versions([_user_version_key(uid) for uid in user_ids])
 
     logger.info(
         "Invalidated caches for group %s and %d member(s)", group_id, len(user_ids)
@@ -271,11 +540,72 @@ def invalidate_tileset_filter_caches() -> None:
     logger.info("Invalidated all tileset filter caches")
 
 
-def invalidate_count_caches() -> None:
+def invalidate_count_caches(department_ids: Optional[Iterable[int]] = None) -> None:
     """A count-relevant row (Detection/DetectionData/DetectionObject/Parcel or a
-    detection's custom-zone link) changed -> every cached pagination count."""
-    _increment_version(_COUNT_VERSION_KEY)
-    logger.info("Invalidated all pagination count caches")
+    detection's custom-zone link) changed -> the cached pagination counts that may
+    include it: those of its departments (see get_count_cache_department_ids) and the
+    unscoped ones. Without department_ids, every cached count."""
+    if department_ids is None:
+        _increment_version(_COUNT_VERSION_KEY)
+        logger.info("Invalidated all pagination count caches")
+        return
+
+    department_ids = sorted(set(department_ids))
+    _increment_versions(
+        [
+            _COUNT_UNSCOPED_VERSION_KEY,
+            *[_count_department_version_key(d) for d in department_ids],
+        ]
+    )
+    logger.info(
+        "Invalidated pagination count caches of %d department(s)", len(department_ids)
+    )
+
+
+def get_count_cache_department_ids(
+    commune_ids: Optional[Iterable[Optional[int]]] = None,
+    parcel_ids=None,
+    detection_object_ids=None,
+) -> Set[int]:
+    """Departments whose cached counts a write to these rows changes (ids as lists or
+    subqueries). Resolve them inside the writer's transaction, before the rows can be
+    gone. A detection object counts in its commune's department and its parcel's: the
+    parcel list counts detections by parcel, and a parcel can lie across a department
+    border from its objects. Rows without commune only reach unscoped counts, which
+    every scoped invalidation bumps."""
+    from core.models.detection_object import DetectionObject
+    from core.models.geo_commune import GeoCommune
+    from core.models.parcel import Parcel
+
+    department_ids = set()
+
+    if commune_ids is not None:
+        department_ids.update(
+            GeoCommune.objects.filter(id__in=commune_ids)
+            .values_list("department_id", flat=True)
+            .distinct()
+        )
+    if parcel_ids is not None:
+        department_ids.update(
+            Parcel.objects.filter(id__in=parcel_ids)
+            .values_list("commune__department_id", flat=True)
+            .distinct()
+        )
+    if detection_object_ids is not None:
+        detection_objects = DetectionObject.objects.filter(id__in=detection_object_ids)
+        department_ids.update(
+            detection_objects.values_list(
+                "commune__department_id", flat=True
+            ).distinct()
+        )
+        department_ids.update(
+            detection_objects.values_list(
+                "parcel__commune__department_id", flat=True
+            ).distinct()
+        )
+
+    department_ids.discard(None)
+    return department_ids
 
 
 def invalidate_deployed_data_cache() -> None:
@@ -1,55 +1,168 @@
+import base64
 import hashlib
+import json
+import logging
+import os
+from typing import Any, Iterable, List, Optional
 
-from django.db.models import QuerySet
+from django.core import signing
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from core.utils.cache import (
     COUNT_CACHE_TTL,
-    get_count_cache_version,
+    get_count_cache_versions,
     get_or_compute,
+    safe_cache_add,
+    safe_cache_get,
+    safe_cache_set,
 )
+from core.utils.parsing import strtobool
 
+logger = logging.getLogger(__name__)
 
-def generate_query_cache_key(queryset, scope=None):
+# Estimated-count mode (EstimatedCountLimitOffsetPagination): on a count cache miss,
+# count at most ESTIMATED_COUNT_THRESHOLD + 1 rows. Below the threshold that is the
+# exact count; above it the response carries the planner's estimate, flagged
+# approximate, while the exact count is computed in the background and cached for the
+# next request.
+ESTIMATED_COUNT_ENABLED = strtobool(
+    os.environ.get("PAGINATION_ESTIMATED_COUNT_ENABLED", "false")
+)
+ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get("PAGINATION_ESTIMATED_COUNT_THRESHOLD", 1000)
+)
+# How long a scheduled background count keeps others for the same key from being
+# scheduled; it expires on its own if the worker never picks the task up.
+BACKGROUND_COUNT_PENDING_TTL = 10 * 60
+
+
+def generate_query_cache_key(
+    queryset, scope=None, department_ids: Optional[Iterable[int]] = None
+):
     """Cache key for a queryset's COUNT.
 
-    Combines the model, the full SQL (which inlines the filters), the global count
-    version (so any detection/parcel write invalidates it), and an optional ``scope``
-    string. The scope is the requesting user, so two users whose querysets render to
-    coincidentally-identical SQL can never share a cached count — isolation is
-    explicit here, not dependent on every permission predicate being inlined.
+    Combines the model, the full SQL (which inlines the filters), the count versions
+    (so a detection/parcel write invalidates it), and an optional ``scope`` string.
+    ``department_ids`` are the departments the queryset's rows are restricted to: the
+    key then only depends on their versions, so a write elsewhere keeps it; None for a
+    queryset that may include any department's rows. The scope is the requesting user,
+    so two users whose querysets render to coincidentally-identical SQL can never share
+    a cached count — isolation is explicit here, not dependent on every permission
+    predicate being inlined.
     """
     query_hash = hashlib.md5(str(queryset.query).encode()).hexdigest()
     model_name = queryset.model._meta.model_name
-    version = get_count_cache_version()
+    version = get_count_cache_versions(department_ids)
     scope_part = f"{scope}_" if scope else ""
     return f"query_count_{model_name}_{scope_part}{version}_{query_hash}"
 
 
+def get_planner_row_estimate(queryset: QuerySet) -> Optional[int]:
+    """Rows the PostgreSQL planner expects the queryset to return (EXPLAIN, the query
+    is not run), or None if it cannot be read."""
+    try:
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        logger.exception("Could not read the planner row estimate")
+        return None
+
+
+def schedule_exact_count(queryset: QuerySet, cache_key: str, timeout) -> None:
+    """Compute queryset.count() in a Celery task and cache it at cache_key, once per
+    key at a time. Fail-open: if it cannot be scheduled, the count stays estimated."""
+    from core.utils.tasks import COUNT_QUERY_SIGNING_SALT, compute_query_count
+
+    if not safe_cache_add(
+        f"{cache_key}_pending", True, timeout=BACKGROUND_COUNT_PENDING_TTL
+    ):
+        return
+
+    try:
+        # JSON-safe for the broker: the SQL with its params inlined by the driver
+        sql = connections[queryset.db].ops.compose_sql(
+            *queryset.query.get_compiler(queryset.db).as_sql()
+        )
+        compute_query_count.delay(
+            query=signing.dumps(sql, salt=COUNT_QUERY_SIGNING_SALT, compress=True),
+            cache_key=cache_key,
+            timeout=timeout,
+        )
+    except Exception:
+        logger.exception("Could not schedule the exact count for key %s", cache_key)
+
+
 class CachedCountLimitOffsetPagination(LimitOffsetPagination):
     """LimitOffsetPagination that caches the (expensive) total COUNT per query.
 
     The count is version-invalidated on every count-relevant write (see
     core.utils.cache.invalidate_count_caches), so cache_timeout is only a backstop.
+    With estimate_count (and ESTIMATED_COUNT_ENABLED), a cache miss no longer waits
+    for the full COUNT: see ESTIMATED_COUNT_THRESHOLD.
     """
 
     use_distinct = True
     cache_timeout = COUNT_CACHE_TTL
 
+    estimate_count = False
+    count_approximate = False
+    count_department_ids = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # The view knows which departments its rows are restricted to (see
+        # generate_query_cache_key); views without get_count_cache_department_ids
+        # keep unscoped counts.
+        get_department_ids = getattr(view, "get_count_cache_department_ids", None)
+        self.count_department_ids = get_department_ids() if get_department_ids else None
+        return super().paginate_queryset(queryset, request, view)
+
     def get_count(self, queryset):
+        self.count_approximate = False
+
         if not isinstance(queryset, QuerySet):
             return len(queryset)
 
-        cache_key = generate_query_cache_key(queryset, scope=self._count_cache_scope())
-        return get_or_compute(
-            cache_key, lambda: self._compute_count(queryset), self.cache_timeout
+        cache_key = generate_query_cache_key(
+            queryset,
+            scope=self._count_cache_scope(),
+            department_ids=self.count_department_ids,
         )
 
-    def _compute_count(self, queryset):
+        if not (self.estimate_count and ESTIMATED_COUNT_ENABLED):
+            return get_or_compute(
+                cache_key, lambda: self._compute_count(queryset), self.cache_timeout
+            )
+
+        count = safe_cache_get(cache_key)
+        if count is not None:
+            return count
+        return self._estimate_count(queryset, cache_key)
+
+    def _count_queryset(self, queryset: QuerySet) -> QuerySet:
         if self.use_distinct:
-            return queryset.distinct().count()
-        return super().get_count(queryset)
+            return queryset.distinct()
+        return queryset
+
+    def _compute_count(self, queryset):
+        return self._count_queryset(queryset).count()
+
+    def _estimate_count(self, queryset: QuerySet, cache_key: str) -> int:
+        count_queryset = self._count_queryset(queryset).order_by()
+        capped_count = count_queryset[: ESTIMATED_COUNT_THRESHOLD + 1].count()
+
+        if capped_count <= ESTIMATED_COUNT_THRESHOLD:
+            safe_cache_set(cache_key, capped_count, self.cache_timeout)
+            return capped_count
+
+        self.count_approximate = True
+        schedule_exact_count(count_queryset, cache_key, self.cache_timeout)
+        # the planner may underestimate: there are more rows than the capped count
+        return max(capped_count, get_planner_row_estimate(count_queryset) or 0)
 
     def _count_cache_scope(self):
         """Scope the count cache to the requesting user so identical SQL across users
@@ -62,8 +175,143 @@ class CachedCountLimitOffsetPagination(LimitOffsetPagination):
         return Response(
             {
                 "count": self.count,
+                "countApproximate": self.count_approximate,
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
                 "results": data,
             }
         )
+
+
+def _get_ordering_value(instance, field: str) -> Any:
+    """The value of an order_by field on a row: a field, an annotation, or a path
+    through (prefetched) relations, None when a relation on the way is null."""
+    value = instance
+    for part in field.lstrip("-").split("__"):
+        if value is None:
+            return None
+        value = getattr(value, part)
+    return value
+
+
+def keyset_q(ordering: List[str], values: List[Any]) -> Q:
+    """Rows strictly after `values` in `ordering` (order_by fields, the last one
+    unique), with PostgreSQL's NULL placement: last ascending, first descending."""
+    q = Q(pk__in=[])
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip("-")
+        descending = field.startswith("-")
+
+        if value is None:
+            after = Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+            equal = Q(**{f"{name}__isnull": True})
+        else:
+            after = Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+            if not descending:
+                after |= Q(**{f"{name}__isnull": True})
+            equal = Q(**{name: value})
+
+        q = after | (equal & q)
+    return q
+
+
+class KeysetPaginationMixin:
+    """Cursor mode for a LimitOffsetPagination: requested with the `cursor` query
+    parameter (empty for the first page), each page is read after the sort key of
+    the previous page's last row instead of past `offset` rows, so deep pages cost
+    the same as the first one. The cursor holds that key: the queryset's order_by
+    fields, completed with the id to be unique. There is no count (the overview
+    endpoints give the totals) and no previous link: it is meant for infinite
+    scrolling."""
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    keyset_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = self.cursor_query_param in request.query_params
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        ordering = self._get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(
+                keyset_q(ordering, self._decode_cursor(cursor, ordering))
+            )
+
+        rows = list(queryset[: self.limit + 1])
+        page = rows[: self.limit]
+
+        self.next_cursor = None
+        if len(rows) > self.limit:
+            self.next_cursor = self._encode_cursor(
+                ordering,
+                [_get_ordering_value(page[-1], field) for field in ordering],
+            )
+        return page
+
+    def _get_keyset_ordering(self, queryset: QuerySet) -> List[str]:
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        if any(not isinstance(field, str) for field in ordering):
+            raise ValueError("Keyset pagination only supports order_by field names")
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("id")
+        return ordering
+
+    def _encode_cursor(self, ordering: List[str], values: List[Any]) -> str:
+        payload = json.dumps({"ordering": ordering, "values": values})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode_cursor(self, cursor: str, ordering: List[str]) -> List[Any]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload["values"]
+        except (ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # a cursor from another ordering does not position this one
+        if payload.get("ordering") != ordering or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": None,
+                "results": data,
+            }
+        )
+
+
+class EstimatedCountLimitOffsetPagination(
+    KeysetPaginationMixin, CachedCountLimitOffsetPagination
+):
+    """For the big lists, whose first page must not block on a full COUNT; the
+    response's countApproximate tells the client when count is an estimate. Also
+    serves keyset pages (see KeysetPaginationMixin) for infinite scrolling."""
+
+    estimate_count = True
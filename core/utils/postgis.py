@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 from django.db import connection
 from django.db.models import Func, CharField, TextChoices
 
@@ -24,6 +26,25 @@ def ST_TileEnvelope(z: int, x: int, y: int):
         return row[0] if row else None
 
 
+def ST_TileEnvelopes(tiles: List[Tuple[int, int, int]]) -> List[str]:
+    """ST_TileEnvelope for many (z, x, y) at once, in one query, in input order."""
+    if not tiles:
+        return []
+
+    zs, xs, ys = (list(values) for values in zip(*tiles))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT ST_AsText(ST_Transform(ST_TileEnvelope(t.z, t.x, t.y), %s))
+            FROM unnest(%s::int[], %s::int[], %s::int[])
+                WITH ORDINALITY AS t(z, x, y, position)
+            ORDER BY t.position
+            """,
+            [SRID, zs, xs, ys],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
 class Simplify(Func):
     function = "ST_Simplify"
     output_field = models_gis.GeometryField()
@@ -39,6 +60,22 @@ class SimplifyVW(Func):
     output_field = models_gis.GeometryField()
 
 
+class TileEnvelope(Func):
+    """ST_TileEnvelope(z, x, y): bounds of a slippy-map tile, in EPSG:3857."""
+
+    function = "ST_TileEnvelope"
+    arity = 3
+    output_field = models_gis.GeometryField(srid=3857)
+
+
+class AsMVTGeom(Func):
+    """ST_AsMVTGeom(geometry, bounds): geometry clipped and converted to the tile's
+    integer coordinate space, for ST_AsMVT."""
+
+    function = "ST_AsMVTGeom"
+    output_field = models_gis.GeometryField(srid=3857)
+
+
 class GeometryType(TextChoices):
     POINT = "POINT"
     LINESTRING = "LINESTRING"
@@ -0,0 +1,63 @@
+"""Request-scoped memoization.
+
+One map request builds UserPermission/TileSetPermission several times (services,
+filters, serializers), and each one re-resolves the same scoped group, object types
+and cache version counters — a Redis round-trip or a small query every time.
+RequestCacheMiddleware opens a scope per request; inside it, request_memoize()
+computes each key once. Outside a scope (Celery tasks, management commands, shell)
+it just calls ``compute``, so callers never need to know whether they run in a
+request.
+
+Only memoize values that cannot legitimately change mid-request, or forget them
+at the write that changes them (see _increment_version in core/utils/cache.py).
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_request_cache: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "request_cache", default=None
+)
+
+
+@contextmanager
+def request_cache_scope():
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def request_memoize(key: Hashable, compute: Callable[[], T]) -> T:
+    """Return the value memoized at ``key`` in the current request, computing it on
+    first use. Exceptions are not memoized."""
+    memo = _request_cache.get()
+    if memo is None:
+        return compute()
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def request_memoize_many(
+    keys: List[Hashable], compute: Callable[[List[Hashable]], Dict[Hashable, T]]
+) -> Dict[Hashable, T]:
+    """request_memoize for a batch: ``compute`` receives only the keys not memoized
+    yet, so they can be fetched together, and returns a value for each of them."""
+    memo = _request_cache.get()
+    if memo is None:
+        return compute(list(keys))
+    missing = [key for key in keys if key not in memo]
+    if missing:
+        memo.update(compute(missing))
+    return {key: memo[key] for key in keys}
+
+
+def forget_request_memo(key: Hashable) -> None:
+    memo = _request_cache.get()
+    if memo is not None:
+        memo.pop(key, None)
@@ -0,0 +1,26 @@
+import csv
+import itertools
+from typing import Any, Iterable, Sequence
+
+from django.http import StreamingHttpResponse
+
+
+class Echo:
+    """File-like sink for csv.writer: writerow returns the line instead of
+    buffering it, so it can be yielded to a StreamingHttpResponse."""
+
+    def write(self, value):
+        return value
+
+
+def streaming_csv_response(
+    filename: str, headers: Sequence[str], rows: Iterable[Sequence[Any]]
+) -> StreamingHttpResponse:
+    """CSV attachment written row by row as `rows` is consumed."""
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in itertools.chain([headers], rows)),
+        content_type="text/csv",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -2,10 +2,11 @@ import logging
 import threading
 from contextlib import contextmanager
 from io import StringIO
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Union
 
 from celery import shared_task
 from celery.signals import worker_ready
+from django.core import signing
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.db import close_old_connections, connection as default_connection
@@ -16,10 +17,19 @@ from core.models.command_run import CommandRun, CommandRunStatus
 
 logger = logging.getLogger(__name__)
 
+COUNT_QUERY_SIGNING_SALT = "core.utils.tasks.compute_query_count"
+
+
+def _get_consumed_queues(consumer) -> Set[str]:
+    return set(consumer.app.amqp.queues.consume_from)
+
 
 @worker_ready.connect
-def reap_orphaned_runs(**_kwargs) -> None:
-    """Marks any PENDING/RUNNING row as ERROR on worker boot — with concurrency=1, those are deploy/crash leftovers."""
+def reap_orphaned_runs(sender=None, **_kwargs) -> None:
+    """Marks any PENDING/RUNNING row as ERROR when the sequential_commands worker boots — with concurrency=1, those are deploy/crash leftovers."""
+    if sender is not None and "sequential_commands" not in _get_consumed_queues(sender):
+        return
+
     try:
         count = CommandRun.objects.filter(
             status__in=[CommandRunStatus.PENDING, CommandRunStatus.RUNNING]
@@ -34,6 +44,29 @@ def reap_orphaned_runs(**_kwargs) -> None:
         logger.exception("Failed to reap orphaned CommandRun rows on worker boot")
 
 
+@worker_ready.connect
+def reap_orphaned_export_jobs(sender=None, **_kwargs) -> None:
+    """Marks RUNNING export jobs as ERROR when the exports worker boots: the only
+    worker that runs them is starting, so none is running. PENDING jobs are left,
+    their message is still in the queue."""
+    from core.models.export_job import ExportJob
+
+    if sender is not None and "exports" not in _get_consumed_queues(sender):
+        return
+
+    try:
+        count = ExportJob.objects.filter(status=CommandRunStatus.RUNNING).update(
+            status=CommandRunStatus.ERROR,
+            error="Worker restarted before task could finish.",
+            run_ended_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if count:
+            logger.warning("Reaped %d orphaned ExportJob row(s) on worker boot", count)
+    except Exception:
+        logger.exception("Failed to reap orphaned ExportJob rows on worker boot")
+
+
 MAX_OUTPUT_BYTES = 1_000_000
 OUTPUT_FLUSH_INTERVAL_SECONDS = 5.0
 
@@ -183,3 +216,54 @@ def run_management_command(
         if flusher is not None:
             flusher.stop()
             flusher.join(timeout=10)
+
+
+@shared_task
+def run_export_job(export_job_uuid: str) -> None:
+    """Routed to the `exports` queue: a long export must neither wait behind the
+    sequential_commands imports nor hold a gunicorn worker."""
+    from core.models.export_job import ExportJob
+    from core.services.export_job import ExportJobService
+
+    close_old_connections()
+
+    export_job = ExportJob.objects.filter(uuid=export_job_uuid).first()
+    if export_job is None:
+        logger.warning("run_export_job: export job %s not found", export_job_uuid)
+        return
+
+    ExportJobService.run_export_job(export_job)
+
+
+@shared_task
+def refresh_detection_statistics(commune_ids: List[Optional[int]]) -> None:
+    """Rebuild the DetectionStatistic rows of communes written by a request (see
+    DetectionStatisticService.schedule_refresh)."""
+    from core.services.detection_statistic import DetectionStatisticService
+
+    close_old_connections()
+
+    DetectionStatisticService.refresh(commune_ids)
+
+
+@shared_task
+def compute_query_count(query: str, cache_key: str, timeout: int) -> None:
+    """The exact count behind an estimated pagination count (see
+    core.utils.pagination.schedule_exact_count): `query` is the signed SQL, params
+    inlined, to count, cached at `cache_key` for the next request. The signature
+    keeps anyone who can write to the broker from running their own SQL."""
+    from core.utils.cache import safe_cache_set
+
+    try:
+        sql = signing.loads(query, salt=COUNT_QUERY_SIGNING_SALT)
+    except signing.BadSignature:
+        logger.error("compute_query_count: invalid signature for key %s", cache_key)
+        return
+
+    close_old_connections()
+
+    with default_connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM ({sql}) AS count_query")
+        (count,) = cursor.fetchone()
+
+    safe_cache_set(cache_key, count, timeout)
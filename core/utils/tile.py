@@ -0,0 +1,13 @@
+import math
+
+
+def slippy_tile_xy(lon: float, lat: float, z: int) -> tuple[int, int]:
+    # Tile.geometry is ST_TileEnvelope(z, x, y), so the standard slippy-map
+    # formula yields the exact tile containing a centroid — an indexed (x, y, z)
+    # lookup instead of a per-row GiST polygon scan over tens of millions of tiles.
+    n = 2**z
+    x = int(math.floor((lon + 180.0) / 360.0 * n))
+    y = int(
+        math.floor((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    )
+    return x, y
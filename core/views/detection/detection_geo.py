@@ -11,6 +11,7 @@ from core.models.detection_data import (
 )
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from rest_framework.status import HTTP_200_OK, HTTP_202_ACCEPTED
 from core.constants.detection import DETECTION_EDIT_PERMISSION_DENIED_MESSAGE
@@ -101,6 +102,45 @@ class DetectionGeoViewSet(BaseViewSetMixin[Detection]):
         require_custom_zones(request.query_params)
         return super().list(request, *args, **kwargs)
 
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path=r"tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt",
+    )
+    def tiles(self, request, z, x, y):
+        """Same detections and properties as list with geoFeature, as a Mapbox
+        Vector Tile: the tile's bounds replace the bbox params."""
+        from core.services.detection_mvt import DetectionMvtService
+
+        require_custom_zones(request.query_params)
+
+        z, x, y = int(z), int(x), int(y)
+        if not DetectionMvtService.is_valid_tile(z, x, y):
+            raise ValidationError({"tile": [f"Invalid tile: {z}/{x}/{y}"]})
+
+        data = request.query_params.copy()
+        (
+            data["swLng"],
+            data["swLat"],
+            data["neLng"],
+            data["neLat"],
+        ) = DetectionMvtService.get_tile_bbox(z, x, y)
+
+        filterset = DetectionGeoFilter(
+            data, queryset=Detection.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        response = HttpResponse(
+            DetectionMvtService.get_tile(filterset.qs, z, x, y),
+            content_type="application/vnd.mapbox-vector-tile",
+        )
+        # per-user content (permission scoping): browser cache only, and short since
+        # statuses change on every edit
+        response["Cache-Control"] = "private, max-age=60"
+        return response
+
     @action(methods=["post"], detail=False, url_path="multiple")
     def edit_multiple(self, request):
         serializer = DetectionMultipleInputSerializer(data=request.data)
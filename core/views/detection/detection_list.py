@@ -1,8 +1,11 @@
 from aigle.settings.base import DOMAIN
 from common.views.base import BaseViewSetMixin
 
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
 from django_filters import FilterSet, NumberFilter, ChoiceFilter, OrderingFilter
-from django.db.models import QuerySet, OuterRef, Subquery
+from django.db.models import QuerySet
 
 from core.constants.labels import (
     DETECTION_CONTROL_STATUSES_NAMES_MAP,
@@ -13,9 +16,11 @@ from core.constants.labels import (
 from core.models.detection import Detection
 from django.http import JsonResponse
 from django.db.models import Prefetch
-from django.http import HttpResponse
-import csv
+from django.http import FileResponse
+import tempfile
 from core.models.detection_object import DetectionObject
+from core.models.detection_statistic import DetectionStatistic
+from core.models.geo_custom_zone import GeoCustomZone
 from django.contrib.gis.db.models.functions import Centroid
 
 from django.db.models import F, Case, When, Value, Count
@@ -34,17 +39,21 @@ from core.repository.detection import (
     RepoFilterCustomZone,
     RepoFilterInterfaceDrawn,
 )
+from core.repository.detection_statistic import DetectionStatisticRepository
 from core.repository.tile_set import DEFAULT_VALUES
 from core.serializers.detection import (
     DetectionListItemSerializer,
 )
+from core.services.detection_statistic import DetectionStatisticService
 from core.utils.filters import ChoiceInFilter, UuidInFilter
 
-from core.utils.pagination import CachedCountLimitOffsetPagination
+from core.utils.pagination import EstimatedCountLimitOffsetPagination
+from core.utils.streaming import streaming_csv_response
 from core.utils.string import to_array, to_bool, to_enum_array
 from core.views.detection.utils import (
     BOOLEAN_CHOICES,
     INTERFACE_DRAWN_CHOICES,
+    get_count_cache_department_ids,
     require_custom_zones,
 )
 from rest_framework.decorators import action
@@ -53,7 +62,6 @@ from rest_framework.response import Response
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.db.models.functions import Coalesce
 from openpyxl import Workbook
-from io import BytesIO
 from core.utils.orm import get_list_values_list
 
 
@@ -108,7 +116,23 @@ DETECTION_CONTROL_STATUSES_ORDERED = [
     DetectionControlStatus.REHABILITATED,
     DetectionControlStatus.OBSERVARTION_REPORT_REDACTED,
 ]
-DOWNLOAD_LIMIT_ROWS = 20000
+# Exports are read in this order so the rows of a detection object are adjacent and
+# process_rows merges them on the fly, whatever the list's ordering.
+DOWNLOAD_ORDERING = "detection_object__id"
+DOWNLOAD_CHUNK_SIZE = 2000
+DOWNLOAD_VALUES = [
+    "detection_object__id",
+    "detection_object__uuid",
+    "detection_object__commune__name",
+    "detection_object__object_type__name",
+    "detection_object__parcel__section",
+    "detection_object__parcel__num_parcel",
+    "score",
+    "detection_source",
+    "detection_data__detection_control_status",
+    "detection_data__detection_prescription_status",
+    "detection_data__detection_validation_status",
+]
 
 
 def order_queryset(queryset: QuerySet[Detection], ordering: str) -> QuerySet[Detection]:
@@ -219,6 +243,8 @@ class DetectionListFilter(FilterSet):
             else None
         )
 
+        self.view_action = view.action if view else None
+
         if view and view.action in ["list", "download"]:
             if not self.data.get("ordering"):
                 self.data = self.data.copy()
@@ -227,7 +253,9 @@ class DetectionListFilter(FilterSet):
     def pass_(self, queryset, name, value):
         return queryset
 
-    def filter_queryset(self, queryset):
+    def _get_repo_filters(self) -> Dict[str, Any]:
+        """The filters both the detections and their statistics are filtered by,
+        along with the last detections' tile sets filter kwargs."""
         require_custom_zones(self.data)
 
         user_permission = UserPermission.from_request(self.request)
@@ -239,13 +267,88 @@ class DetectionListFilter(FilterSet):
             regions_uuids=to_array(self.data.get("regionsUuids")),
         )
 
+        return {
+            "filter_object_type_uuid_in": user_permission.resolve_object_type_uuids(
+                requested_uuids=to_array(self.data.get("objectTypesUuids"))
+            ),
+            "filter_detection_validation_status_in": to_enum_array(
+                DetectionValidationStatus,
+                self.data.get("detectionValidationStatuses"),
+            ),
+            "filter_detection_control_status_in": to_enum_array(
+                DetectionControlStatus,
+                self.data.get("detectionControlStatuses"),
+            ),
+            "filter_prescribed": to_bool(self.data.get("prescripted")),
+            "filter_collectivities": collectivity_filter,
+        }
+
+    def _get_tile_sets_filter_kwargs(self, repo_filters: Dict[str, Any]):
+        return {
+            "filter_tile_set_type_in": [TileSetType.PARTIAL, TileSetType.BACKGROUND],
+            "filter_tile_set_status_in": [TileSetStatus.VISIBLE, TileSetStatus.HIDDEN],
+            "filter_collectivities": repo_filters["filter_collectivities"],
+            "filter_has_collectivities": True,
+        }
+
+    def _get_interface_drawn(self) -> RepoFilterInterfaceDrawn:
+        return RepoFilterInterfaceDrawn[
+            self.data.get(
+                "interfaceDrawn",
+                RepoFilterInterfaceDrawn.INSIDE_SELECTED_ZONES.value,
+            )
+        ]
+
+    def filter_statistics(self) -> Optional[QuerySet[DetectionStatistic]]:
+        """The DetectionStatistic rows counting exactly the detections
+        filter_queryset keeps, or None when a filter is finer than the rollup: a
+        parcel, a score threshold inside a bucket, or custom zones leaving out a
+        zone some detection is linked to."""
+        if not DetectionStatisticService.is_enabled() or self.data.get("parcelsUuids"):
+            return None
+
+        score_bucket = DetectionStatisticService.get_score_bucket(
+            float(self.data.get("score", "0"))
+        )
+        if score_bucket is None:
+            return None
+
+        repo_filters = self._get_repo_filters()
+
+        custom_zone_uuids = to_array(self.data.get("customZonesUuids"))
+        if (
+            GeoCustomZone.objects.exclude(uuid__in=custom_zone_uuids)
+            .filter(detection_objects__isnull=False)
+            .exists()
+        ):
+            return None
+
+        tile_sets_filter = TileSetPermission.from_request(
+            self.request
+        ).get_last_detections_filters_detection_statistics(
+            **self._get_tile_sets_filter_kwargs(repo_filters)
+        )
+
+        if not tile_sets_filter:
+            return DetectionStatistic.objects.none()
+
+        repo = DetectionStatisticRepository()
+
+        queryset = repo.filter_(
+            queryset=repo.initial_queryset,
+            filter_score_bucket_gte=score_bucket,
+            filter_in_custom_zone=self._get_interface_drawn(),
+            **repo_filters,
+        )
+        return queryset.filter(tile_sets_filter)
+
+    def filter_queryset(self, queryset):
+        repo_filters = self._get_repo_filters()
+
         detection_tilesets_filter = TileSetPermission.from_request(
             self.request
         ).get_last_detections_filters_detections(
-            filter_tile_set_type_in=[TileSetType.PARTIAL, TileSetType.BACKGROUND],
-            filter_tile_set_status_in=[TileSetStatus.VISIBLE, TileSetStatus.HIDDEN],
-            filter_collectivities=collectivity_filter,
-            filter_has_collectivities=True,
+            **self._get_tile_sets_filter_kwargs(repo_filters)
         )
 
         if not detection_tilesets_filter:
@@ -259,30 +362,13 @@ class DetectionListFilter(FilterSet):
                 lookup=RepoFilterLookup.GTE, number=float(self.data.get("score", "0"))
             ),
             filter_parcel_uuid_in=to_array(self.data.get("parcelsUuids")),
-            filter_object_type_uuid_in=user_permission.resolve_object_type_uuids(
-                requested_uuids=to_array(self.data.get("objectTypesUuids"))
-            ),
             filter_custom_zone=RepoFilterCustomZone(
-                interface_drawn=RepoFilterInterfaceDrawn[
-                    self.data.get(
-                        "interfaceDrawn",
-                        RepoFilterInterfaceDrawn.INSIDE_SELECTED_ZONES.value,
-                    )
-                ],
+                interface_drawn=self._get_interface_drawn(),
                 custom_zone_uuids=to_array(
                     self.data.get("customZonesUuids"), default_value=[]
                 ),
             ),
-            filter_detection_validation_status_in=to_enum_array(
-                DetectionValidationStatus,
-                self.data.get("detectionValidationStatuses"),
-            ),
-            filter_detection_control_status_in=to_enum_array(
-                DetectionControlStatus,
-                self.data.get("detectionControlStatuses"),
-            ),
-            filter_prescribed=to_bool(self.data.get("prescripted")),
-            filter_collectivities=collectivity_filter,
+            **repo_filters,
         )
         queryset = queryset.filter(detection_tilesets_filter)
         queryset = queryset.defer(
@@ -320,6 +406,10 @@ class DetectionListFilter(FilterSet):
             "tile_set",
         ).select_related("detection_data")
 
+        if self.view_action == "download":
+            download_ordering = [DOWNLOAD_ORDERING, DEFAULT_ORDERING]
+            return queryset.order_by(*download_ordering).distinct(*download_ordering)
+
         ordering = self.data.get("ordering")
 
         if ordering:
@@ -332,57 +422,21 @@ class DetectionListViewSet(BaseViewSetMixin[Detection]):
     filterset_class = DetectionListFilter
     serializer_class = DetectionListItemSerializer
     queryset = Detection.objects
-    pagination_class = CachedCountLimitOffsetPagination
+    pagination_class = EstimatedCountLimitOffsetPagination
+
+    def get_count_cache_department_ids(self):
+        return get_count_cache_department_ids(self.request)
 
     def get_filtered_queryset(self):
         queryset = self.filter_queryset(self.get_queryset())
 
         if self.action == "download":
-            queryset = get_list_values_list(
-                queryset,
-                "detection_object__id",
-                "detection_object__uuid",
-                "detection_object__commune__name",
-                "detection_object__object_type__name",
-                "detection_object__parcel__section",
-                "detection_object__parcel__num_parcel",
-                "score",
-                "detection_source",
-                "detection_data__detection_control_status",
-                "detection_data__detection_prescription_status",
-                "detection_data__detection_validation_status",
+            # tile set and custom zone names are added per chunk of rows by
+            # add_detection_object_names, not per row in this query
+            queryset = get_list_values_list(queryset, *DOWNLOAD_VALUES).annotate(
+                geometry_center=Centroid("geometry")
             )
 
-        tile_sets_subquery = (
-            DetectionObject.objects.filter(id=OuterRef("detection_object__id"))
-            .annotate(
-                tile_set_names=ArrayAgg(
-                    "tile_sets__name", distinct=True, default=Value([])
-                )
-            )
-            .values("tile_set_names")[:1]
-        )
-
-        custom_zones_subquery = (
-            DetectionObject.objects.filter(id=OuterRef("detection_object__id"))
-            .annotate(
-                zone_names=ArrayAgg(
-                    Coalesce(
-                        "geo_custom_zones__geo_custom_zone_category__name",
-                        "geo_custom_zones__name",
-                    ),
-                    distinct=True,
-                ),
-            )
-            .values("zone_names")[:1]
-        )
-
-        queryset = queryset.annotate(
-            tile_sets=Subquery(tile_sets_subquery),
-            geo_custom_zones=Subquery(custom_zones_subquery),
-            geometry_center=Centroid("geometry"),
-        )
-
         return queryset
 
     def list(self, request, *args, **kwargs):
@@ -403,62 +457,57 @@ class DetectionListViewSet(BaseViewSetMixin[Detection]):
         params_serializer = DownloadParamsSerializer(data=request.GET)
         params_serializer.is_valid(raise_exception=True)
 
-        queryset = self.get_filtered_queryset()
-
-        # safety to not consume too much memory and kill the api
-        queryset = queryset[:DOWNLOAD_LIMIT_ROWS]
-
-        results = process_rows(list(queryset))
+        # server-side cursor: rows are streamed, never loaded all at once
+        rows = (
+            self.get_filtered_queryset()
+            .prefetch_related(None)
+            .iterator(chunk_size=DOWNLOAD_CHUNK_SIZE)
+        )
+        results = process_rows(add_detection_object_names(rows))
 
-        response = HttpResponse()
         if params_serializer.validated_data["outputFormat"] == "xlsx":
-            response["Content-Disposition"] = (
-                'attachment; filename="detection_list.xlsx"'
-            )
-            response.headers["Content-Type"] = (
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            return FileResponse(
+                write_xlsx(results),
+                as_attachment=True,
+                filename="detection_list.xlsx",
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
 
-        if params_serializer.validated_data["outputFormat"] == "csv":
-            response["Content-Disposition"] = (
-                'attachment; filename="detection_list.csv"'
-            )
-            response.headers["Content-Type"] = "text/csv"
+        return streaming_csv_response(
+            "detection_list.csv", DOWNLOAD_FILE_HEADERS, results
+        )
 
-        if params_serializer.validated_data["outputFormat"] == "xlsx":
-            workbook = Workbook()
-            worksheet = workbook.active
-            worksheet.append(DOWNLOAD_FILE_HEADERS)
-            for row in results:
-                worksheet.append(row)
-            buffer = BytesIO()
-            workbook.save(buffer)
-            buffer.seek(0)
-            response.write(buffer.getvalue())
-
-        if params_serializer.validated_data["outputFormat"] == "csv":
-            writer = csv.writer(response)
-            writer.writerow(DOWNLOAD_FILE_HEADERS)
-            writer.writerows(results)
-
-        return response
+    def _get_statistics_overview(self, request) -> Optional[List[Dict[str, Any]]]:
+        filterset = self.filterset_class(
+            request.GET, queryset=self.get_queryset(), request=request
+        )
+        # invalid params: left to filter_queryset, which reports them
+        if not filterset.is_valid():
+            return None
+
+        queryset = filterset.filter_statistics()
+        if queryset is None:
+            return None
+
+        return DetectionStatisticService.count_by_validation_status(queryset)
 
     @action(methods=["get"], detail=False, url_path="overview")
     def get_overview(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-        queryset = (
-            queryset.values(
-                detection_validation_status=F(
-                    "detection_data__detection_validation_status"
-                ),
-            )
-            .annotate(
-                count=Count("id", distinct=True),
+        statuses_count_raw = self._get_statistics_overview(request)
+
+        if statuses_count_raw is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            statuses_count_raw = (
+                queryset.values(
+                    detection_validation_status=F(
+                        "detection_data__detection_validation_status"
+                    ),
+                )
+                .annotate(
+                    count=Count("id", distinct=True),
+                )
+                .order_by("detection_validation_status")
             )
-            .order_by("detection_validation_status")
-        )
-
-        statuses_count_raw = queryset.all()
         overview = DetectionListOverviewSerializer(
             data={
                 "validationStatusesCount": [
@@ -476,9 +525,64 @@ class DetectionListViewSet(BaseViewSetMixin[Detection]):
         return JsonResponse(overview.initial_data)
 
 
-def process_rows(results):
-    combined_data = {}
+def write_xlsx(results):
+    """Write the rows with a write-only workbook (rows go to disk, not memory) into
+    a temporary file, deleted once the response closes it."""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(DOWNLOAD_FILE_HEADERS)
+    for row in results:
+        worksheet.append(row)
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def get_names_by_detection_object(
+    detection_object_ids: Iterable[int], name: Any
+) -> Dict[int, List[str]]:
+    return dict(
+        DetectionObject.objects.filter(id__in=detection_object_ids)
+        .values("id")
+        .annotate(names=ArrayAgg(name, distinct=True, default=Value([])))
+        .order_by()
+        .values_list("id", "names")
+    )
 
+
+def add_detection_object_names(rows):
+    """Insert the tile set and custom zone names of their detection object into the
+    DOWNLOAD_VALUES rows, with two grouped queries per DOWNLOAD_CHUNK_SIZE rows."""
+    rows = iter(rows)
+    names_index = len(DOWNLOAD_VALUES)
+
+    while chunk := list(islice(rows, DOWNLOAD_CHUNK_SIZE)):
+        detection_object_ids = {row[0] for row in chunk}
+        tile_set_names = get_names_by_detection_object(
+            detection_object_ids, "tile_sets__name"
+        )
+        zone_names = get_names_by_detection_object(
+            detection_object_ids,
+            Coalesce(
+                "geo_custom_zones__geo_custom_zone_category__name",
+                "geo_custom_zones__name",
+            ),
+        )
+
+        for row in chunk:
+            row[names_index:names_index] = [
+                tile_set_names.get(row[0], []),
+                zone_names.get(row[0], []),
+            ]
+            yield row
+
+
+def process_rows(results):
+    """Merge the rows of each detection object into one export row. Rows must come
+    ordered by detection object (DOWNLOAD_ORDERING): each object is yielded as soon
+    as the next one starts."""
     ID_INDEX = 0
     UUID_INDEX = 1
     SCORE_INDEX = 6
@@ -490,9 +594,28 @@ def process_rows(results):
     CUSTOM_ZONES_INDEX = 12
     GEOMETRY_CENTER_INDEX = 13
 
+    def combine(base_data, tile_sets, custom_zones):
+        return [
+            *base_data[:TILE_SETS_INDEX],
+            ", ".join(tile_sets),
+            ", ".join([custom_zone for custom_zone in custom_zones if custom_zone]),
+            base_data[GEOMETRY_CENTER_INDEX].x,
+            base_data[GEOMETRY_CENTER_INDEX].y,
+        ]
+
+    current = None
+
     for row in results:
         obj_id = row[ID_INDEX]
 
+        if current is not None and current[0][ID_INDEX] == obj_id:
+            current[1].update(row[TILE_SETS_INDEX])
+            current[2].update(row[CUSTOM_ZONES_INDEX])
+            continue
+
+        if current is not None:
+            yield combine(*current)
+
         row[SOURCE_INDEX] = DETECTION_SOURCE_NAMES_MAP.get(
             row[SOURCE_INDEX], row[SOURCE_INDEX]
         )
@@ -516,25 +639,11 @@ def process_rows(results):
 
         row[SCORE_INDEX] = "{:.2f}".format(row[SCORE_INDEX] * 100)
 
-        if obj_id not in combined_data:
-            combined_data[obj_id] = [
-                row,
-                set(row[TILE_SETS_INDEX]),
-                set(row[CUSTOM_ZONES_INDEX]),
-            ]
-        else:
-            combined_data[obj_id][1].update(row[TILE_SETS_INDEX])
-            combined_data[obj_id][2].update(row[CUSTOM_ZONES_INDEX])
-
-    final_results = []
-    for base_data, tile_sets, custom_zones in combined_data.values():
-        result = [
-            *base_data[:TILE_SETS_INDEX],
-            ", ".join(tile_sets),
-            ", ".join([custom_zone for custom_zone in custom_zones if custom_zone]),
-            base_data[GEOMETRY_CENTER_INDEX].x,
-            base_data[GEOMETRY_CENTER_INDEX].y,
+        current = [
+            row,
+            set(row[TILE_SETS_INDEX]),
+            set(row[CUSTOM_ZONES_INDEX]),
         ]
-        final_results.append(result)
 
-    return final_results
+    if current is not None:
+        yield combine(*current)
@@ -1,8 +1,13 @@
+from typing import List, Optional
+
 from django.db.models import Q
 from rest_framework.exceptions import ValidationError
 
 from core.models.detection import DetectionSource
 from core.models.detection_data import DetectionPrescriptionStatus
+from core.permissions.user import UserPermission
+from core.repository.base import collectivity_department_ids
+from core.utils.string import to_array
 
 
 BOOLEAN_CHOICES = (("false", "False"), ("true", "True"), ("null", "Null"))
@@ -23,6 +28,20 @@ def require_custom_zones(data) -> None:
         )
 
 
+def get_count_cache_department_ids(request) -> Optional[List[int]]:
+    """Departments a list request's collectivity filter restricts its rows to: the
+    count cache partitions of its count. None when the request is unrestricted."""
+    collectivity_filter = UserPermission.from_request(request).get_collectivity_filter(
+        communes_uuids=to_array(request.GET.get("communesUuids")),
+        epcis_uuids=to_array(request.GET.get("epcisUuids")),
+        departments_uuids=to_array(request.GET.get("departmentsUuids")),
+        regions_uuids=to_array(request.GET.get("regionsUuids")),
+    )
+    if collectivity_filter is None or collectivity_filter.is_empty():
+        return None
+    return collectivity_department_ids(collectivity_filter)
+
+
 def filter_score(queryset, name, value):
     if not value:
         return queryset
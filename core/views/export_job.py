@@ -0,0 +1,56 @@
+import os
+
+from django.http import FileResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from core.models.command_run import CommandRunStatus
+from core.models.export_job import ExportJob
+from core.serializers.export_job import ExportJobParamsSerializer, ExportJobSerializer
+from core.services.export_job import ExportJobService
+
+
+class ExportJobViewSet(ReadOnlyModelViewSet):
+    """Exports run in the background. POST with `exportType` and the query params
+    of the synchronous export endpoint, then poll the job until its `downloadUrl`
+    is set."""
+
+    lookup_field = "uuid"
+    serializer_class = ExportJobSerializer
+
+    def get_serializer_context(self):
+        return {"request": self.request}
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        params_serializer = ExportJobParamsSerializer(data=request.GET)
+        params_serializer.is_valid(raise_exception=True)
+
+        export_params = request.GET.dict()
+        export_params.pop("exportType")
+
+        export_job = ExportJobService.create_export_job(
+            request=request,
+            export_type=params_serializer.validated_data["exportType"],
+            params=export_params,
+        )
+        serializer = self.get_serializer(export_job)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=["get"], detail=True)
+    def download(self, request, uuid):
+        export_job = self.get_object()
+
+        if export_job.status != CommandRunStatus.SUCCESS or not export_job.file:
+            raise NotFound("L'export n'est pas encore disponible")
+
+        return FileResponse(
+            export_job.file.open("rb"),
+            as_attachment=True,
+            filename=os.path.basename(export_job.file.name),
+        )
@@ -27,8 +27,38 @@ from rest_framework.decorators import action
 
 from core.services.parcel import ParcelService
 
-from core.utils.pagination import CachedCountLimitOffsetPagination
-from core.views.detection.utils import BOOLEAN_CHOICES, INTERFACE_DRAWN_CHOICES
+from core.utils.pagination import EstimatedCountLimitOffsetPagination
+from core.utils.streaming import streaming_csv_response
+from core.views.detection.utils import (
+    BOOLEAN_CHOICES,
+    INTERFACE_DRAWN_CHOICES,
+    get_count_cache_department_ids,
+)
+
+PARCEL_DOWNLOAD_FILE_HEADERS = [
+    "Commune",
+    "Parcelle (section)",
+    "Parcelle (numéro)",
+    "Identifiant parcellaire",
+    "Zones à enjeux",
+    "Nombre de détections",
+]
+PARCEL_DOWNLOAD_FIELDS = [
+    "commune__name",
+    "section",
+    "num_parcel",
+    "id_parcellaire",
+    "zone_names",
+    "detections_count",
+]
+ZONE_NAMES_INDEX = PARCEL_DOWNLOAD_FIELDS.index("zone_names")
+PARCEL_DOWNLOAD_CHUNK_SIZE = 2000
+
+
+def parcel_download_row(row):
+    row = list(row)
+    row[ZONE_NAMES_INDEX] = ", ".join(row[ZONE_NAMES_INDEX] or [])
+    return row
 
 
 class ParcelFilter(FilterSet):
@@ -80,7 +110,10 @@ class ParcelFilter(FilterSet):
 class ParcelViewSet(BaseViewSetMixin[Parcel]):
     filterset_class = ParcelFilter
     queryset = Parcel.objects
-    pagination_class = CachedCountLimitOffsetPagination
+    pagination_class = EstimatedCountLimitOffsetPagination
+
+    def get_count_cache_department_ids(self):
+        return get_count_cache_department_ids(self.request)
 
     def get_serializer_class(self):
         if self.action in ["retrieve", "get_download_infos"]:
@@ -135,8 +168,7 @@ class ParcelViewSet(BaseViewSetMixin[Parcel]):
         )
         return Response(suggestions)
 
-    @action(methods=["get"], detail=False)
-    def list_items(self, request):
+    def get_list_items_queryset(self):
         from core.permissions.scope import resolve_scoped_user_group
 
         filter_service = ParcelFilterService(
@@ -145,17 +177,21 @@ class ParcelViewSet(BaseViewSetMixin[Parcel]):
         )
 
         filter_instance = self.filterset_class(
-            request.GET, queryset=self.get_queryset(), request=request
+            self.request.GET, queryset=self.get_queryset(), request=self.request
         )
         filter_params = filter_instance.data
 
-        queryset = filter_service.apply_filters(
+        return filter_service.apply_filters(
             queryset=self.get_queryset(),
             filter_params=filter_params,
             filter_has_detections=True,
             with_details=True,
         )
 
+    @action(methods=["get"], detail=False)
+    def list_items(self, request):
+        queryset = self.get_list_items_queryset()
+
         geo_custom_zones_prefetch, geo_custom_zones_category_prefetch = (
             GeoCustomZonePermission.from_request(self.request).get_parcel_prefetch()
         )
@@ -176,6 +212,21 @@ class ParcelViewSet(BaseViewSetMixin[Parcel]):
 
         return Response(serializer.data)
 
+    @action(methods=["get"], detail=False, url_path="download")
+    def download(self, request):
+        rows = (
+            self.get_list_items_queryset()
+            .prefetch_related(None)
+            .distinct()
+            .values_list(*PARCEL_DOWNLOAD_FIELDS)
+            .iterator(chunk_size=PARCEL_DOWNLOAD_CHUNK_SIZE)
+        )
+        return streaming_csv_response(
+            "parcel_list.csv",
+            PARCEL_DOWNLOAD_FILE_HEADERS,
+            (parcel_download_row(row) for row in rows),
+        )
+
     @action(methods=["get"], detail=False, url_path="overview")
     def get_overview(self, request):
         from core.permissions.scope import resolve_scoped_user_group